@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..', '..'))
+
+# 웹(PHP)과 다른 로컬 프로세스가 읽는 조건검색 결과 스냅샷 (메모리 기반 /dev/shm, 없으면 data/)
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else os.path.join(PROJECT_ROOT, 'data')
+CONDITION_SNAPSHOT_FILE = os.path.join(SHM_DIR, 'kiwoom_conditions.json')
+SNAPSHOT_INTERVAL = 0.2   # 초, 바뀐 내용이 있을 때 스냅샷을 다시 쓰는 최소 간격
+RECENT_EVENT_COUNT = 200  # 스냅샷에 남기는 최근 편입/이탈 이벤트 수
+
+logger = logging.getLogger(__name__)
+
+def normalize_code(code):
+    """키움 조건검색 응답의 종목코드('A005930', '005930_AL')를 6자리 코드로 정리합니다."""
+    code = str(code or '').strip()
+    if code[:1] in ('A', 'J', 'Q') and code[1:7].isdigit():
+        code = code[1:]
+    return code.split('_')[0]
+
+class ConditionResultStore:
+    """
+    여러 조건식(seq)의 현재 편입 종목 집합을 메모리에 유지합니다.
+
+    - CNSRREQ 응답(최초 결과 / 재연결 후 재요청 결과)은 해당 조건식의 집합을 통째로 교체하고,
+    - 실시간 조건검색 이벤트(REAL type '02', FID 841=조건식 번호, 9001=종목코드, 843='I' 편입/'D' 이탈)는
+      집합에 증분 반영합니다.
+
+    같은 프로세스의 매매 로직은 matches()/add_listener()로 바로 읽고, 웹과 다른 프로세스는
+    run_snapshot_loop()가 원자적으로 교체하는 JSON 스냅샷(load_condition_snapshot)을 읽습니다.
+    """
+
+    def __init__(self, snapshot_path=CONDITION_SNAPSHOT_FILE, logger=None):
+        self.snapshot_path = snapshot_path
+        self.logger = logger or logging.getLogger(__name__)
+        self.results = {}       # seq -> set(종목코드)
+        self.names = {}         # seq -> 조건식 이름 (CNSRLST 응답)
+        self.updated_at = {}    # seq -> 마지막 변경 시각
+        self.recent_events = deque(maxlen=RECENT_EVENT_COUNT)
+        self.listeners = []     # callback(seq, stock_code, 'I' | 'D')
+        self.dirty = False
+        self.event_count = 0
+
+    def add_listener(self, listener):
+        """편입/이탈 콜백을 등록합니다. 수신 태스크에서 바로 호출되므로 가볍게 유지해야 합니다."""
+        self.listeners.append(listener)
+
+    def matches(self, seq):
+        """조건식의 현재 편입 종목 집합(복사본)을 반환합니다."""
+        return frozenset(self.results.get(str(seq), ()))
+
+    def is_matched(self, seq, stock_code):
+        return stock_code in self.results.get(str(seq), ())
+
+    def _notify(self, seq, stock_code, kind):
+        self.recent_events.append((time.time(), seq, stock_code, kind))
+        for listener in self.listeners:
+            try:
+                listener(seq, stock_code, kind)
+            except Exception as e:
+                self.logger.error(f"조건검색 콜백 처리 중 오류 발생 (조건식 {seq}, 종목 {stock_code}): {e}")
+
+    def replace(self, seq, codes):
+        """조건식의 결과 전체를 교체합니다. 이전 집합과의 차이만 편입/이탈 이벤트로 알립니다."""
+        seq = str(seq)
+        new_codes = {normalize_code(code) for code in codes if code}
+        old_codes = self.results.get(seq, set())
+        self.results[seq] = new_codes
+        self.updated_at[seq] = time.time()
+        self.dirty = True
+        for code in new_codes - old_codes:
+            self._notify(seq, code, 'I')
+        for code in old_codes - new_codes:
+            self._notify(seq, code, 'D')
+        self.logger.info(f"조건식 {seq} 결과 갱신: {len(new_codes)}종목 (편입 {len(new_codes - old_codes)}, 이탈 {len(old_codes - new_codes)})")
+
+    def apply_event(self, seq, stock_code, kind):
+        """실시간 편입('I')/이탈('D') 이벤트 하나를 반영합니다. 집합이 바뀌었으면 True."""
+        seq = str(seq)
+        stock_code = normalize_code(stock_code)
+        codes = self.results.setdefault(seq, set())
+        if kind == 'I':
+            if stock_code in codes:
+                return False
+            codes.add(stock_code)
+        elif kind == 'D':
+            if stock_code not in codes:
+                return False
+            codes.discard(stock_code)
+        else:
+            return False
+        self.event_count += 1
+        self.updated_at[seq] = time.time()
+        self.dirty = True
+        self._notify(seq, stock_code, kind)
+        return True
+
+    def clear(self, seq):
+        """조건검색 중지(CNSRCLR) 시 조건식을 결과에서 뺍니다."""
+        seq = str(seq)
+        if self.results.pop(seq, None) is not None:
+            self.updated_at.pop(seq, None)
+            self.dirty = True
+
+    def on_message(self, response):
+        """WebSocketClient.add_message_handler()에 연결하는 응답 콜백입니다."""
+        trnm = response.get('trnm')
+        if trnm == 'CNSRLST':
+            for entry in response.get('data') or []:
+                if isinstance(entry, (list, tuple)) and len(entry) >= 2:
+                    self.names[str(entry[0])] = entry[1]
+            self.dirty = True
+        elif trnm == 'CNSRREQ':
+            if response.get('return_code', 0) != 0:
+                self.logger.error(f"조건검색 요청 실패 (조건식 {response.get('seq')}): {response.get('return_msg')}")
+                return
+            entries = response.get('data') or []
+            self.replace(response.get('seq'), [entry.get('jmcode') or entry.get('9001') for entry in entries if isinstance(entry, dict)])
+        elif trnm == 'CNSRCLR':
+            self.clear(response.get('seq'))
+        elif trnm == 'REAL':
+            for entry in response.get('data') or []:
+                if isinstance(entry, dict) and entry.get('type') == '02':
+                    values = entry.get('values', {})
+                    self.apply_event(values.get('841'), values.get('9001') or entry.get('item'), values.get('843'))
+
+    def snapshot(self):
+        now = time.time()
+        return {
+            'updated_at': now,
+            'conditions': {
+                seq: {
+                    'name': self.names.get(seq, ''),
+                    'codes': sorted(codes),
+                    'count': len(codes),
+                    'updated_at': self.updated_at.get(seq),
+                }
+                for seq, codes in self.results.items()
+            },
+            'names': self.names,
+            'recent_events': [
+                {'time': ts, 'seq': seq, 'stock_code': code, 'event': kind}
+                for ts, seq, code, kind in reversed(self.recent_events)
+            ],
+        }
+
+    def write_snapshot(self):
+        """임시 파일에 쓴 뒤 교체해 읽는 쪽이 쓰다 만 JSON을 보지 않도록 합니다."""
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+        self.dirty = False
+
+    async def run_snapshot_loop(self, interval=SNAPSHOT_INTERVAL):
+        """바뀐 내용이 있으면 interval초마다 스냅샷을 씁니다. 이벤트가 몰려도 쓰기는 주기당 한 번입니다."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self.dirty:
+                    try:
+                        self.write_snapshot()
+                    except OSError as e:
+                        self.logger.error(f"조건검색 스냅샷 저장 중 오류 발생: {e}")
+        except asyncio.CancelledError:
+            if self.dirty:
+                self.write_snapshot()
+            raise
+
+def load_condition_snapshot(path=CONDITION_SNAPSHOT_FILE):
+    """다른 프로세스(매매 로직 등)에서 조건검색 스냅샷을 읽습니다. 없거나 읽을 수 없으면 None."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -296,6 +296,94 @@ def get_minute_chart(base_url, token, stock_code):
         logger.error(f"주식 분봉 차트 조회 응답 (ka10080) JSON 파싱 오류. 응답: {response.text}")
         return None
 
+# 주식 기본정보 조회 함수 (ka10001)
+def get_stock_basic_info(base_url, token, stock_code, session=None):
+    """
+    키움 Open API를 통해 주식 기본정보(현재가, 전일대비, 등락률, 거래량 등)를 조회합니다 (ka10001).
+    실시간 재연결 후 스냅샷 재동기화처럼 여러 종목을 연달아 조회하므로 응답 본문은 로그에 남기지 않습니다.
+    토큰 만료 등 인증 오류(401)는 PermissionError로 알립니다.
+    """
+    url = base_url + '/api/dostk/stkinfo'
+    headers = {
+        'Content-Type': 'application/json;charset=UTF-8',
+        'authorization': f'Bearer {token}',
+        'api-id': 'ka10001',
+    }
+    try:
+        response = (session or requests).post(url, headers=headers, json={'stk_cd': stock_code}, timeout=5)
+        if response.status_code == 401:
+            raise PermissionError(f"주식 기본정보 조회 (ka10001) 인증 실패: {stock_code}")
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"주식 기본정보 조회 요청 (ka10001) 중 오류 발생 ({stock_code}): {e}")
+        return None
+    except json.JSONDecodeError:
+        logger.error(f"주식 기본정보 조회 응답 (ka10001) JSON 파싱 오류 ({stock_code}). 응답: {response.text[:200]}")
+        return None
+
+
+# 전일대비등락률상위 조회 함수 (ka10027)
+def get_rising_stocks(base_url, token, limit, session=None):
+    """
+    키움 Open API 등락률 상위(ka10027, 코스피+코스닥 통합)에서 상승률 순으로 종목을 최대 limit개 조회합니다.
+    응답 항목(pred_pre_flu_rt_upper)을 그대로 반환하되 stk_cd는 '_AL' 등의 접미사를 뗀 종목코드로 바꿉니다.
+    연속 조회(cont-yn/next-key)로 limit개를 채우며, 실패하면 그때까지 받은 종목만 반환합니다.
+    토큰 만료 등 인증 오류(401)는 PermissionError로 알립니다.
+    """
+    url = base_url + '/api/dostk/rkinfo'
+    data = {
+        "mrkt_tp": "000",       # 000: 전체, 001: 코스피, 101: 코스닥
+        "sort_tp": "1",         # 1: 상승률순
+        "trde_qty_cnd": "00000", # 전체조회
+        "stk_cnd": "0",
+        "crd_cnd": "0",
+        "updown_incls": "1",    # 상하한 포함
+        "pric_cnd": "0",
+        "trde_prica_cnd": "0",
+        "stex_tp": "3"          # 1: KRX, 2: NXT, 3: 통합
+    }
+    stocks = []
+    seen = set()
+    cont_yn, next_key = 'N', ''
+    while len(stocks) < limit:
+        headers = {
+            'Content-Type': 'application/json;charset=UTF-8',
+            'authorization': f'Bearer {token}',
+            'cont-yn': cont_yn,
+            'next-key': next_key,
+            'api-id': 'ka10027',
+        }
+        try:
+            response = (session or requests).post(url, headers=headers, json=data, timeout=5)
+            if response.status_code == 401:
+                raise PermissionError("등락률 상위 조회 (ka10027) 인증 실패")
+            response.raise_for_status()
+            res_json = response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"등락률 상위 조회 요청 (ka10027) 중 오류 발생: {e}")
+            break
+        except json.JSONDecodeError:
+            logger.error(f"등락률 상위 조회 응답 (ka10027) JSON 파싱 오류. 응답: {response.text[:200]}")
+            break
+        if res_json.get('return_code') != 0:
+            logger.error(f"등락률 상위 조회 (ka10027) 실패: {res_json.get('return_msg')}")
+            break
+        for item in res_json.get('pred_pre_flu_rt_upper') or []:
+            code = (item.get('stk_cd') or '').split('_')[0] # 통합(stex_tp=3) 조회 시 '005930_AL' 형태
+            if code and code not in seen:
+                seen.add(code)
+                stocks.append(dict(item, stk_cd=code))
+        cont_yn, next_key = response.headers.get('cont-yn', 'N'), response.headers.get('next-key', '')
+        if cont_yn != 'Y' or not next_key:
+            break
+    return stocks[:limit]
+
+
+def get_rising_stock_codes(base_url, token, limit, session=None):
+    """get_rising_stocks()의 종목코드만 상승률 순으로 반환합니다."""
+    return [item['stk_cd'] for item in get_rising_stocks(base_url, token, limit, session=session)]
+
 
 def get_kiwoom_token_and_account_info():
     """config.ini에서 API 키를 읽어 토큰을 발급받고 계좌 정보를 조회합니다."""
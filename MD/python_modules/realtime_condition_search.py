@@ -5,12 +5,17 @@ import json
 import os
 import sqlite3
 import logging
+import sys
+import configparser
 from datetime import datetime
+from condition_result_store import ConditionResultStore
+from realtime_gateway import GatewaySubscriber, DEFAULT_GATEWAY_SOCKET
 
 # --- 경로 설정 ---
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.join(CURRENT_DIR, '..')
 DB_FILE = os.path.join(PROJECT_ROOT, 'stock_data.db')
+CONFIG_FILE = os.path.join(PROJECT_ROOT, 'config.ini')
 LOG_DIR = os.path.join(PROJECT_ROOT, 'logs')
 os.makedirs(LOG_DIR, exist_ok=True)
 
@@ -30,6 +35,24 @@ logger.addHandler(console_handler)
 # --- 설정값 ---
 # 키움증권 실시간 API URL
 SOCKET_URL = 'wss://mockapi.kiwoom.com:10000/api/dostk/websocket'
+DEFAULT_CONDITION_SEQS = ['67']  # 피봇일목거래량돌파 조건식 (config.ini [CONDITION] SEQS 또는 명령행 인자로 변경)
+CONDITION_REQUEST_INTERVAL = 0.2  # 초, 조건식 여러 개를 요청할 때 요청 사이 간격
+RECONNECT_DELAY = 5  # 초
+
+def load_gateway_socket():
+    """realtime_data_updater.py --publish가 여는 게이트웨이 소켓 경로 (config.ini [REALTIME] GATEWAY_SOCKET)."""
+    config = configparser.ConfigParser()
+    config.read(CONFIG_FILE)
+    return config.get('REALTIME', 'GATEWAY_SOCKET', fallback=DEFAULT_GATEWAY_SOCKET)
+
+def load_condition_seqs():
+    """실행할 조건식 번호 목록: 명령행 인자 > config.ini [CONDITION] SEQS > 기본값 순서로 사용합니다."""
+    if len(sys.argv) > 1:
+        return [seq.strip() for arg in sys.argv[1:] for seq in arg.split(',') if seq.strip()]
+    config = configparser.ConfigParser()
+    config.read(CONFIG_FILE)
+    seqs = config.get('CONDITION', 'SEQS', fallback='')
+    return [seq.strip() for seq in seqs.split(',') if seq.strip()] or DEFAULT_CONDITION_SEQS
 
 def get_access_token_from_db():
     """데이터베이스에서 가장 최근의 Access Token을 가져옵니다."""
@@ -64,12 +87,28 @@ def get_access_token_from_db():
 
 
 class KiwoomWebSocketClient:
-    def __init__(self, uri, access_token):
+    """
+    연결 하나로 여러 조건식의 실시간 조건검색을 실행하는 클라이언트입니다.
+    응답과 편입/이탈 이벤트는 ConditionResultStore가 조건식별 현재 편입 종목 집합으로 유지합니다.
+    """
+
+    def __init__(self, uri, access_token, condition_seqs=None, store=None):
         self.uri = uri
         self.access_token = access_token
         self.websocket = None
         self.is_connected = False
         self.keep_running = True
+        self.condition_seqs = [str(seq) for seq in (condition_seqs or DEFAULT_CONDITION_SEQS)]
+        self.store = store or ConditionResultStore(logger=logger)
+        self.request_task = None
+
+    async def request_conditions(self):
+        """로그인 후 조건식 목록(이름)과 각 조건식의 실시간 조건검색을 요청합니다. 재연결 시 결과 집합도 다시 받습니다."""
+        await self.send_packet({'trnm': 'CNSRLST'})
+        for seq in self.condition_seqs:
+            await asyncio.sleep(CONDITION_REQUEST_INTERVAL)
+            # search_type: 1 (실시간), stex_tp: K (코스피/코스닥)
+            await self.send_packet({'trnm': 'CNSRREQ', 'seq': seq, 'search_type': '1', 'stex_tp': 'K'})
 
     async def connect(self):
         """WebSocket 서버에 연결하고 로그인을 시도합니다."""
@@ -108,18 +147,9 @@ class KiwoomWebSocketClient:
                 
                 if trnm == 'LOGIN':
                     if response.get('return_code') == 0:
-                        logger.info("로그인 성공. 조건검색을 요청합니다.")
-                        # 로그인 성공 시 조건검색 요청
-                        # seq: 조건검색식 일련번호 (사용자 맞게 변경 필요)
-                        # search_type: 1 (실시간)
-                        # stex_tp: K (코스피/코스닥)
-                        condition_req_packet = {
-                            'trnm': 'CNSRREQ',
-                            'seq': '67',  # 피봇일목거래량돌파 조건식
-                            'search_type': '1',
-                            'stex_tp': 'K',
-                        }
-                        await self.send_packet(condition_req_packet)
+                        logger.info(f"로그인 성공. 조건검색을 요청합니다: {', '.join(self.condition_seqs)}")
+                        # 요청 사이 대기 중에도 수신이 계속되도록 별도 태스크로 실행
+                        self.request_task = asyncio.create_task(self.request_conditions())
                     else:
                         logger.error(f"로그인 실패: {response.get('return_msg')}")
                         await self.disconnect()
@@ -128,8 +158,8 @@ class KiwoomWebSocketClient:
                     # PING 메시지 수신 시 그대로 응답
                     await self.send_packet(response)
                 
-                elif trnm == 'CNSRCON': # 조건검색 결과 수신
-                     logger.info(f"조건검색 결과 수신: {response}")
+                elif trnm in ('CNSRLST', 'CNSRREQ', 'CNSRCLR', 'REAL'): # 조건검색 결과 / 실시간 편입·이탈
+                    self.store.on_message(response)
 
                 else:
                     logger.info(f"기타 응답 수신: {response}")
@@ -148,9 +178,16 @@ class KiwoomWebSocketClient:
             logger.error("Access Token이 없어 클라이언트를 실행할 수 없습니다.")
             return
             
-        await self.connect()
-        if self.is_connected:
-            await self.receive_messages()
+        while self.keep_running:
+            await self.connect()
+            if self.is_connected:
+                await self.receive_messages()
+            if self.request_task:
+                self.request_task.cancel()
+            if self.keep_running:
+                # 끊긴 동안의 편입/이탈은 재연결 후 CNSRREQ 응답으로 집합을 통째로 다시 맞춤
+                logger.info(f"{RECONNECT_DELAY}초 후 재연결합니다.")
+                await asyncio.sleep(RECONNECT_DELAY)
         logger.info("클라이언트 실행을 종료합니다.")
 
     async def disconnect(self):
@@ -161,14 +198,36 @@ class KiwoomWebSocketClient:
             self.is_connected = False
             logger.info("WebSocket 서버와 연결을 종료했습니다.")
 
+async def run_via_gateway(socket_path, condition_seqs):
+    """
+    실시간 게이트웨이(realtime_data_updater.py --publish)가 떠 있으면 키움에 따로 접속하지 않고
+    게이트웨이의 세션으로 조건검색을 요청하고 편입/이탈 이벤트를 받습니다.
+    """
+    store = ConditionResultStore(logger=logger)
+    snapshot_task = asyncio.create_task(store.run_snapshot_loop())
+    logger.info(f"실시간 게이트웨이({socket_path})로 조건검색을 구독합니다: {', '.join(condition_seqs)}")
+    try:
+        await GatewaySubscriber([], socket_path, conditions=condition_seqs).run_condition_handlers([store.on_message])
+    finally:
+        snapshot_task.cancel()
+        await asyncio.gather(snapshot_task, return_exceptions=True)
+
 async def main():
+    condition_seqs = load_condition_seqs()
+    gateway_socket = load_gateway_socket()
+    if os.path.exists(gateway_socket):
+        await run_via_gateway(gateway_socket, condition_seqs)
+        return
+
     access_token = get_access_token_from_db()
     
     if not access_token:
         logger.critical("Access Token을 찾을 수 없습니다. 프로그램을 종료합니다.")
         return
 
-    client = KiwoomWebSocketClient(SOCKET_URL, access_token)
+    client = KiwoomWebSocketClient(SOCKET_URL, access_token, condition_seqs=condition_seqs)
+    # 웹(api/run_conditional_search.php)과 다른 프로세스가 읽는 결과 스냅샷
+    snapshot_task = asyncio.create_task(client.store.run_snapshot_loop())
     
     try:
         await client.run()
@@ -176,6 +235,8 @@ async def main():
         logger.info("사용자에 의해 프로그램이 중단되었습니다.")
     finally:
         await client.disconnect()
+        snapshot_task.cancel()
+        await asyncio.gather(snapshot_task, return_exceptions=True)
 
 if __name__ == '__main__':
     asyncio.run(main())
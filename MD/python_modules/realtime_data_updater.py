@@ -7,9 +7,20 @@ import sqlite3
 import datetime
 import logging
 import time # For sleep in main loop
+import sys
 
 # kiwoom_api 모듈 import (가정: kiwoom_api.py 파일이 같은 디렉토리 또는 PYTHONPATH에 있음)
 import kiwoom_api 
+from realtime_tick_writer import RealtimeTickWriter
+from realtime_tick_queue import RealtimeTickQueue, DEFAULT_QUEUE_SIZE
+from realtime_gateway import RealtimeGateway, DEFAULT_GATEWAY_SOCKET
+from tick_journal import TickJournalWriter
+from condition_result_store import ConditionResultStore
+from realtime_latency import RealtimeLatencyMetrics
+from realtime_reconnect import ReconnectBackoff, AccessTokenProvider, SnapshotResyncer, RESYNC_RATE
+from realtime_subscription_manager import (
+    RealtimeSubscriptionManager, DEFAULT_GROUP_SIZE, DEFAULT_GROUPS_PER_CONNECTION, DEFAULT_MAX_CONNECTIONS,
+)
 
 # --- 파일 경로 및 로거 설정 (kiwoom_api와 일관되게 설정) ---
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -51,52 +62,223 @@ except (configparser.NoSectionError, configparser.NoOptionError) as e:
     APP_SECRET = None
     SOCKET_URL = None
 
+# --- 실시간 수신 큐 설정 (config.ini의 [REALTIME] 섹션, 없으면 기본값) ---
+QUEUE_POLICY = config.get('REALTIME', 'QUEUE_POLICY', fallback='coalesce')
+QUEUE_SIZE = config.getint('REALTIME', 'QUEUE_SIZE', fallback=DEFAULT_QUEUE_SIZE)
+CONSUMER_COUNT = config.getint('REALTIME', 'CONSUMER_COUNT', fallback=2)
+REG_INTERVAL = config.getfloat('REALTIME', 'REG_INTERVAL', fallback=0.05) # 그룹별 등록 요청 사이 지연 (초)
+CONSUMER_BATCH = 200 # 처리 태스크가 이벤트 루프를 양보하기 전 연속 처리하는 최대 건수
+METRICS_INTERVAL = 60 # 큐 통계 요약 로그 주기 (초)
+
+# --- 구독 분산 설정 ---
+GROUP_SIZE = config.getint('REALTIME', 'GROUP_SIZE', fallback=DEFAULT_GROUP_SIZE)
+GROUPS_PER_CONNECTION = config.getint('REALTIME', 'GROUPS_PER_CONNECTION', fallback=DEFAULT_GROUPS_PER_CONNECTION)
+MAX_CONNECTIONS = config.getint('REALTIME', 'MAX_CONNECTIONS', fallback=DEFAULT_MAX_CONNECTIONS)
+SUBSCRIPTION_REFRESH_INTERVAL = config.getint('REALTIME', 'SUBSCRIPTION_REFRESH_INTERVAL', fallback=60) # 종목 목록/급등 종목 재확인 주기 (초)
+TOP_MOVERS_COUNT = config.getint('REALTIME', 'TOP_MOVERS_COUNT', fallback=100)
+RESYNC_RATE = config.getint('REALTIME', 'RESYNC_RATE', fallback=RESYNC_RATE) # 재연결 후 ka10001 재동기화 초당 요청 수
+
+# --- 실시간 조건검색 설정 (--conditions, 쉼표로 구분한 조건식 번호) ---
+CONDITION_SEQS = [seq.strip() for seq in config.get('CONDITION', 'SEQS', fallback='').split(',') if seq.strip()]
+GATEWAY_SOCKET = config.get('REALTIME', 'GATEWAY_SOCKET', fallback=DEFAULT_GATEWAY_SOCKET)
+
 # --- DB 업데이트 유틸리티 함수 ---
-def update_stock_realtime_data(stock_code, data):
+REALTIME_UPDATE_SQL = '''
+    UPDATE korean_stock_list
+    SET cur_prc = ?, cmpr_yd = ?, flu_rt = ?, trde_qty = ?, trde_amt = ?, last_updated = CURRENT_TIMESTAMP
+    WHERE stk_cd = ?
+'''
+
+def ensure_realtime_schema():
+    """실시간 갱신에 필요한 컬럼(last_updated)이 있는지 시작 시 한 번만 확인하고 없으면 추가합니다."""
     conn = None
     try:
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-
-        # Mock API의 '0A' 타입 응답 구조에 맞춰 필드 추출
-        # 실제 API 응답을 보고 정확한 키 이름을 확인하고 필요 시 수정해야 합니다.
-        # 예시: {'trnm': 'REAL', 'item': '005930', '0A': {'lastPrice': '1,000', 'changeFromPrevDay': '50', ...}}
-        
-        current_price = float(data.get('lastPrice', '0').replace(',', '')) if data.get('lastPrice') else 0.0
-        change_from_prev_day = float(data.get('changeFromPrevDay', '0').replace(',', '')) if data.get('changeFromPrevDay') else 0.0
-        fluctuation_rate = str(data.get('fluctuationRate', ''))
-        trade_volume = int(data.get('tradeVolume', '0').replace(',', '')) if data.get('tradeVolume') else 0
-        trade_amount = int(data.get('tradeAmount', '0').replace(',', '')) if data.get('tradeAmount') else 0
-        
-        # 마지막 업데이트 시간 필드가 있는지 확인하고 없다면 추가
         cursor.execute("PRAGMA table_info(korean_stock_list);")
         columns = [col[1] for col in cursor.fetchall()]
         if 'last_updated' not in columns:
             cursor.execute("ALTER TABLE korean_stock_list ADD COLUMN last_updated TIMESTAMP;")
+            conn.commit()
+            logger.info("korean_stock_list 테이블에 last_updated 컬럼을 추가했습니다.")
+    except Exception as e:
+        logger.error(f"실시간 데이터 스키마 확인 중 오류 발생: {e}")
+    finally:
+        if conn:
+            conn.close()
 
-        cursor.execute('''
-            UPDATE korean_stock_list
-            SET cur_prc = ?, cmpr_yd = ?, flu_rt = ?, trde_qty = ?, trde_amt = ?, last_updated = CURRENT_TIMESTAMP
-            WHERE stk_cd = ?
-        ''', (current_price, change_from_prev_day, fluctuation_rate, trade_volume, trade_amount, stock_code))
+def parse_realtime_fields(stock_code, data):
+    """
+    실시간 체결 데이터에서 REALTIME_UPDATE_SQL 파라미터 튜플을 만듭니다.
+    Mock API의 '0A' 타입 응답 구조에 맞춰 필드 추출
+    실제 API 응답을 보고 정확한 키 이름을 확인하고 필요 시 수정해야 합니다.
+    예시: {'trnm': 'REAL', 'item': '005930', '0A': {'lastPrice': '1,000', 'changeFromPrevDay': '50', ...}}
+    """
+    current_price = float(data.get('lastPrice', '0').replace(',', '')) if data.get('lastPrice') else 0.0
+    change_from_prev_day = float(data.get('changeFromPrevDay', '0').replace(',', '')) if data.get('changeFromPrevDay') else 0.0
+    fluctuation_rate = str(data.get('fluctuationRate', ''))
+    trade_volume = int(data.get('tradeVolume', '0').replace(',', '')) if data.get('tradeVolume') else 0
+    trade_amount = int(data.get('tradeAmount', '0').replace(',', '')) if data.get('tradeAmount') else 0
+    return (current_price, change_from_prev_day, fluctuation_rate, trade_volume, trade_amount, stock_code)
+
+def update_stock_realtime_data(stock_code, data):
+    """
+    한 종목을 즉시 한 건 기록합니다. 수신 루프에서는 RealtimeTickWriter로 모아서 기록하며,
+    이 함수는 단건 갱신이 필요한 경우를 위해 남겨 둡니다 (스키마 확인은 ensure_realtime_schema()에서 수행).
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        conn.execute(REALTIME_UPDATE_SQL, parse_realtime_fields(stock_code, data))
         conn.commit()
-        # logger.debug(f"DB 업데이트 완료: 종목코드={stock_code}, 현재가={current_price}, 전일대비={change_from_prev_day}, 등락률={fluctuation_rate}, 거래량={trade_volume}, 거래대금={trade_amount}")
     except Exception as e:
         logger.error(f"종목 {stock_code}의 실시간 데이터 DB 업데이트 중 오류 발생: {e}")
     finally:
         if conn:
             conn.close()
 
+def load_stock_codes():
+    """구독 대상 전체 종목 코드를 DB에서 읽습니다. 오류 시 빈 리스트."""
+    conn = None
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute("SELECT stk_cd FROM korean_stock_list ORDER BY stk_cd")
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"데이터베이스에서 종목 코드를 로드하는 중 오류 발생: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
+
+def load_top_mover_codes(token, limit):
+    """
+    키움 등락률 상위(ka10027)에서 급등 종목 코드를 가져옵니다. 오류 시 빈 리스트 (기존 구독 유지).
+    korean_stock_list.flu_rt는 이미 구독 중인 종목만 실시간으로 갱신되므로, 아직 구독하지 않은 종목도
+    급등하면 들어올 수 있도록 전 시장 순위를 REST로 조회합니다.
+    """
+    try:
+        return kiwoom_api.get_rising_stock_codes(BASE_URL, token, limit)
+    except PermissionError as e:
+        # 토큰 재발급은 연결들이 인증 실패 시 맡으므로 여기서는 이번 주기만 건너뜀
+        logger.warning(f"급등 종목 조회를 건너뜁니다: {e}")
+        return []
+    except Exception as e:
+        logger.error(f"급등 종목을 로드하는 중 오류 발생: {e}")
+        return []
+
 # --- WebSocket 클라이언트 클래스 ---
 class WebSocketClient:
-    def __init__(self, uri, access_token):
+    def __init__(self, uri, access_token, tick_writer=None, queue_size=QUEUE_SIZE,
+                 queue_policy=QUEUE_POLICY, consumer_count=CONSUMER_COUNT, token_provider=None, resyncer=None,
+                 latency=None):
         self.uri = uri
         self.access_token = access_token
+        self.token_provider = token_provider # 인증 실패 시 토큰 재발급 (AccessTokenProvider, 없으면 재발급 없이 종료)
+        self.resyncer = resyncer # 재연결 후 놓친 종목 ka10001 재동기화 (SnapshotResyncer)
+        self.latency = latency # 단계별 지연 히스토그램 (RealtimeLatencyMetrics, 모든 연결 공유)
+        self.handler_stages = {} # 콜백 -> 지연 단계 이름 캐시
+        self.backoff = ReconnectBackoff()
+        self.auth_failed = False
+        self.login_count = 0
+        self.disconnected_at = None # 연결이 끊긴 시각 (monotonic), 재연결 후 재동기화 판단에 사용
+        self.resync_task = None
+        self.last_tick_at = {} # 종목코드 -> 마지막 실시간 체결 수신 시각 (monotonic)
+        self.last_tick_data = {} # 종목코드 -> 마지막 실시간 체결 데이터 (재동기화 시 ka10001에 없는 값 유지)
         self.websocket = None
         self.connected = False
         self.keep_running = True
         self.stock_codes_to_subscribe = []
+        self.subscription_groups = {} # 그룹 번호 -> 종목코드 set (RealtimeSubscriptionManager가 관리, 비어 있으면 stock_codes_to_subscribe를 100개씩 분할)
         self.ping_task = None # PING 전송 태스크
+        self.subscribe_task = None # 로그인 후 종목 등록 태스크 (수신 루프를 막지 않도록 별도 실행)
+        self.tick_handlers = [] # 실시간 체결 수신 시 호출할 콜백 (stock_code, data)
+        self.tick_recorders = [] # 큐에 넣기 전 모든 체결을 받는 가벼운 콜백 (체결 저널 등, 큐 병합/버림 영향 없음)
+        self.message_handlers = [] # REAL/PING/LOGIN 이외 응답(조건검색 CNSR*, REG 결과 등)을 받을 콜백 (response)
+        self.condition_seqs = {} # 실시간 조건검색 seq -> 요청 패킷 (재연결 시 다시 요청)
+        self.tick_writer = tick_writer # 실시간 체결을 모아서 DB에 기록하는 RealtimeTickWriter (없으면 단건 기록)
+        # 수신 태스크는 체결을 큐에 넣기만 하고, 처리 태스크(consumer)가 꺼내서 DB 기록/콜백을 수행
+        self.tick_queue = RealtimeTickQueue(maxsize=queue_size, policy=queue_policy)
+        self.consumer_count = consumer_count
+        self.consumer_tasks = []
+        self.metrics_task = None
+
+    def add_tick_handler(self, handler):
+        """실시간 체결(REAL) 데이터를 받을 콜백을 등록합니다. 콜백은 이벤트 루프 스레드에서 호출됩니다."""
+        self.tick_handlers.append(handler)
+
+    def add_tick_recorder(self, recorder):
+        """
+        수신 태스크에서 큐에 넣기 전에 모든 체결을 받을 콜백을 등록합니다.
+        큐의 병합/버림 정책과 무관하게 전 체결이 필요한 기록용이며, 수신을 막지 않도록 아주 가벼워야 합니다.
+        """
+        self.tick_recorders.append(recorder)
+
+    def add_message_handler(self, handler):
+        """REAL/PING/LOGIN 이외의 서버 응답을 받을 콜백을 등록합니다. 수신 태스크에서 바로 호출되므로 가볍게 유지해야 합니다."""
+        self.message_handlers.append(handler)
+
+    async def request_condition(self, seq, search_type='1', stex_tp='K'):
+        """실시간 조건검색(CNSRREQ)을 요청합니다. 재연결 후 로그인되면 자동으로 다시 요청합니다."""
+        packet = {'trnm': 'CNSRREQ', 'seq': str(seq), 'search_type': search_type, 'stex_tp': stex_tp}
+        self.condition_seqs[str(seq)] = packet
+        if self.connected:
+            await self.send_message(packet)
+
+    def subscribed_codes(self):
+        if self.subscription_groups:
+            return set().union(*self.subscription_groups.values())
+        return set(self.stock_codes_to_subscribe)
+
+    async def resume_session(self):
+        """
+        로그인(재연결 포함) 직후 종목 실시간 등록과 조건검색 요청을 복구합니다.
+        재연결이면 그룹 등록을 한꺼번에 보내고, 끊긴 동안 체결을 놓쳤을 수 있는 종목을 ka10001로 재동기화합니다.
+        """
+        reconnected = self.login_count > 1 and self.disconnected_at is not None # 최초 접속 실패 후 첫 로그인은 제외
+        resumed_at = time.monotonic()
+        await self.subscribe_to_stocks(parallel=reconnected)
+        for packet in list(self.condition_seqs.values()):
+            await self.send_message(packet)
+        if reconnected:
+            logger.info(f"재연결 복구 완료: 끊김 {resumed_at - self.disconnected_at:.1f}초")
+            if self.resyncer:
+                if self.resync_task and not self.resync_task.done():
+                    self.resync_task.cancel()
+                self.resync_task = asyncio.create_task(self.resyncer.resync(self, resumed_at))
+        self.disconnected_at = None
+
+    def mark_disconnected(self):
+        """연결 끊김을 기록합니다. 재연결은 run 루프가 담당합니다 (여기서 connect를 부르지 않음)."""
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+        self.connected = False
+        if self.ping_task:
+            self.ping_task.cancel()
+            self.ping_task = None
+
+    def dispatch_tick(self, stock_code, data):
+        if self.latency:
+            return self.dispatch_tick_timed(stock_code, data)
+        for handler in self.tick_handlers:
+            try:
+                handler(stock_code, data)
+            except Exception as e:
+                logger.error(f"실시간 데이터 콜백 처리 중 오류 발생 (종목 {stock_code}): {e}")
+
+    def dispatch_tick_timed(self, stock_code, data):
+        """콜백마다 소요 시간을 handler:<이름> 단계로 기록합니다 (봉 집계, 공유 메모리 시세, 게이트웨이 배포 등)."""
+        for handler in self.tick_handlers:
+            started = time.perf_counter()
+            try:
+                handler(stock_code, data)
+            except Exception as e:
+                logger.error(f"실시간 데이터 콜백 처리 중 오류 발생 (종목 {stock_code}): {e}")
+            stage = self.handler_stages.get(handler)
+            if stage is None:
+                stage = self.handler_stages[handler] = f"handler:{getattr(handler, '__qualname__', type(handler).__name__)}"
+            self.latency.observe(stage, (time.perf_counter() - started) * 1000)
 
     async def connect(self):
         try:
@@ -120,11 +302,7 @@ class WebSocketClient:
 
         except Exception as e:
             logger.error(f'연결 오류 발생: {e}')
-            self.connected = False
-            if self.ping_task:
-                self.ping_task.cancel()
-                self.ping_task = None
-            await asyncio.sleep(5) # 재연결 시도 전 잠시 대기
+            self.mark_disconnected() # 대기는 run 루프의 백오프가 담당
 
     async def send_message(self, message):
         if not self.connected:
@@ -138,22 +316,15 @@ class WebSocketClient:
         try:
             await self.websocket.send(message)
             #logger.debug(f'메시지 전송: {message}') # 너무 많은 로그 방지
-        except websockets.exceptions.ConnectionClosedOK:
-            logger.warning("메시지 전송 중 연결이 끊어졌습니다 (정상 종료). 재연결 시도...")
-            self.connected = False
-            if self.ping_task:
-                self.ping_task.cancel()
-                self.ping_task = None
-            await self.connect() # 연결 끊김 시 재연결 시도
-            if self.connected: # 재연결 성공 시 메시지 재전송
-                await self.websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            # 전송 중에 connect를 다시 부르지 않음: 재연결은 run 루프 한 곳에서만 하고,
+            # 구독/조건검색은 로그인 후 resume_session이 다시 보내므로 이 메시지를 재전송할 필요도 없음
+            logger.warning("메시지 전송 중 연결이 끊어졌습니다. run 루프에서 재연결합니다.")
+            self.mark_disconnected()
         except Exception as e:
             logger.error(f"메시지 전송 오류: {e}")
-            self.connected = False
-            if self.ping_task:
-                self.ping_task.cancel()
-                self.ping_task = None
-            # 오류 발생 시 재연결을 위해 run 루프가 connect를 호출하도록
+            self.mark_disconnected()
+            await self.websocket.close() # 수신 루프의 recv()를 깨워 run 루프가 재연결하도록
             
     async def send_ping_periodically(self):
         """주기적으로 PING 메시지를 보내 연결을 유지합니다."""
@@ -175,39 +346,68 @@ class WebSocketClient:
                 break # PING 루프 종료, run 루프가 재연결 담당
 
     async def receive_messages(self):
+        """
+        수신 전용 루프입니다. 프레임을 JSON으로 풀어 실시간 체결은 큐에 넣기만 하고 바로 다음 recv()를 기다립니다.
+        PING 응답 외에 await가 필요한 작업(종목 등록 등)은 별도 태스크로 실행합니다.
+        """
         while self.keep_running:
             try:
                 response_str = await self.websocket.recv()
+                received = time.perf_counter()
                 response = json.loads(response_str)
+                if self.latency:
+                    self.latency.observe('decode', (time.perf_counter() - received) * 1000)
+                trnm = response.get('trnm')
+
+                if trnm == 'REAL' and response.get('item'):
+                    realtime_data = response.get('0A', response) # '0A' 필드 또는 전체 응답 사용
+                    self.last_tick_at[response['item']] = time.monotonic()
+                    self.last_tick_data[response['item']] = realtime_data
+                    if self.latency:
+                        self.latency.observe_exchange('exchange_to_receive', realtime_data)
+                    for recorder in self.tick_recorders:
+                        try:
+                            recorder(response['item'], realtime_data)
+                        except Exception as e:
+                            logger.error(f"체결 기록 콜백 처리 중 오류 발생: {e}")
+                    self.tick_queue.put_nowait(response['item'], realtime_data)
+
+                elif trnm == 'PING':
+                    # 서버로부터 PING 받으면 즉시 응답 (이전 코드와 동일)
+                    await self.send_message(response)
+                    # logger.debug("서버로부터 PING 수신 후 응답.")
 
-                if response.get('trnm') == 'LOGIN':
+                elif trnm == 'LOGIN':
                     if response.get('return_code') != 0:
                         logger.error(f'로그인 실패: {response.get("return_msg")}')
-                        await self.disconnect()
+                        if not self.token_provider:
+                            await self.disconnect()
+                            break
+                        # 토큰 만료 등 인증 실패: 연결을 닫고 run 루프가 토큰 재발급 후 재접속
+                        self.auth_failed = True
+                        self.mark_disconnected()
+                        await self.websocket.close()
+                        break
                     else:
                         logger.info('로그인 성공.')
-                        await self.subscribe_to_stocks() # 로그인 성공 후 종목 구독
-
-                elif response.get('trnm') == 'PING':
-                    # 서버로부터 PING 받으면 즉시 응답 (이전 코드와 동일)
-                    await self.send_message(response)
-                    # logger.debug("서버로부터 PING 수신 후 응답.")
-                
-                elif response.get('trnm') != 'PING': # PING 메시지가 아닐 경우에만 로그 출력 및 DB 업데이트
-                    logger.info(f'실시간 시세 서버 응답 수신: {response}') # 너무 많은 로그 방지
-                    if response.get('trnm') == 'REAL' and response.get('item'):
-                        stock_code = response['item']
-                        realtime_data = response.get('0A', response) # '0A' 필드 또는 전체 응답 사용
-                        update_stock_realtime_data(stock_code, realtime_data)
-                        logger.info(f"종목 {stock_code} 실시간 데이터 처리 완료.")
-
+                        self.backoff.reset()
+                        self.login_count += 1
+                        # 로그인 성공 후 종목 구독 (등록 요청 사이 대기 중에도 체결 수신이 계속되도록 태스크로 실행)
+                        if self.subscribe_task and not self.subscribe_task.done():
+                            self.subscribe_task.cancel()
+                        self.subscribe_task = asyncio.create_task(self.resume_session())
+
+                else: # PING/REAL 이외의 응답 (REG 결과, 조건검색 등)
+                    logger.info(f'실시간 시세 서버 응답 수신: {response}')
+                    for handler in self.message_handlers:
+                        try:
+                            handler(response)
+                        except Exception as e:
+                            logger.error(f"서버 응답 콜백 처리 중 오류 발생: {e}")
 
             except websockets.ConnectionClosed:
                 logger.warning('서버에 의해 연결이 끊어졌습니다 (ConnectionClosed). 재연결 시도...')
-                self.connected = False
-                if self.ping_task:
-                    self.ping_task.cancel()
-                    self.ping_task = None
+                self.mark_disconnected()
                 # run 루프에서 재연결을 처리하도록 break
                 break 
             except json.JSONDecodeError:
@@ -218,69 +418,175 @@ class WebSocketClient:
             except Exception as e:
                 logger.error(f'메시지 수신 중 예상치 못한 오류 발생: {e}')
                 # 오류 발생 시 연결 끊고 재연결 시도하도록
-                self.connected = False
-                if self.ping_task:
-                    self.ping_task.cancel()
-                    self.ping_task = None
+                self.mark_disconnected()
+                try:
+                    await self.websocket.close()
+                except Exception:
+                    pass
                 break # receive_messages 루프 종료, run 루프가 재연결 담당
 
+    def process_tick(self, stock_code, realtime_data):
+        """큐에서 꺼낸 체결 하나를 처리합니다: DB 기록(쓰기 스레드로 전달)과 등록된 콜백 호출."""
+        started = time.perf_counter()
+        exchange_ts = self.latency.exchange_time(realtime_data) if self.latency else None
+        try:
+            params = parse_realtime_fields(stock_code, realtime_data)
+        except (ValueError, AttributeError) as e:
+            logger.error(f"종목 {stock_code} 실시간 데이터 변환 오류: {e}, Data: {realtime_data}")
+        else:
+            if self.tick_writer:
+                self.tick_writer.submit(stock_code, params, exchange_ts)
+            else:
+                update_stock_realtime_data(stock_code, realtime_data)
+        self.dispatch_tick(stock_code, realtime_data)
+        if self.latency:
+            # 콜백까지 끝난 시점 = 공유 메모리 시세/게이트웨이 구독자에게 보이는 시점
+            self.latency.observe('process', (time.perf_counter() - started) * 1000)
+            if exchange_ts is not None:
+                self.latency.observe('exchange_to_visible', (time.time() - exchange_ts) * 1000)
+
+    async def consume_ticks(self):
+        """
+        처리 태스크: 큐에서 체결을 꺼내 process_tick()을 호출합니다.
+        처리가 동기 함수라서 최대 CONSUMER_BATCH건마다 이벤트 루프를 양보해 수신 태스크가 굶지 않게 합니다.
+        """
+        while True:
+            try:
+                await self.tick_queue.wait()
+                for _ in range(CONSUMER_BATCH):
+                    item = self.tick_queue.get_nowait()
+                    if item is None:
+                        break
+                    stock_code, realtime_data, lag = item
+                    if self.latency:
+                        self.latency.observe('queue_wait', lag * 1000)
+                    self.process_tick(stock_code, realtime_data)
+                await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"실시간 체결 처리 태스크 오류: {e}")
+
+    async def log_queue_metrics(self):
+        """큐 길이/대기 시간/합침·버림 건수를 주기적으로 요약 로그로 남깁니다."""
+        while True:
+            try:
+                await asyncio.sleep(METRICS_INTERVAL)
+                stats = self.tick_queue.stats()
+                logger.info(
+                    f"실시간 큐 상태 [{stats['policy']}] 대기 {stats['depth']}건 (최대 {stats['max_depth']}), "
+                    f"지연 평균 {stats['avg_lag_ms']:.1f}ms / 최대 {stats['max_lag_ms']:.1f}ms, "
+                    f"누적 수신 {stats['enqueued']} / 처리 {stats['processed']} / 합침 {stats['coalesced']} / 버림 {stats['dropped']}"
+                )
+                self.tick_queue.reset_window()
+            except asyncio.CancelledError:
+                break
+
+    def start_consumers(self):
+        if self.consumer_tasks:
+            return
+        self.consumer_tasks = [asyncio.create_task(self.consume_ticks()) for _ in range(self.consumer_count)]
+        self.metrics_task = asyncio.create_task(self.log_queue_metrics())
+
+    def stop_consumers(self):
+        for task in self.consumer_tasks:
+            task.cancel()
+        self.consumer_tasks = []
+        if self.metrics_task:
+            self.metrics_task.cancel()
+            self.metrics_task = None
+
     async def run(self):
+        # 처리 태스크는 재연결과 무관하게 유지 (연결이 끊겨도 큐에 남은 체결은 계속 처리)
+        self.start_consumers()
         while self.keep_running:
             if not self.connected:
+                if self.disconnected_at is not None:
+                    # 지터를 준 지수 백오프: 첫 재시도는 1초 안, 연속 실패 시 최대 RECONNECT_MAX_DELAY초
+                    delay = self.backoff.next_delay()
+                    logger.info(f"{delay:.1f}초 후 재연결을 시도합니다 (시도 {self.backoff.attempt}회).")
+                    await asyncio.sleep(delay)
+                if self.auth_failed and self.token_provider:
+                    self.access_token = await self.token_provider.refresh(self.access_token)
+                    self.auth_failed = False
+                elif self.token_provider:
+                    self.access_token = self.token_provider.token # 다른 연결이 재발급한 토큰 사용
                 await self.connect()
                 if not self.connected: # connect 시도 후에도 연결 실패
-                    logger.error("WebSocket 연결 실패. 10초 후 재시도...")
-                    await asyncio.sleep(10)
-                    continue # 다음 루프에서 다시 connect 시도
+                    continue # 백오프 후 다시 connect 시도
             
             # 연결이 되었으면 메시지 수신 시작
             await self.receive_messages()
             # receive_messages가 종료되면 (연결 끊김 등) 다시 connect 시도
 
-    async def subscribe_to_stocks(self):
-        if not self.stock_codes_to_subscribe:
-            logger.info("구독할 종목 코드가 없습니다. 데이터베이스에서 종목 코드를 로드해주세요.")
-            return
-
-        # --- 종목 구독 요청 분할 처리 시작 ---
-        # Mock API 허용 개수(100)에 맞춰 분할
-        chunk_size = 100 
-        total_stocks = len(self.stock_codes_to_subscribe)
-        group_number = 1 # 그룹 번호 초기화
-        
-        logger.info(f"총 {total_stocks}개의 종목을 {chunk_size}개씩 분할하여 실시간 등록 요청합니다.")
-
-        for i in range(0, total_stocks, chunk_size):
-            chunk = self.stock_codes_to_subscribe[i:i + chunk_size]
-            
-            subscription_data_entry = {
-                'item': chunk, # 분할된 종목 코드 리스트 전달
+    def build_reg_message(self, trnm, group_no, codes, refresh='0'):
+        return {
+            'trnm': trnm,
+            'grp_no': str(group_no), # 그룹 번호를 문자열로 변환하여 설정
+            'refresh': refresh,
+            'data': [{
+                'item': list(codes),
                 'type': ['0A'], # 기본 실시간 시세 (체결) 데이터 타입
-            }
-
-            reg_message = {
-                'trnm': 'REG',
-                'grp_no': str(group_number), # 그룹 번호를 문자열로 변환하여 설정
-                'refresh': '0', # 새 그룹으로 등록하므로 '0'으로 설정 (기존 등록 유지 불필요)
-                'data': [subscription_data_entry]
-            }
-
-            logger.info(f"실시간 항목 등록 요청 전송 (그룹 {group_number}, {i+1} ~ {min(i + chunk_size, total_stocks)}번째 종목).")
-            await self.send_message(reg_message)
-            
-            group_number += 1 # 다음 요청을 위해 그룹 번호 증가
-            
-            # 각 요청 사이에 짧은 지연 시간을 두어 서버 부하 방지
-            await asyncio.sleep(0.5) # 0.5초 지연
+            }]
+        }
+
+    async def register_codes(self, group_no, codes):
+        """그룹에 종목을 추가 등록합니다 (기존 등록 유지). 연결 전이면 로그인 후 전체 재등록 때 함께 등록됩니다."""
+        if self.connected and codes:
+            await self.send_message(self.build_reg_message('REG', group_no, codes, refresh='1'))
+
+    async def remove_codes(self, group_no, codes):
+        """그룹에서 종목의 실시간 등록을 해지합니다."""
+        if self.connected and codes:
+            await self.send_message(self.build_reg_message('REMOVE', group_no, codes))
+
+    async def subscribe_to_stocks(self, parallel=False):
+        """
+        로그인(재연결 포함) 직후 현재 그룹 구성 전체를 등록합니다.
+        parallel=True(재연결)이면 그룹 사이 대기 없이 모든 그룹 등록을 한꺼번에 보내 복구 시간을 줄입니다.
+        """
+        if not self.subscription_groups:
+            if not self.stock_codes_to_subscribe:
+                logger.info("구독할 종목 코드가 없습니다. 데이터베이스에서 종목 코드를 로드해주세요.")
+                return
+            # Mock API 허용 개수(100)에 맞춰 분할
+            chunk_size = 100
+            for group_number, i in enumerate(range(0, len(self.stock_codes_to_subscribe), chunk_size), start=1):
+                self.subscription_groups[group_number] = set(self.stock_codes_to_subscribe[i:i + chunk_size])
+
+        groups = sorted(self.subscription_groups.items())
+        total_stocks = sum(len(codes) for _, codes in groups)
+        logger.info(f"총 {total_stocks}개의 종목을 {len(groups)}개 그룹으로 실시간 등록 요청합니다.")
+
+        # 새 그룹으로 등록하므로 '0'으로 설정 (기존 등록 유지 불필요)
+        messages = [self.build_reg_message('REG', group_number, sorted(codes), refresh='0') for group_number, codes in groups if codes]
+        if parallel:
+            await asyncio.gather(*(self.send_message(message) for message in messages))
+        else:
+            for message in messages:
+                await self.send_message(message)
+                # 각 요청 사이에 짧은 지연 시간을 두어 서버 부하 방지
+                await asyncio.sleep(REG_INTERVAL)
 
         logger.info("모든 실시간 항목 등록 요청 전송 완료.")
-        # --- 종목 구독 요청 분할 처리 끝 ---
 
     async def disconnect(self):
         self.keep_running = False
         if self.ping_task:
             self.ping_task.cancel()
             self.ping_task = None
+        if self.subscribe_task:
+            self.subscribe_task.cancel()
+            self.subscribe_task = None
+        if self.resync_task:
+            self.resync_task.cancel()
+            self.resync_task = None
+        self.stop_consumers()
+        # 처리 태스크를 멈춘 뒤 큐에 남은 체결을 마저 처리 (쓰기 스레드 종료 전에 반영되도록)
+        item = self.tick_queue.get_nowait()
+        while item is not None:
+            self.process_tick(item[0], item[1])
+            item = self.tick_queue.get_nowait()
         if self.connected and self.websocket:
             try:
                 await self.websocket.close()
@@ -289,6 +595,12 @@ class WebSocketClient:
             except Exception as e:
                 logger.error(f"WebSocket 연결 해제 중 오류 발생: {e}")
 
+def issue_new_access_token():
+    """REST API로 접근 토큰을 새로 발급받습니다. 실패 시 None."""
+    token_data = {'grant_type': 'client_credentials', 'appkey': APP_KEY, 'secretkey': APP_SECRET}
+    token_response = kiwoom_api.issue_access_token(base_url=BASE_URL, data=token_data)
+    return token_response.get('access_token') if token_response else None
+
 # --- 메인 실행 로직 ---
 async def main():
     logger.info("--- 실시간 종목 시세 업데이트 스크립트 시작 ---")
@@ -318,9 +630,7 @@ async def main():
         # kiwoom_api.issue_access_token을 사용한 토큰 발급은 일반 REST API이며, 
         # Mock WebSocket API와는 별개일 수 있습니다. 
         # 하지만 일단 Mock API의 토큰 발급 예시가 없다면 시도합니다.
-        token_data = {'grant_type': 'client_credentials', 'appkey': APP_KEY, 'secretkey': APP_SECRET}
-        token_response = kiwoom_api.issue_access_token(base_url=BASE_URL, data=token_data)
-        ACCESS_TOKEN_FROM_CONFIG = token_response.get('access_token') if token_response else None
+        ACCESS_TOKEN_FROM_CONFIG = issue_new_access_token()
         
         if not ACCESS_TOKEN_FROM_CONFIG:
             logger.error("접근 토큰을 발급받을 수 없어 실시간 업데이트를 시작할 수 없습니다. config.ini의 ACCESS_TOKEN 확인 필요.")
@@ -328,38 +638,146 @@ async def main():
 
 
     # DB에서 모든 종목 코드 로드
-    all_stock_codes = []
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT stk_cd FROM korean_stock_list LIMIT 100")
-        all_stock_codes = [row[0] for row in cursor.fetchall()]
-        logger.info(f"데이터베이스에서 총 {len(all_stock_codes)}개의 종목 코드를 로드했습니다.")
-        if not all_stock_codes:
-            logger.warning("데이터베이스에 종목 코드가 없습니다. get_all_stocks.py를 먼저 실행하여 종목을 로드해주세요.")
-            return
-    except Exception as e:
-        logger.error(f"데이터베이스에서 종목 코드를 로드하는 중 오류 발생: {e}")
+    all_stock_codes = load_stock_codes()
+    logger.info(f"데이터베이스에서 총 {len(all_stock_codes)}개의 종목 코드를 로드했습니다.")
+    if not all_stock_codes:
+        logger.warning("데이터베이스에 종목 코드가 없습니다. get_all_stocks.py를 먼저 실행하여 종목을 로드해주세요.")
         return
-    finally:
-        if conn:
-            conn.close()
-
-    websocket_client = WebSocketClient(SOCKET_URL, ACCESS_TOKEN_FROM_CONFIG)
-    websocket_client.stock_codes_to_subscribe = all_stock_codes
 
-    # run 태스크를 생성하여 클라이언트 실행
-    run_task = asyncio.create_task(websocket_client.run())
+    # 스키마 확인은 시작 시 한 번만 하고, 실시간 체결은 쓰기 스레드가 모아서 기록합니다.
+    ensure_realtime_schema()
+    # 수신 → 디코딩 → 큐 → 처리/콜백 → DB 커밋 단계별 지연과 체결시간 대비 지연을 모든 연결이 함께 기록합니다.
+    # 5초마다 api/realtime_metrics.php가 읽는 지표 파일을 갱신하고, METRICS_INTERVAL마다 요약 로그를 남깁니다.
+    latency = RealtimeLatencyMetrics(logger=logger)
+    latency_task = asyncio.create_task(latency.run_report_loop(report_interval=METRICS_INTERVAL))
+    tick_writer = RealtimeTickWriter(DB_FILE, REALTIME_UPDATE_SQL, logger=logger, metrics=latency)
+    tick_writer.start()
+
+    # 모든 연결이 같은 토큰을 공유하고, 인증 실패 시 한 번만 재발급합니다.
+    # 재연결 후에는 끊긴 동안 체결이 없던 종목만 ka10001로 재동기화합니다 (초당 RESYNC_RATE건).
+    token_provider = AccessTokenProvider(ACCESS_TOKEN_FROM_CONFIG, issue_new_access_token, logger=logger)
+    resyncer = SnapshotResyncer(
+        lambda token, stock_code: kiwoom_api.get_stock_basic_info(BASE_URL, token, stock_code),
+        token_provider, rate=RESYNC_RATE, logger=logger,
+    )
+
+    # 전종목을 여러 연결/그룹으로 나눠 구독합니다.
+    manager = RealtimeSubscriptionManager(
+        lambda: WebSocketClient(SOCKET_URL, token_provider.token, tick_writer=tick_writer,
+                                token_provider=token_provider, resyncer=resyncer, latency=latency),
+        group_size=GROUP_SIZE, groups_per_connection=GROUPS_PER_CONNECTION,
+        max_connections=MAX_CONNECTIONS, logger=logger,
+    )
+
+    # --market-cap: 실시간 체결로 시가총액 순위를 증분 갱신합니다 (auto_trade_backend/market_cap_fetcher.py)
+    market_cap_task = None
+    if '--market-cap' in sys.argv[1:]:
+        sys.path.append(os.path.join(PROJECT_ROOT, '..', 'auto_trade_backend'))
+        from market_cap_fetcher import build_engine, RealtimeMarketCapRanker
+        ranker = RealtimeMarketCapRanker(build_engine())
+        manager.add_tick_handler(ranker.on_tick)
+        market_cap_task = asyncio.create_task(ranker.run_flush_loop())
+        logger.info("실시간 시가총액 순위 갱신 모드를 시작합니다.")
+
+    # --bars: 실시간 체결로 1분/5분/일봉을 만들어 stock_bars 테이블에 저장합니다 (python_modules/tick_bar_aggregator.py)
+    bar_task = None
+    if '--bars' in sys.argv[1:]:
+        sys.path.append(os.path.join(PROJECT_ROOT, '..', 'python_modules'))
+        from tick_bar_aggregator import RealtimeBarRecorder
+        bar_recorder = RealtimeBarRecorder()
+        # 큐에서 병합되기 전 모든 체결을 받아야 봉의 고가/저가와 체결별 거래량(FID 15)이 정확합니다.
+        manager.add_tick_recorder(bar_recorder.on_tick)
+        bar_task = asyncio.create_task(bar_recorder.run_flush_loop())
+        logger.info("실시간 분봉 집계 모드를 시작합니다.")
+
+    # --shared-quotes: 전종목 최신 시세를 공유 메모리 테이블에 유지해 다른 프로세스가 DB/API 없이 읽게 합니다 (python_modules/shared_quote_table.py)
+    quote_table = None
+    if '--shared-quotes' in sys.argv[1:]:
+        sys.path.append(os.path.join(PROJECT_ROOT, '..', 'python_modules'))
+        from shared_quote_table import SharedQuoteTable
+        quote_table = SharedQuoteTable.create(all_stock_codes)
+        manager.add_tick_handler(quote_table.update_from_tick)
+        logger.info(f"공유 메모리 시세 테이블을 생성했습니다: {quote_table.path}")
+
+    # --publish: 이 프로세스가 가진 키움 세션의 체결/조건검색 이벤트를 로컬 구독자에게 배포합니다 (realtime_gateway.py)
+    # 다른 실시간 스크립트는 키움에 따로 접속하지 않고 GatewaySubscriber로 이 게이트웨이에 붙습니다.
+    gateway = None
+    if '--publish' in sys.argv[1:]:
+        async def request_condition(seq):
+            if manager.clients:
+                await manager.clients[0].request_condition(seq)
+        gateway = RealtimeGateway(GATEWAY_SOCKET, condition_requester=request_condition, logger=logger)
+        # 체결은 큐 병합 전에 모두 배포하고(구독자가 tick.*로 전 체결을 받음), 재동기화 값만 큐 처리 후 배포
+        manager.add_tick_recorder(gateway.on_tick)
+        manager.add_tick_handler(gateway.on_resync_tick)
+        manager.add_message_handler(gateway.on_message)
+        await gateway.start()
+
+    # --conditions: 같은 키움 세션에서 [CONDITION] SEQS 조건식들의 실시간 조건검색을 실행하고
+    # 조건식별 편입 종목 집합을 유지합니다 (condition_result_store.py, 웹은 api/run_conditional_search.php로 조회)
+    condition_store = None
+    condition_task = None
+    if '--conditions' in sys.argv[1:]:
+        condition_store = ConditionResultStore(logger=logger)
+        manager.add_message_handler(condition_store.on_message)
+        condition_task = asyncio.create_task(condition_store.run_snapshot_loop())
+
+    # --journal: 모든 체결을 일자별 바이너리 저널에 기록해 장 종료 후 재생/백테스트에 씁니다 (tick_journal.py)
+    journal = None
+    journal_task = None
+    if '--journal' in sys.argv[1:]:
+        journal = TickJournalWriter()
+        manager.add_tick_recorder(journal.on_tick)
+        journal_task = asyncio.create_task(journal.run_flush_loop())
+        logger.info(f"체결 저널 기록을 시작합니다: {journal.journal_dir}")
+
+    # --top-movers: 수용량이 전종목보다 작을 때 급등 종목(ka10027 등락률 상위)을 우선 구독하도록 주기적으로 교체합니다.
+    load_top_movers = None
+    if '--top-movers' in sys.argv[1:]:
+        load_top_movers = lambda limit: load_top_mover_codes(token_provider.token, limit)
+    initial_codes = (load_top_movers(TOP_MOVERS_COUNT) if load_top_movers else []) + all_stock_codes
+    added, _, skipped = await manager.apply(initial_codes)
+    logger.info(f"실시간 구독 배치 완료: {added}종목, {len(manager.clients)}개 연결 (수용량 초과 제외 {skipped}종목)")
+
+    # 조건검색은 첫 번째 연결에서 요청합니다 (로그인 후 resume_session이 전송, 재연결 시 다시 요청)
+    if condition_store and manager.clients:
+        for seq in CONDITION_SEQS:
+            await manager.clients[0].request_condition(seq)
+        logger.info(f"실시간 조건검색 요청 예약: {', '.join(CONDITION_SEQS) or '없음'}")
+
+    # 연결별 run 태스크 시작 + 종목 목록 주기 갱신
+    manager.start()
+    refresh_task = asyncio.create_task(manager.follow_universe(
+        load_stock_codes, load_top_movers, interval=SUBSCRIPTION_REFRESH_INTERVAL, top_n=TOP_MOVERS_COUNT,
+    ))
 
     # 스크립트가 계속 실행되도록 유지 (비동기 태스크를 백그라운드에서 실행)
     try:
         # main 함수가 바로 종료되지 않도록 무한정 대기
-        await run_task 
+        await manager.wait()
     except asyncio.CancelledError:
         logger.info("메인 루프가 취소되었습니다.")
     finally:
-        await websocket_client.disconnect()
+        refresh_task.cancel()
+        latency_task.cancel()
+        logger.info(latency.summary_line()) # 마지막 구간 지연 요약
+        if market_cap_task:
+            market_cap_task.cancel()
+        if bar_task:
+            bar_task.cancel()
+            await asyncio.gather(bar_task, return_exceptions=True) # 남은 봉 저장 대기
+        await manager.shutdown()
+        if gateway:
+            await gateway.close()
+        if condition_task:
+            condition_task.cancel()
+            await asyncio.gather(condition_task, return_exceptions=True) # 마지막 스냅샷 저장
+        if journal:
+            journal_task.cancel()
+            journal.close() # 버퍼에 남은 체결까지 기록
+        tick_writer.stop() # 남은 체결 데이터 기록 후 종료
+        if quote_table:
+            quote_table.close()
         logger.info("--- 실시간 종목 시세 업데이트 스크립트 종료 ---")
 
 
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+
+# --- 기본 설정 ---
+# 게이트웨이(실시간 클라이언트 프로세스)와 로컬 구독자 사이의 Unix 도메인 소켓 경로
+DEFAULT_GATEWAY_SOCKET = '/tmp/kiwoom_realtime_gateway.sock'
+SUBSCRIBER_QUEUE_SIZE = 10000  # 구독자별 미전송 메시지 한도 (넘으면 오래된 메시지부터 버림)
+RECONNECT_DELAY = 3            # 초, 구독자가 게이트웨이에 다시 연결하기 전 대기
+
+logger = logging.getLogger(__name__)
+
+def _number(value, cast=int):
+    """'+1,200', '-350' 같은 키움 숫자 문자열을 부호를 유지한 숫자로 변환합니다. 실패 시 None."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    try:
+        return cast(float(str(value).replace(',', '').replace('+', '').strip()))
+    except ValueError:
+        return None
+
+def normalize_tick(stock_code, tick):
+    """Mock API 필드명/FID가 섞인 체결 데이터를 구독자용 공통 형식으로 정리합니다. 원본은 'raw'에 그대로 둡니다."""
+    price = _number(tick.get('lastPrice') or tick.get('10'))
+    return {
+        'stock_code': stock_code,
+        'price': abs(price) if price is not None else None,
+        'change': _number(tick.get('changeFromPrevDay') or tick.get('11')),
+        'change_rate': _number(tick.get('fluctuationRate') or tick.get('12'), cast=float),
+        'volume': _number(tick.get('tradeVolume') or tick.get('13')),
+        'amount': _number(tick.get('tradeAmount') or tick.get('14')),
+        'trade_time': tick.get('20') or tick.get('tradeTime'),
+        'resync': bool(tick.get('resync')),  # 재연결 후 REST 스냅샷으로 채운 값 (체결 아님)
+        'received_at': time.time(),
+        'raw': tick,
+    }
+
+def topic_matches(topic, patterns):
+    """'*'는 전체, 'tick.*'처럼 '*'로 끝나면 접두어, 그 외는 정확히 일치하는 토픽만 받습니다."""
+    for pattern in patterns:
+        if pattern == '*' or pattern == topic:
+            return True
+        if pattern.endswith('*') and topic.startswith(pattern[:-1]):
+            return True
+    return False
+
+class _Subscriber:
+    """게이트웨이 쪽 구독자 연결 하나. 느린 구독자가 다른 구독자나 수신을 막지 않도록 자체 큐를 둡니다."""
+
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.patterns = set()
+        self.queue = deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.sent_count = 0
+        self.dropped_count = 0
+
+    def push(self, payload):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped_count += 1
+        self.queue.append(payload)
+        self.ready.set()
+
+    async def send_loop(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.queue:
+                self.writer.write(self.queue.popleft())
+                self.sent_count += 1
+            await self.writer.drain()
+
+class RealtimeGateway:
+    """
+    키움 실시간 세션을 가진 프로세스 안에서 체결/조건검색 이벤트를 로컬 구독자에게 다시 배포합니다.
+    구독자는 Unix 도메인 소켓으로 접속해 한 줄짜리 JSON 명령을 보냅니다.
+
+        {"op": "sub", "topics": ["tick.005930", "tick.*", "condition.67"]}
+        {"op": "unsub", "topics": ["tick.005930"]}
+        {"op": "condition", "seq": "67"}   # 업스트림에 실시간 조건검색 요청 (이미 요청 중이면 현재 편입 종목을 다시 받음)
+
+    게이트웨이는 {"topic": ..., "data": ...} 한 줄 JSON을 보냅니다. 메시지는 한 번만 직렬화해 일치하는
+    구독자 모두에게 같은 바이트를 넣으므로 구독자가 늘어도 업스트림 연결과 파싱 비용은 그대로입니다.
+    """
+
+    def __init__(self, socket_path=DEFAULT_GATEWAY_SOCKET, queue_size=SUBSCRIBER_QUEUE_SIZE,
+                 condition_requester=None, logger=None):
+        self.socket_path = socket_path
+        self.queue_size = queue_size
+        self.condition_requester = condition_requester  # async (seq) -> None
+        self.requested_conditions = set()
+        self.logger = logger or logging.getLogger(__name__)
+        self.subscribers = set()
+        self.server = None
+        self.published_count = 0
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # 이전 실행이 남긴 소켓 파일
+        self.server = await asyncio.start_unix_server(self._handle_subscriber, path=self.socket_path)
+        self.logger.info(f"실시간 게이트웨이 시작: {self.socket_path}")
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for subscriber in list(self.subscribers):
+            subscriber.writer.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def _handle_subscriber(self, reader, writer):
+        subscriber = _Subscriber(writer, self.queue_size)
+        self.subscribers.add(subscriber)
+        send_task = asyncio.create_task(subscriber.send_loop())
+        send_task.add_done_callback(lambda task: self._on_send_done(subscriber, task))
+        self.logger.info(f"게이트웨이 구독자 접속: 현재 {len(self.subscribers)}명")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    command = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                await self._handle_command(subscriber, command)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # 구독자 연결 종료 또는 게이트웨이 종료
+        finally:
+            send_task.cancel()
+            self.subscribers.discard(subscriber)
+            writer.close()
+            self.logger.info(
+                f"게이트웨이 구독자 종료: 전송 {subscriber.sent_count}건 / 버림 {subscriber.dropped_count}건, "
+                f"남은 구독자 {len(self.subscribers)}명"
+            )
+
+    def _on_send_done(self, subscriber, task):
+        """전송 태스크의 예외를 회수해 기록하고, 연결을 닫아 읽기 루프도 끝나게 합니다."""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.logger.warning(f"게이트웨이 구독자 전송 실패: {error!r}")
+            subscriber.writer.close()
+
+    async def _handle_command(self, subscriber, command):
+        op = command.get('op')
+        if op == 'sub':
+            subscriber.patterns.update(command.get('topics', []))
+        elif op == 'unsub':
+            subscriber.patterns.difference_update(command.get('topics', []))
+        elif op == 'condition':
+            # 이미 요청 중인 조건식이어도 다시 요청해, 새 구독자도 CNSRREQ 응답으로 현재 편입 종목 전체를 받게 합니다.
+            seq = str(command.get('seq', ''))
+            subscriber.patterns.add(f"condition.{seq}")
+            if seq and self.condition_requester:
+                self.requested_conditions.add(seq)
+                await self.condition_requester(seq)
+
+    def publish(self, topic, data):
+        """topic과 일치하는 구독자에게 data를 보냅니다. 구독자가 없으면 직렬화도 하지 않습니다."""
+        payload = None
+        for subscriber in self.subscribers:
+            if topic_matches(topic, subscriber.patterns):
+                if payload is None:
+                    payload = (json.dumps({'topic': topic, 'data': data}, ensure_ascii=False) + '\n').encode('utf-8')
+                subscriber.push(payload)
+        if payload is not None:
+            self.published_count += 1
+
+    def on_tick(self, stock_code, tick):
+        """
+        WebSocketClient.add_tick_recorder()에 연결합니다. 수신 태스크에서 큐 병합 전에 호출되므로 구독자는
+        같은 종목의 체결을 병합 없이 모두 받습니다. 구독자가 없으면 바로 반환하고, 있으면 직렬화 후
+        구독자별 큐에 넣기만 해 수신을 막지 않습니다.
+        """
+        if self.subscribers:
+            self.publish(f"tick.{stock_code}", normalize_tick(stock_code, tick))
+
+    def on_resync_tick(self, stock_code, tick):
+        """
+        WebSocketClient.add_tick_handler()에 연결합니다. 재연결 후 REST 스냅샷으로 채운 값('resync')은
+        수신 태스크를 거치지 않고 큐에 바로 들어가므로 여기서 배포합니다. 실제 체결은 on_tick이 이미 배포했으므로 건너뜁니다.
+        """
+        if self.subscribers and tick.get('resync'):
+            self.publish(f"tick.{stock_code}", normalize_tick(stock_code, tick))
+
+    def on_message(self, response):
+        """
+        WebSocketClient.add_message_handler()에 연결합니다. 조건검색 응답(CNSR*)과
+        실시간 조건검색 편입/이탈(REAL type '02', FID 841 = 조건식 번호)을 condition.<seq>로 배포합니다.
+        """
+        if not self.subscribers:
+            return
+        trnm = response.get('trnm', '')
+        if trnm.startswith('CNSR'):
+            seq = response.get('seq')
+            self.publish(f"condition.{seq}" if seq is not None else 'condition', response)
+        elif trnm == 'REAL':
+            for entry in response.get('data') or []:
+                if isinstance(entry, dict) and entry.get('type') == '02':
+                    self.publish(f"condition.{entry.get('values', {}).get('841')}", entry)
+
+class GatewaySubscriber:
+    """
+    게이트웨이에 접속하는 로컬 구독자입니다. 업스트림(키움) 연결 없이 체결/조건검색 이벤트를 받습니다.
+
+        subscriber = GatewaySubscriber(['tick.*'])
+        async for topic, data in subscriber.messages():
+            ...
+
+    연결이 끊기면 RECONNECT_DELAY초 후 다시 접속하고 같은 토픽을 다시 구독합니다.
+    """
+
+    def __init__(self, topics, socket_path=DEFAULT_GATEWAY_SOCKET, conditions=()):
+        self.topics = list(topics)
+        self.conditions = [str(seq) for seq in conditions]
+        self.socket_path = socket_path
+        self.writer = None
+
+    async def _connect(self):
+        reader, self.writer = await asyncio.open_unix_connection(self.socket_path, limit=2 ** 20)
+        await self._send({'op': 'sub', 'topics': self.topics})
+        for seq in self.conditions:
+            await self._send({'op': 'condition', 'seq': seq})
+        return reader
+
+    async def _send(self, command):
+        self.writer.write((json.dumps(command) + '\n').encode('utf-8'))
+        await self.writer.drain()
+
+    async def messages(self):
+        while True:
+            try:
+                reader = await self._connect()
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    try:
+                        message = json.loads(line)
+                        topic, data = message['topic'], message['data']
+                    except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as e:
+                        logger.warning(f"게이트웨이 메시지를 해석할 수 없어 건너뜁니다: {e!r} {line[:200]!r}")
+                        continue
+                    yield topic, data
+            except (ConnectionError, FileNotFoundError, asyncio.LimitOverrunError, ValueError) as e:
+                logger.warning(f"게이트웨이 연결 실패: {e}. {RECONNECT_DELAY}초 후 재시도...")
+            finally:
+                if self.writer:
+                    self.writer.close()
+                    self.writer = None
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def run_tick_handlers(self, handlers):
+        """게이트웨이 체결을 기존 실시간 콜백 형식 handler(stock_code, raw_tick)으로 넘깁니다."""
+        async for topic, data in self.messages():
+            if not topic.startswith('tick.'):
+                continue
+            for handler in handlers:
+                try:
+                    handler(data['stock_code'], data['raw'])
+                except Exception as e:
+                    logger.error(f"게이트웨이 체결 콜백 처리 중 오류 발생: {e}")
+
+    async def run_condition_handlers(self, handlers):
+        """
+        게이트웨이 조건검색 이벤트를 WebSocketClient.add_message_handler() 형식 handler(response)로 넘깁니다.
+        CNSR* 응답은 그대로, 편입/이탈(REAL type '02') 항목은 REAL 응답 하나로 감싸서 넘깁니다.
+        """
+        async for topic, data in self.messages():
+            if not topic.startswith('condition'):
+                continue
+            response = data if 'trnm' in data else {'trnm': 'REAL', 'data': [data]}
+            for handler in handlers:
+                try:
+                    handler(response)
+                except Exception as e:
+                    logger.error(f"게이트웨이 조건검색 콜백 처리 중 오류 발생: {e}")
+
+async def _print_messages(topics, socket_path):
+    async for topic, data in GatewaySubscriber(topics, socket_path).messages():
+        if topic.startswith('tick.'):
+            data = {key: value for key, value in data.items() if key != 'raw'}
+        print(json.dumps({'topic': topic, 'data': data}, ensure_ascii=False), flush=True)
+
+if __name__ == '__main__':
+    # 사용법: python realtime_gateway.py tick.005930 condition.*  (토픽 생략 시 전체)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_print_messages(sys.argv[1:] or ['*'], os.environ.get('KIWOOM_GATEWAY_SOCKET', DEFAULT_GATEWAY_SOCKET)))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import datetime
+import json
+import logging
+import os
+import time
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..', '..'))
+
+# api/realtime_metrics.php가 읽는 지연 지표 스냅샷 (메모리 기반 /dev/shm, 없으면 data/)
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else os.path.join(PROJECT_ROOT, 'data')
+METRICS_FILE = os.path.join(SHM_DIR, 'kiwoom_realtime_metrics.json')
+SNAPSHOT_INTERVAL = 5   # 초, 지표 파일 갱신 주기
+REPORT_INTERVAL = 60    # 초, 요약 로그 주기 (로그는 직전 주기 구간만 요약, 지표 파일은 시작 후 누적)
+
+# 히스토그램 구간 상한 (ms). 마지막 구간은 그 이상 전부
+BUCKET_BOUNDS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000, 30000, 60000,
+)
+
+# --- 단계 이름 ---
+# decode            : 프레임 수신(recv 반환) → JSON 디코딩 완료
+# queue_wait        : 수신 큐에 넣음 → 처리 태스크가 꺼냄
+# process           : 꺼낸 체결 하나의 처리 전체 (필드 변환 + DB 쓰기 요청 + 콜백)
+# handler:<이름>    : 개별 콜백 (봉 집계, 공유 메모리 시세, 게이트웨이 배포 등)
+# db_commit         : DB 쓰기 요청 → 쓰기 스레드 커밋 완료
+# exchange_to_receive / exchange_to_visible / exchange_to_db
+#                   : 체결시간(FID '20') → 수신 / 콜백 반영(공유 메모리 등) / DB 커밋
+#                     체결시간이 초 단위라 이 세 값은 최대 1초의 양자화 오차가 있습니다.
+STAGE_ORDER = ('decode', 'queue_wait', 'process', 'db_commit',
+               'exchange_to_receive', 'exchange_to_visible', 'exchange_to_db')
+
+class LatencyHistogram:
+    """고정 구간 지연 히스토그램입니다. 관측 하나가 bisect 한 번과 정수 증가뿐이라 체결마다 호출해도 가볍습니다."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        if value_ms < 0:
+            value_ms = 0.0
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def copy(self):
+        histogram = LatencyHistogram()
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.max = self.max
+        return histogram
+
+    def since(self, base):
+        """base(이전 시점의 copy()) 이후 관측만 담은 히스토그램을 반환합니다.
+        구간 최댓값은 따로 세지 않으므로 관측이 있는 가장 높은 구간의 상한(누적 최댓값 이하)으로 근사합니다."""
+        histogram = LatencyHistogram()
+        histogram.counts = [now - before for now, before in zip(self.counts, base.counts)]
+        histogram.count = self.count - base.count
+        histogram.total = self.total - base.total
+        top = max((i for i, bucket_count in enumerate(histogram.counts) if bucket_count), default=None)
+        if top is not None:
+            histogram.max = min(BUCKET_BOUNDS_MS[top], self.max) if top < len(BUCKET_BOUNDS_MS) else self.max
+        return histogram
+
+    def percentile(self, p):
+        """p(0~100) 백분위가 속한 구간의 상한(ms)을 반환합니다. 관측 최댓값을 넘지 않습니다."""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return min(BUCKET_BOUNDS_MS[i], self.max) if i < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_ms': self.total,
+            'avg_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max, 3),
+            'buckets': dict(zip([str(bound) for bound in BUCKET_BOUNDS_MS] + ['+Inf'], self.counts)),
+        }
+
+class ExchangeClock:
+    """체결시간(FID '20', HHMMSS)을 오늘 날짜의 epoch 초로 바꿉니다. 자정 기준값은 날짜가 바뀔 때만 다시 계산합니다."""
+
+    def __init__(self):
+        self.midnight = 0.0
+
+    def to_epoch(self, tick, now):
+        value = tick.get('20') or tick.get('tradeTime')
+        if not value or tick.get('resync'):
+            return None  # 체결시간이 없거나 REST 재동기화로 채운 값
+        value = str(value).strip()
+        if len(value) != 6 or not value.isdigit():
+            return None
+        if not self.midnight <= now < self.midnight + 86400:
+            self.midnight = time.mktime(datetime.date.fromtimestamp(now).timetuple())
+        return self.midnight + int(value[:2]) * 3600 + int(value[2:4]) * 60 + int(value[4:])
+
+class RealtimeLatencyMetrics:
+    """
+    실시간 경로의 단계별 지연 히스토그램을 모읍니다. 한 프로세스의 모든 연결이 하나를 공유합니다.
+    히스토그램은 프로세스가 떠 있는 동안 초기화하지 않고 누적합니다 (Prometheus 히스토그램의 _bucket/_count/_sum은
+    단조 증가해야 함). 요약 로그용 구간 통계는 구간 시작 시점의 사본(window_base)과의 차이로 계산합니다.
+    db_commit/exchange_to_db는 쓰기 스레드만, 나머지 단계는 이벤트 루프 스레드만 기록하므로
+    히스토그램마다 기록하는 스레드가 하나뿐이라 잠금이 필요 없습니다. 기본 단계 히스토그램은 미리 만들어 두어
+    쓰기 스레드가 dict에 새 키를 넣는 일이 없습니다 (handler:<이름>은 이벤트 루프 스레드에서만 추가).
+    """
+
+    def __init__(self, metrics_path=METRICS_FILE, logger=None):
+        self.metrics_path = metrics_path
+        self.logger = logger or logging.getLogger(__name__)
+        self.clock = ExchangeClock()
+        self.histograms = {stage: LatencyHistogram() for stage in STAGE_ORDER}
+        self.started_at = time.time()
+        self.start_window()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        return histogram
+
+    def observe(self, stage, value_ms):
+        self.histogram(stage).observe(value_ms)
+
+    def exchange_time(self, tick, now=None):
+        return self.clock.to_epoch(tick, now or time.time())
+
+    def observe_exchange(self, stage, tick, now=None):
+        """체결시간 대비 지연을 기록합니다. 체결시간이 없으면 건너뜁니다."""
+        now = now or time.time()
+        exchange_ts = self.clock.to_epoch(tick, now)
+        if exchange_ts is not None:
+            self.histogram(stage).observe((now - exchange_ts) * 1000)
+
+    def sorted_stages(self):
+        histograms = dict(self.histograms)
+        stages = sorted(histograms, key=lambda stage: (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage))
+        return [(stage, histograms[stage]) for stage in stages]
+
+    def snapshot(self):
+        """시작 후 누적 통계입니다. (api/realtime_metrics.php가 Prometheus 히스토그램으로 내보냄)"""
+        return {
+            'started_at': self.started_at,
+            'updated_at': time.time(),
+            'stages': {stage: histogram.summary() for stage, histogram in self.sorted_stages()},
+        }
+
+    def window_summaries(self):
+        """window_started 이후 구간 통계입니다. (요약 로그용)"""
+        empty = LatencyHistogram()
+        return {stage: histogram.since(self.window_base.get(stage, empty)).summary()
+                for stage, histogram in self.sorted_stages()}
+
+    def write_snapshot(self):
+        """임시 파일에 쓴 뒤 교체해 읽는 쪽이 쓰다 만 JSON을 보지 않도록 합니다."""
+        os.makedirs(os.path.dirname(self.metrics_path), exist_ok=True)
+        tmp_path = f"{self.metrics_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.metrics_path)
+
+    def summary_line(self):
+        parts = []
+        for stage, summary in self.window_summaries().items():
+            if summary['count']:
+                parts.append(f"{stage} p50 {summary['p50_ms']:.3g}/p99 {summary['p99_ms']:.3g}/max {summary['max_ms']:.3g}ms ({summary['count']})")
+        return "실시간 지연 " + (", ".join(parts) if parts else "관측 없음")
+
+    def start_window(self):
+        """요약 로그 구간을 새로 시작합니다. 누적 히스토그램은 그대로 두고 현재 값의 사본만 떠 둡니다."""
+        self.window_base = {stage: histogram.copy() for stage, histogram in self.sorted_stages()}
+        self.window_started = time.time()
+
+    async def run_report_loop(self, snapshot_interval=SNAPSHOT_INTERVAL, report_interval=REPORT_INTERVAL):
+        """snapshot_interval마다 누적 지표 파일을 갱신하고, report_interval마다 직전 구간 요약 로그를 남긴 뒤 새 구간을 시작합니다."""
+        last_report = time.monotonic()
+        while True:
+            await asyncio.sleep(snapshot_interval)
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                self.logger.error(f"지연 지표 저장 중 오류 발생: {e}")
+            if time.monotonic() - last_report >= report_interval:
+                self.logger.info(self.summary_line())
+                self.start_window()
+                last_report = time.monotonic()
+
+def load_metrics(path=METRICS_FILE):
+    """지연 지표 스냅샷을 읽습니다. 없거나 읽을 수 없으면 None."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+if __name__ == '__main__':
+    # 사용법: python realtime_latency.py — 현재 지연 지표 요약 출력
+    metrics = load_metrics()
+    print(json.dumps(metrics, ensure_ascii=False, indent=2) if metrics else "지연 지표 파일이 없습니다. realtime_data_updater.py 실행 여부를 확인하세요.")
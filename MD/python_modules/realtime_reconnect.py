@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+
+# --- 재연결 설정 ---
+RECONNECT_BASE_DELAY = 0.5    # 초, 첫 재시도 대기 상한 (지터 적용)
+RECONNECT_MAX_DELAY = 30      # 초, 연속 실패 시 대기 상한
+TOKEN_REFRESH_MIN_INTERVAL = 10  # 초, 여러 연결이 동시에 인증 실패해도 토큰은 한 번만 재발급
+
+# --- 재동기화 설정 ---
+RESYNC_GRACE = 2              # 초, 재등록 후 실시간 체결로 바로 최신이 되는 종목은 REST 조회에서 제외
+RESYNC_RATE = 10              # 초당 ka10001 요청 수 (전체 연결 공유)
+
+class ReconnectBackoff:
+    """
+    지터를 준 지수 백오프입니다 (full jitter: 0 ~ min(상한, 기본값 × 2^시도)).
+    첫 재시도는 1초 안에 이루어지고, 여러 연결이 동시에 끊겨도 재접속 시점이 흩어집니다.
+    """
+
+    def __init__(self, base_delay=RECONNECT_BASE_DELAY, max_delay=RECONNECT_MAX_DELAY):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** self.attempt)))
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+class AccessTokenProvider:
+    """
+    여러 실시간 연결과 재동기화가 공유하는 접근 토큰입니다.
+    인증 실패 시 refresh(실패한 토큰)를 부르면, 다른 연결이 이미 새 토큰을 받았으면 그 토큰을 돌려주고
+    아니면 issue_token(동기 함수, 새 토큰 또는 None 반환)을 별도 스레드에서 한 번만 호출합니다.
+    """
+
+    def __init__(self, token, issue_token=None, logger=None):
+        self.token = token
+        self.issue_token = issue_token
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = asyncio.Lock()
+        self.refreshed_at = 0.0
+
+    async def refresh(self, failed_token=None):
+        async with self.lock:
+            if failed_token is not None and failed_token != self.token:
+                return self.token  # 다른 연결이 이미 재발급함
+            if self.issue_token is None or time.monotonic() - self.refreshed_at < TOKEN_REFRESH_MIN_INTERVAL:
+                return self.token
+            new_token = await asyncio.to_thread(self.issue_token)
+            self.refreshed_at = time.monotonic()
+            if new_token:
+                self.token = new_token
+                self.logger.info("접근 토큰을 재발급했습니다.")
+            else:
+                self.logger.error("접근 토큰 재발급에 실패했습니다. 기존 토큰으로 재시도합니다.")
+            return self.token
+
+def basic_info_to_tick(basic_info, previous_tick=None):
+    """
+    ka10001 응답을 실시간 체결과 같은 형식으로 바꿉니다. ka10001에 없는 거래대금 등은
+    마지막 실시간 체결 값을 유지해 재동기화가 값을 0으로 덮어쓰지 않도록 합니다.
+    """
+    output = basic_info.get('output') or basic_info
+    if isinstance(output, list):
+        output = output[0] if output else {}
+    if not output.get('cur_prc'):
+        return None
+    tick = dict(previous_tick or {})
+    tick.update({
+        'lastPrice': str(output['cur_prc']).replace('+', '').replace('-', ''),
+        'changeFromPrevDay': str(output.get('pred_pre', '0')).replace('+', ''),
+        'fluctuationRate': str(output.get('flu_rt', '')),
+        'tradeVolume': str(output.get('trde_qty', '0')),
+        'resync': '1',  # REST 스냅샷으로 채운 값 표시
+    })
+    return tick
+
+class SnapshotResyncer:
+    """
+    재연결 후 끊긴 동안 체결을 놓쳤을 수 있는 종목만 ka10001로 다시 조회해 실시간 처리 경로에 넣습니다.
+    넣는 값에는 'resync' 표시가 붙으며, 체결 단위로 누적하는 콜백(봉 집계 등)은 이 값을 체결로 세지 않습니다.
+    초당 rate건씩 묶어 동시에 요청하며, 요청 한도는 모든 연결이 공유합니다.
+    fetch(token, stock_code)는 동기 함수로 ka10001 응답 dict 또는 None을 반환하고, 인증 실패 시 PermissionError를 냅니다.
+    """
+
+    def __init__(self, fetch, token_provider, rate=RESYNC_RATE, grace=RESYNC_GRACE, logger=None):
+        self.fetch = fetch
+        self.logger = logger or logging.getLogger(__name__)
+        self.token_provider = token_provider
+        self.rate = max(1, rate)
+        self.grace = grace
+        self.lock = asyncio.Lock()  # 여러 연결이 동시에 재동기화해도 요청 한도를 넘지 않도록 순서대로 실행
+        self.resynced_count = 0
+
+    async def _fetch_one(self, stock_code):
+        token = self.token_provider.token
+        try:
+            return await asyncio.to_thread(self.fetch, token, stock_code)
+        except PermissionError:
+            token = await self.token_provider.refresh(token)
+            try:
+                return await asyncio.to_thread(self.fetch, token, stock_code)
+            except PermissionError:
+                return None
+
+    async def resync(self, client, resumed_at):
+        """
+        client의 구독 종목 중 이번 실행에서 체결이 있었고, 마지막 체결이 재연결(resumed_at, monotonic) 이전인 종목을 조회합니다.
+        한 번도 체결이 없던 종목은 끊긴 동안에도 값이 바뀌었을 가능성이 낮아 조회하지 않습니다
+        (전 종목을 구독해도 재동기화가 수백 초씩 걸리지 않도록).
+        최근에 체결이 있던 종목일수록 끊긴 동안 값이 바뀌었을 가능성이 커서 먼저 조회합니다.
+        """
+        await asyncio.sleep(self.grace)
+        subscribed = set(client.subscribed_codes())
+        stale = [code for code, ticked_at in client.last_tick_at.items() if code in subscribed and ticked_at < resumed_at]
+        if not stale:
+            return 0
+        stale.sort(key=lambda code: client.last_tick_at.get(code, 0), reverse=True)
+        started = time.monotonic()
+        applied = 0
+        async with self.lock:
+            for i in range(0, len(stale), self.rate):
+                batch_started = time.monotonic()
+                batch = stale[i:i + self.rate]
+                results = await asyncio.gather(*(self._fetch_one(code) for code in batch))
+                for code, basic_info in zip(batch, results):
+                    # 조회하는 동안 실시간 체결이 들어온 종목은 그 값이 더 최신이므로 건너뜀
+                    if not basic_info or client.last_tick_at.get(code, 0) >= resumed_at:
+                        continue
+                    tick = basic_info_to_tick(basic_info, client.last_tick_data.get(code))
+                    if tick:
+                        client.tick_queue.put_nowait(code, tick)
+                        applied += 1
+                remaining = 1.0 - (time.monotonic() - batch_started)
+                if remaining > 0 and i + self.rate < len(stale):
+                    await asyncio.sleep(remaining)
+        self.resynced_count += applied
+        self.logger.info(
+            f"재연결 후 스냅샷 재동기화: 대상 {len(stale)}종목 중 {applied}종목 반영 ({time.monotonic() - started:.1f}초)"
+        )
+        return applied
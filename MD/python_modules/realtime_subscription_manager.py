@@ -0,0 +1,257 @@
+import asyncio
+import logging
+
+# --- 기본 구독 한도 (config.ini의 [REALTIME] 섹션으로 조정) ---
+DEFAULT_GROUP_SIZE = 100            # REG 그룹 하나에 등록할 최대 종목 수 (Mock API 허용 개수)
+DEFAULT_GROUPS_PER_CONNECTION = 10  # 연결 하나에서 사용할 최대 그룹 수
+DEFAULT_MAX_CONNECTIONS = 3         # 동시에 유지할 최대 WebSocket 연결 수
+
+class RealtimeSubscriptionManager:
+    """
+    전종목 실시간 구독을 여러 WebSocket 연결(샤드)과 연결별 REG 그룹으로 나눠 관리합니다.
+
+    - apply(codes): 구독해야 할 종목 목록(우선순위 순)을 받아 현재 구독 상태와의 차이만
+      REMOVE/REG(refresh=1)로 보냅니다. 새 종목은 가장 여유 있는 연결의 빈 그룹에 배치하고,
+      모든 연결이 가득 차면 max_connections까지 연결을 새로 엽니다.
+      총 수용량(capacity)을 넘는 종목은 목록 뒤쪽부터 제외됩니다.
+    - rebalance(): 종목 추가/삭제로 연결 간 부하 차이가 한 그룹 크기를 넘으면 종목을 옮기고,
+      비어 있는 연결은 닫습니다.
+    - follow_universe(): 주기적으로 종목 목록(필요하면 급등 종목을 맨 앞에)을 다시 읽어
+      apply()해서 프로세스 재시작 없이 구독을 교체합니다.
+
+    각 연결은 client_factory()가 만든 WebSocketClient이며, 그룹 구성은 client.subscription_groups에
+    그대로 보관되므로 재연결 후 로그인되면 클라이언트가 현재 그룹 전체를 바로 다시 등록합니다.
+    """
+
+    def __init__(self, client_factory, group_size=DEFAULT_GROUP_SIZE,
+                 groups_per_connection=DEFAULT_GROUPS_PER_CONNECTION,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, logger=None):
+        self.client_factory = client_factory
+        self.group_size = group_size
+        self.groups_per_connection = groups_per_connection
+        self.max_connections = max_connections
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.clients = []
+        self.assignment = {}  # stock_code -> (client, group_no)
+        self.tick_handlers = []
+        self.tick_recorders = []
+        self.message_handlers = []
+        self.run_tasks = {}   # client -> run() 태스크
+        self.running = False
+        self.lock = asyncio.Lock()  # apply/rebalance가 동시에 구독 상태를 바꾸지 않도록
+
+    @property
+    def capacity(self):
+        return self.group_size * self.groups_per_connection * self.max_connections
+
+    def add_tick_handler(self, handler):
+        """모든 연결(이후 새로 여는 연결 포함)에 실시간 체결 콜백을 등록합니다."""
+        self.tick_handlers.append(handler)
+        for client in self.clients:
+            client.add_tick_handler(handler)
+
+    def add_tick_recorder(self, recorder):
+        """모든 연결에 큐 이전 단계의 체결 기록 콜백(체결 저널 등)을 등록합니다."""
+        self.tick_recorders.append(recorder)
+        for client in self.clients:
+            client.add_tick_recorder(recorder)
+
+    def add_message_handler(self, handler):
+        """모든 연결에 REAL/PING/LOGIN 이외 응답(조건검색 등) 콜백을 등록합니다."""
+        self.message_handlers.append(handler)
+        for client in self.clients:
+            client.add_message_handler(handler)
+
+    def load_of(self, client):
+        return sum(len(codes) for codes in client.subscription_groups.values())
+
+    def subscribed_codes(self):
+        return set(self.assignment)
+
+    def _new_client(self):
+        client = self.client_factory()
+        client.subscription_groups = {}
+        for handler in self.tick_handlers:
+            client.add_tick_handler(handler)
+        for recorder in self.tick_recorders:
+            client.add_tick_recorder(recorder)
+        for handler in self.message_handlers:
+            client.add_message_handler(handler)
+        self.clients.append(client)
+        if self.running:
+            self.run_tasks[client] = asyncio.create_task(client.run())
+        self.logger.info(f"실시간 연결 추가: 현재 {len(self.clients)}개 연결")
+        return client
+
+    def _free_group(self, client):
+        """연결 안에서 자리가 남은 그룹 번호를 반환합니다 (없으면 None)."""
+        for group_no in range(1, self.groups_per_connection + 1):
+            if len(client.subscription_groups.get(group_no, ())) < self.group_size:
+                return group_no
+        return None
+
+    def _free_slot(self):
+        """가장 여유 있는 연결의 빈 그룹을 (client, group_no)로 반환합니다. 필요하면 연결을 새로 엽니다."""
+        for client in sorted(self.clients, key=self.load_of):
+            group_no = self._free_group(client)
+            if group_no is not None:
+                return client, group_no
+        if len(self.clients) < self.max_connections:
+            client = self._new_client()
+            return client, 1
+        return None
+
+    def _assign(self, code, client, group_no, adds):
+        client.subscription_groups.setdefault(group_no, set()).add(code)
+        self.assignment[code] = (client, group_no)
+        adds.setdefault((client, group_no), []).append(code)
+
+    def _unassign(self, code, removes):
+        client, group_no = self.assignment.pop(code)
+        group = client.subscription_groups.get(group_no)
+        if group is not None:
+            group.discard(code)
+            if not group:
+                del client.subscription_groups[group_no]
+        removes.setdefault((client, group_no), []).append(code)
+
+    async def _send_changes(self, removes, adds):
+        # 해지 먼저 보내 그룹 자리를 비운 뒤 등록
+        for (client, group_no), codes in removes.items():
+            await client.remove_codes(group_no, codes)
+        for (client, group_no), codes in adds.items():
+            await client.register_codes(group_no, codes)
+
+    async def apply(self, codes):
+        """
+        구독 목록을 codes(우선순위 순)로 맞춥니다. 이미 구독 중인 종목은 그대로 두고 차이만 반영합니다.
+        반환값: (추가 종목 수, 해지 종목 수, 수용량 초과로 제외된 종목 수)
+        """
+        async with self.lock:
+            desired = list(dict.fromkeys(codes))
+            skipped = max(0, len(desired) - self.capacity)
+            desired = desired[:self.capacity]
+            desired_set = set(desired)
+
+            # 필요한 연결 수만큼 미리 열어 두어 새 종목이 처음부터 고르게 나뉘도록 함
+            per_connection = self.group_size * self.groups_per_connection
+            needed = min(self.max_connections, -(-len(desired) // per_connection))
+            while len(self.clients) < needed:
+                self._new_client()
+
+            removes, adds = {}, {}
+            for code in [c for c in self.assignment if c not in desired_set]:
+                self._unassign(code, removes)
+            for code in desired:
+                if code in self.assignment:
+                    continue
+                slot = self._free_slot()
+                if slot is None:  # 수용량 안에서는 발생하지 않지만 방어적으로 처리
+                    skipped += 1
+                    continue
+                self._assign(code, slot[0], slot[1], adds)
+
+            await self._send_changes(removes, adds)
+            added = sum(len(v) for v in adds.values())
+            removed = sum(len(v) for v in removes.values())
+            if added or removed:
+                self.logger.info(
+                    f"실시간 구독 갱신: 추가 {added} / 해지 {removed} / 제외 {skipped}, "
+                    f"총 {len(self.assignment)}종목 ({len(self.clients)}개 연결: "
+                    f"{', '.join(str(self.load_of(c)) for c in self.clients)})"
+                )
+        await self.rebalance()
+        return added, removed, skipped
+
+    async def rebalance(self):
+        """
+        종목이 줄어 더 적은 연결로 충분하면 가장 한가한 연결의 종목을 다른 연결로 옮겨 닫고,
+        연결 간 종목 수 차이가 한 그룹 크기를 넘으면 종목을 옮겨 고르게 맞춥니다.
+        """
+        async with self.lock:
+            removes, adds = {}, {}
+            per_connection = self.group_size * self.groups_per_connection
+            needed = max(1, -(-len(self.assignment) // per_connection))
+            while len(self.clients) > needed:
+                lightest = min(self.clients, key=self.load_of)
+                others = [c for c in self.clients if c is not lightest]
+                for code in [c for codes in lightest.subscription_groups.values() for c in codes]:
+                    target = min(others, key=self.load_of)
+                    self._unassign(code, removes)
+                    self._assign(code, target, self._free_group(target), adds)
+                await self._close_client(lightest)
+
+            while len(self.clients) > 1:
+                heaviest = max(self.clients, key=self.load_of)
+                lightest = min(self.clients, key=self.load_of)
+                if self.load_of(heaviest) - self.load_of(lightest) <= self.group_size:
+                    break
+                group_no = self._free_group(lightest)
+                if group_no is None:
+                    break
+                # 가장 큰 그룹에서 옮길 종목을 고름
+                source_group = max(heaviest.subscription_groups, key=lambda g: len(heaviest.subscription_groups[g]))
+                code = next(iter(heaviest.subscription_groups[source_group]))
+                self._unassign(code, removes)
+                self._assign(code, lightest, group_no, adds)
+
+            moved = sum(len(v) for v in adds.values())
+            if moved:
+                await self._send_changes(removes, adds)
+                self.logger.info(f"실시간 구독 재분배: {moved}종목 이동")
+
+            for client in [c for c in self.clients if not c.subscription_groups]:
+                if len(self.clients) == 1:
+                    break
+                await self._close_client(client)
+
+    async def _close_client(self, client):
+        self.clients.remove(client)
+        task = self.run_tasks.pop(client, None)
+        await client.disconnect()
+        if task:
+            task.cancel()
+        self.logger.info(f"빈 실시간 연결 종료: 현재 {len(self.clients)}개 연결")
+
+    def start(self):
+        """모든 연결의 run() 태스크를 시작합니다. 이후 새로 여는 연결도 바로 시작됩니다."""
+        self.running = True
+        for client in self.clients:
+            if client not in self.run_tasks:
+                self.run_tasks[client] = asyncio.create_task(client.run())
+        return list(self.run_tasks.values())
+
+    async def wait(self):
+        """연결이 추가/종료되어도 모든 연결이 끝날 때까지 기다립니다."""
+        while self.running and self.run_tasks:
+            await asyncio.wait(list(self.run_tasks.values()), return_when=asyncio.FIRST_COMPLETED)
+            for client, task in list(self.run_tasks.items()):
+                if task.done():
+                    del self.run_tasks[client]
+
+    async def follow_universe(self, load_universe, load_top_movers=None, interval=60, top_n=100):
+        """
+        interval초마다 load_universe()로 전체 종목을 다시 읽어 추가/삭제된 종목을 반영합니다.
+        load_top_movers(top_n)를 주면 급등 종목을 목록 맨 앞에 두어, 수용량이 전종목보다 작을 때도
+        급등 종목이 항상 구독되도록 교체합니다. 두 함수는 동기 함수이며 스레드에서 실행됩니다.
+        """
+        while self.running:
+            try:
+                universe = await asyncio.to_thread(load_universe)
+                top_codes = await asyncio.to_thread(load_top_movers, top_n) if load_top_movers else []
+                if universe:  # DB 오류로 빈 목록이 오면 기존 구독 유지
+                    await self.apply(list(top_codes) + list(universe))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.logger.error(f"실시간 구독 목록 갱신 중 오류 발생: {e}")
+            await asyncio.sleep(interval)
+
+    async def shutdown(self):
+        self.running = False
+        for client in list(self.clients):
+            await client.disconnect()
+        for task in self.run_tasks.values():
+            task.cancel()
+        self.run_tasks = {}
@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+
+# --- 큐 정책 ---
+# coalesce    : 종목당 대기 항목을 하나만 두고 최신 값으로 덮어씀 (가득 차면 가장 오래된 종목을 버림)
+# drop_oldest : 모든 체결을 순서대로 보관하고, 가득 차면 가장 오래된 체결을 버림
+# drop_newest : 모든 체결을 순서대로 보관하고, 가득 차면 새로 들어온 체결을 버림
+QUEUE_POLICIES = ('coalesce', 'drop_oldest', 'drop_newest')
+DEFAULT_QUEUE_SIZE = 5000
+
+class RealtimeTickQueue:
+    """
+    수신 태스크와 처리 태스크 사이에 두는 크기 제한 실시간 체결 큐입니다.
+    put_nowait()는 await 없이 바로 돌아가므로 수신 태스크가 처리 속도에 묶이지 않고,
+    처리 태스크가 밀리면 정책(policy)에 따라 같은 종목을 합치거나 체결을 버립니다.
+    큐 길이, 대기 시간(lag), 합침/버림 건수를 stats()로 제공합니다.
+    asyncio 이벤트 루프 한 스레드 안에서만 사용합니다.
+    """
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, policy='coalesce'):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"지원하지 않는 큐 정책입니다: {policy} (가능: {', '.join(QUEUE_POLICIES)})")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.entries = OrderedDict()  # key -> [stock_code, data, 첫 대기 시각]
+        self.seq = itertools.count()
+        self.not_empty = asyncio.Event()
+
+        self.enqueued_count = 0
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        self.processed_count = 0
+        self.reset_window()
+
+    def reset_window(self):
+        """주기 요약 로그용 구간 통계를 초기화합니다."""
+        self.window_max_depth = len(self.entries)
+        self.window_max_lag = 0.0
+        self.window_lag_sum = 0.0
+        self.window_count = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put_nowait(self, stock_code, data):
+        """체결 하나를 넣습니다. drop_newest 정책에서 버려졌으면 False를 반환합니다."""
+        now = time.monotonic()
+        self.enqueued_count += 1
+
+        if self.policy == 'coalesce':
+            entry = self.entries.get(stock_code)
+            if entry is not None:
+                # 대기 순서와 첫 대기 시각은 유지하고 값만 최신으로 교체
+                entry[1] = data
+                self.coalesced_count += 1
+                return True
+            key = stock_code
+        else:
+            key = next(self.seq)
+
+        if len(self.entries) >= self.maxsize:
+            if self.policy == 'drop_newest':
+                self.dropped_count += 1
+                return False
+            self.entries.popitem(last=False)
+            self.dropped_count += 1
+
+        self.entries[key] = [stock_code, data, now]
+        if len(self.entries) > self.window_max_depth:
+            self.window_max_depth = len(self.entries)
+        self.not_empty.set()
+        return True
+
+    def get_nowait(self):
+        """가장 오래 기다린 체결을 (stock_code, data, lag초)로 꺼냅니다. 비어 있으면 None."""
+        if not self.entries:
+            return None
+        _, (stock_code, data, enqueued_at) = self.entries.popitem(last=False)
+        lag = time.monotonic() - enqueued_at
+        self.processed_count += 1
+        self.window_count += 1
+        self.window_lag_sum += lag
+        if lag > self.window_max_lag:
+            self.window_max_lag = lag
+        return stock_code, data, lag
+
+    async def wait(self):
+        """꺼낼 체결이 생길 때까지 기다립니다."""
+        while not self.entries:
+            self.not_empty.clear()
+            await self.not_empty.wait()
+
+    def stats(self):
+        avg_lag = self.window_lag_sum / self.window_count if self.window_count else 0.0
+        return {
+            'policy': self.policy,
+            'depth': len(self.entries),
+            'max_depth': self.window_max_depth,
+            'avg_lag_ms': avg_lag * 1000,
+            'max_lag_ms': self.window_max_lag * 1000,
+            'enqueued': self.enqueued_count,
+            'processed': self.processed_count,
+            'coalesced': self.coalesced_count,
+            'dropped': self.dropped_count,
+        }
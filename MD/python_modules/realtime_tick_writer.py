@@ -0,0 +1,128 @@
+import logging
+import sqlite3
+import threading
+import time
+
+# --- 기본 설정 ---
+DEFAULT_FLUSH_INTERVAL = 1.0  # 초 단위 최대 쓰기 지연
+DEFAULT_MAX_PENDING = 500     # 대기 종목 수가 이 값을 넘으면 주기를 기다리지 않고 바로 기록
+
+class RealtimeTickWriter:
+    """
+    실시간 체결 데이터를 모아서 기록하는 write-behind 싱크입니다.
+    수신 루프는 submit()으로 종목별 최신 값만 메모리에 덮어쓰고 바로 돌아가며,
+    전용 쓰기 스레드가 주기(flush_interval) 또는 대기 종목 수(max_pending) 기준으로
+    하나의 SQLite 연결에서 executemany + 한 번의 트랜잭션으로 반영합니다.
+    같은 종목의 체결이 주기 안에 여러 번 오면 마지막 값 한 건만 기록됩니다.
+
+    update_sql은 submit()에 넘긴 params 튜플을 그대로 받는 UPDATE 문이어야 하며,
+    스키마 확인(컬럼 추가 등)은 호출하는 쪽에서 시작 시 한 번만 수행합니다.
+
+    metrics(RealtimeLatencyMetrics)를 주면 쓰기 요청 → 커밋(db_commit)과 체결시간 → 커밋(exchange_to_db)
+    지연을 쓰기 스레드에서 기록합니다.
+    """
+
+    def __init__(self, db_file, update_sql, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_pending=DEFAULT_MAX_PENDING, logger=None, metrics=None):
+        self.db_file = db_file
+        self.metrics = metrics
+        self.update_sql = update_sql
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = None
+
+        # 통계 (summary 로그용)
+        self.submitted_count = 0
+        self.written_count = 0
+        self.flush_count = 0
+        self.error_count = 0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name='realtime-tick-writer', daemon=True)
+        self.thread.start()
+        self.logger.info(f"실시간 데이터 쓰기 스레드 시작 (주기 {self.flush_interval}초, 최대 대기 {self.max_pending}종목)")
+
+    def submit(self, key, params, exchange_ts=None):
+        """
+        종목(key)의 최신 UPDATE 파라미터를 등록합니다. 이벤트 루프 스레드에서 호출해도 DB를 기다리지 않습니다.
+        exchange_ts는 체결시간(epoch 초)으로 지연 지표에만 쓰입니다.
+        """
+        entry = (params, time.monotonic(), exchange_ts)
+        with self.lock:
+            self.pending[key] = entry
+            self.submitted_count += 1
+            pending_count = len(self.pending)
+        if pending_count >= self.max_pending:
+            self.wakeup.set()
+
+    def _take_pending(self):
+        with self.lock:
+            batch = self.pending
+            self.pending = {}
+        return batch
+
+    def _write_batch(self, conn, batch):
+        try:
+            with conn:  # 한 트랜잭션으로 커밋, 실패 시 롤백
+                conn.executemany(self.update_sql, [entry[0] for entry in batch.values()])
+            self.written_count += len(batch)
+            self.flush_count += 1
+            if self.metrics:
+                self._observe_commit(batch)
+        except sqlite3.Error as e:
+            self.error_count += 1
+            self.logger.error(f"실시간 데이터 일괄 기록 중 오류 발생 ({len(batch)}종목): {e}")
+            # 기록하지 못한 값은 그 사이 들어온 더 최신 값이 없을 때만 다음 주기에 다시 시도
+            with self.lock:
+                for key, entry in batch.items():
+                    self.pending.setdefault(key, entry)
+
+    def _observe_commit(self, batch):
+        committed = time.monotonic()
+        committed_wall = time.time()
+        commit_histogram = self.metrics.histogram('db_commit')
+        exchange_histogram = self.metrics.histogram('exchange_to_db')
+        for _, submitted, exchange_ts in batch.values():
+            commit_histogram.observe((committed - submitted) * 1000)
+            if exchange_ts is not None:
+                exchange_histogram.observe((committed_wall - exchange_ts) * 1000)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        try:
+            while True:
+                self.wakeup.wait(self.flush_interval)
+                self.wakeup.clear()
+                batch = self._take_pending()
+                if batch:
+                    self._write_batch(conn, batch)
+                if self.stopping:
+                    # 종료 직전까지 들어온 값을 마저 기록
+                    batch = self._take_pending()
+                    if batch:
+                        self._write_batch(conn, batch)
+                    break
+        finally:
+            conn.close()
+
+    def stop(self, timeout=10):
+        """남은 값을 모두 기록한 뒤 쓰기 스레드를 종료합니다."""
+        if not self.thread:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join(timeout)
+        self.thread = None
+        self.logger.info(
+            f"실시간 데이터 쓰기 스레드 종료: 수신 {self.submitted_count}건 → 기록 {self.written_count}건 "
+            f"({self.flush_count}회 일괄 기록, 오류 {self.error_count}회)"
+        )
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import bisect
+import datetime
+import logging
+import os
+import struct
+import time
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.join(CURRENT_DIR, '..')
+JOURNAL_DIR = os.path.join(PROJECT_ROOT, 'data', 'tick_journal')
+
+logger = logging.getLogger(__name__)
+
+# --- 저널 형식 ---
+# 일자별 세그먼트: YYYYMMDD.ticks (헤더 16바이트 + 고정 크기 레코드), YYYYMMDD.idx (색인 지점)
+# 레코드(48바이트): 수신시각 ns(int64) + 종목코드(8s) + 현재가(int32) + 전일대비(int32) + 등락률(float32)
+#                  + 누적거래량(int64) + 누적거래대금(int64) + 체결시간 HHMMSS(uint32)
+JOURNAL_MAGIC = b'KTICKJ01'
+HEADER_FORMAT = '<8sII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD = struct.Struct('<q8siifqqI')
+RECORD_SIZE = RECORD.size
+INDEX_ENTRY = struct.Struct('<qQ')  # (수신시각 ns, 레코드 번호)
+INDEX_EVERY = 65536                 # 이 레코드 수마다 색인 지점 기록
+WRITE_BUFFER_SIZE = 1 << 20         # 1MB 버퍼 — 체결마다 시스템 호출이 일어나지 않도록
+READ_CHUNK_RECORDS = 8192
+
+def _int(value):
+    if not value:
+        return 0
+    try:
+        return int(value)  # 대부분의 체결 필드('+71000', '-300')는 여기서 끝남
+    except (TypeError, ValueError):
+        pass
+    try:
+        return int(float(str(value).replace(',', '').replace('+', '').strip()))
+    except ValueError:
+        return 0
+
+def _float(value):
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(str(value).replace(',', '').replace('+', '').strip())
+    except ValueError:
+        return 0.0
+
+def segment_paths(day, journal_dir=JOURNAL_DIR):
+    return os.path.join(journal_dir, f"{day}.ticks"), os.path.join(journal_dir, f"{day}.idx")
+
+class TickJournalWriter:
+    """
+    실시간 체결을 일자별 세그먼트 파일에 고정 크기 바이너리 레코드로 덧붙입니다.
+    체결 하나당 struct.pack 한 번과 버퍼 복사만 하므로 수신 루프에서 직접 호출해도 부담이 거의 없고,
+    실제 디스크 쓰기는 1MB 버퍼가 찰 때나 flush() 때만 일어납니다.
+    프로세스가 비정상 종료되어 마지막 레코드가 잘려도 읽는 쪽은 완전한 레코드까지만 읽습니다.
+    """
+
+    def __init__(self, journal_dir=JOURNAL_DIR):
+        self.journal_dir = journal_dir
+        self.day = None
+        self.day_end_ns = 0  # 현재 세그먼트 날짜가 끝나는 시각 — 체결마다 날짜 문자열을 만들지 않도록
+        self.data_file = None
+        self.index_file = None
+        self.record_count = 0
+        self.written_count = 0
+
+    def _open_segment(self, day):
+        self.close()
+        os.makedirs(self.journal_dir, exist_ok=True)
+        data_path, index_path = segment_paths(day, self.journal_dir)
+        is_new = not os.path.exists(data_path) or os.path.getsize(data_path) < HEADER_SIZE
+        self.data_file = open(data_path, 'ab', buffering=WRITE_BUFFER_SIZE)
+        if is_new:
+            self.data_file.truncate(0)
+            self.data_file.write(struct.pack(HEADER_FORMAT, JOURNAL_MAGIC, RECORD_SIZE, 0))
+            self.record_count = 0
+        else:
+            # 같은 날 재시작: 잘린 마지막 레코드를 잘라내고 이어서 기록
+            size = os.path.getsize(data_path)
+            self.record_count = (size - HEADER_SIZE) // RECORD_SIZE
+            self.data_file.truncate(HEADER_SIZE + self.record_count * RECORD_SIZE)
+        self.index_file = open(index_path, 'ab')
+        self.day = day
+        next_day = datetime.datetime.strptime(day, '%Y%m%d') + datetime.timedelta(days=1)
+        self.day_end_ns = int(next_day.timestamp() * 1e9)
+
+    def on_tick(self, stock_code, tick, received_ns=None):
+        """WebSocketClient.add_tick_recorder()에 연결하는 체결 콜백입니다."""
+        received_ns = received_ns or time.time_ns()
+        if received_ns >= self.day_end_ns or self.data_file is None:
+            self._open_segment(time.strftime('%Y%m%d', time.localtime(received_ns / 1e9)))
+        if self.record_count % INDEX_EVERY == 0:
+            self.index_file.write(INDEX_ENTRY.pack(received_ns, self.record_count))
+        self.data_file.write(RECORD.pack(
+            received_ns,
+            stock_code.encode('ascii', 'ignore')[:8],
+            abs(_int(tick.get('lastPrice') or tick.get('10'))),
+            _int(tick.get('changeFromPrevDay') or tick.get('11')),
+            _float(tick.get('fluctuationRate') or tick.get('12')),
+            _int(tick.get('tradeVolume') or tick.get('13')),
+            _int(tick.get('tradeAmount') or tick.get('14')),
+            _int(tick.get('20') or tick.get('tradeTime')),
+        ))
+        self.record_count += 1
+        self.written_count += 1
+
+    def flush(self):
+        if self.data_file:
+            self.data_file.flush()
+            self.index_file.flush()
+
+    async def run_flush_loop(self, interval=1):
+        """interval초마다 버퍼를 파일로 내보내 비정상 종료 시 잃는 구간을 줄입니다."""
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+    def close(self):
+        if self.data_file:
+            self.data_file.close()
+            self.index_file.close()
+            self.data_file = None
+            self.index_file = None
+
+def record_to_tick(record):
+    """저널 레코드를 실시간 콜백이 받는 것과 같은 형식 (stock_code, tick)으로 되돌립니다."""
+    received_ns, code, price, change, change_rate, volume, amount, trade_time = record
+    tick = {
+        'lastPrice': str(price),
+        'changeFromPrevDay': str(change),
+        'fluctuationRate': f"{change_rate:.2f}",
+        'tradeVolume': str(volume),
+        'tradeAmount': str(amount),
+    }
+    if trade_time:
+        tick['20'] = f"{trade_time:06d}"
+    return code.rstrip(b'\0').decode('ascii'), tick
+
+class TickJournalReader:
+    """하루치 세그먼트를 읽습니다. 색인 지점으로 특정 시각 부근까지 바로 이동할 수 있습니다."""
+
+    def __init__(self, day, journal_dir=JOURNAL_DIR):
+        self.day = day
+        self.data_path, self.index_path = segment_paths(day, journal_dir)
+        with open(self.data_path, 'rb') as f:
+            magic, record_size, _ = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        if magic != JOURNAL_MAGIC or record_size != RECORD_SIZE:
+            raise ValueError(f"체결 저널 형식이 올바르지 않습니다: {self.data_path}")
+        self.index = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            self.index = list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+    def __len__(self):
+        return (os.path.getsize(self.data_path) - HEADER_SIZE) // RECORD_SIZE
+
+    def record_for_time(self, received_ns):
+        """received_ns 이전의 가장 가까운 색인 지점 레코드 번호를 반환합니다."""
+        position = bisect.bisect_right([entry[0] for entry in self.index], received_ns) - 1
+        return self.index[position][1] if position >= 0 else 0
+
+    def iter_records(self, start_ns=None, codes=None):
+        """레코드를 (수신시각 ns, 종목코드 bytes, ...) 튜플로 순서대로 돌려줍니다. 큰 덩어리로 읽어 iter_unpack으로 풉니다."""
+        total = len(self)
+        start = self.record_for_time(start_ns) if start_ns else 0
+        code_filter = {code.encode('ascii').ljust(8, b'\0') for code in codes} if codes else None
+        with open(self.data_path, 'rb') as f:
+            f.seek(HEADER_SIZE + start * RECORD_SIZE)
+            remaining = total - start
+            while remaining > 0:
+                count = min(READ_CHUNK_RECORDS, remaining)
+                chunk = f.read(count * RECORD_SIZE)
+                remaining -= count
+                for record in RECORD.iter_unpack(chunk):
+                    if start_ns and record[0] < start_ns:
+                        continue
+                    if code_filter is not None and record[1] not in code_filter:
+                        continue
+                    yield record
+
+async def replay(day, handlers, speed=None, start_ns=None, codes=None, journal_dir=JOURNAL_DIR):
+    """
+    하루치 체결을 실시간 클라이언트와 같은 콜백 handler(stock_code, tick)에 다시 흘려보냅니다.
+    speed=None이면 최대 속도, 1.0이면 실제 시간, 10이면 10배속입니다. 반환값은 재생한 체결 수입니다.
+    """
+    reader = TickJournalReader(day, journal_dir)
+    first_ns = None
+    wall_start = time.monotonic()
+    count = 0
+    for record in reader.iter_records(start_ns=start_ns, codes=codes):
+        if speed:
+            if first_ns is None:
+                first_ns = record[0]
+            delay = (record[0] - first_ns) / 1e9 / speed - (time.monotonic() - wall_start)
+            if delay > 0.001:
+                await asyncio.sleep(delay)
+        stock_code, tick = record_to_tick(record)
+        for handler in handlers:
+            handler(stock_code, tick)
+        count += 1
+        if not speed and count % 5000 == 0:
+            await asyncio.sleep(0)  # 최대 속도에서도 같은 이벤트 루프의 다른 태스크가 돌 수 있게 양보
+    return count
+
+async def _replay_main(args):
+    handlers = []
+    counter = {'count': 0}
+    handlers.append(lambda code, tick: counter.__setitem__('count', counter['count'] + 1))
+    gateway = None
+    if args.publish:
+        # 재생한 체결을 게이트웨이로 내보내 GatewaySubscriber 기반 소비자가 그대로 받게 함
+        from realtime_gateway import RealtimeGateway, DEFAULT_GATEWAY_SOCKET
+        gateway = RealtimeGateway(args.socket or DEFAULT_GATEWAY_SOCKET)
+        await gateway.start()
+        handlers.append(gateway.on_tick)
+    start_ns = None
+    if args.start:
+        start_time = datetime.datetime.strptime(args.day + args.start, '%Y%m%d%H%M%S')
+        start_ns = int(start_time.timestamp() * 1e9)
+    started = time.perf_counter()
+    try:
+        count = await replay(args.day, handlers, speed=args.speed, start_ns=start_ns,
+                             codes=args.codes.split(',') if args.codes else None, journal_dir=args.journal_dir)
+    finally:
+        if gateway:
+            await gateway.close()
+    elapsed = time.perf_counter() - started
+    logger.info(f"{args.day} 체결 {count:,}건 재생 완료: {elapsed:.2f}초 ({count / elapsed if elapsed else 0:,.0f}건/초)")
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="실시간 체결 저널 조회/재생")
+    parser.add_argument('--journal-dir', default=JOURNAL_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats_parser = subparsers.add_parser('stats', help="세그먼트 정보 출력")
+    stats_parser.add_argument('day', help="YYYYMMDD")
+
+    replay_parser = subparsers.add_parser('replay', help="하루치 체결 재생")
+    replay_parser.add_argument('day', help="YYYYMMDD")
+    replay_parser.add_argument('--speed', type=float, default=None, help="재생 배속 (생략 시 최대 속도)")
+    replay_parser.add_argument('--start', help="재생 시작 시각 HHMMSS")
+    replay_parser.add_argument('--codes', help="쉼표로 구분한 종목코드만 재생")
+    replay_parser.add_argument('--publish', action='store_true', help="재생 체결을 로컬 게이트웨이로 배포")
+    replay_parser.add_argument('--socket', help="게이트웨이 소켓 경로")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        reader = TickJournalReader(args.day, args.journal_dir)
+        size = os.path.getsize(reader.data_path)
+        logger.info(f"{args.day}: 체결 {len(reader):,}건, {size / 1024 / 1024:.1f}MB, 색인 지점 {len(reader.index)}개")
+    else:
+        asyncio.run(_replay_main(args))
+
+if __name__ == '__main__':
+    main()
@@ -168,6 +168,7 @@
         <div id="searchResults" class="search-results"></div>
 
         <?php
+        require_once __DIR__ . '/assets/includes/shared_quotes.php';
         $config_file = __DIR__ . '/config.ini';
 
         if (!file_exists($config_file)) {
@@ -224,8 +225,14 @@
             $falling_count = 0;
             $rows = [];
             
+            // 실시간 클라이언트가 돌고 있으면 공유 메모리의 최신 현재가를 사용 (없으면 DB 값 그대로)
+            $shared_quotes = read_shared_quotes();
+
             // 먼저 모든 데이터를 배열에 저장하면서 상승/하락 개수 계산
             while($row = $result->fetch_assoc()) {
+                if (isset($shared_quotes[$row["stock_code"]])) {
+                    $row["current_price"] = (string)$shared_quotes[$row["stock_code"]]['current_price'];
+                }
                 $current_price = str_replace(['+', '-'], '', $row["current_price"]);
                 $prev_price = str_replace(['+', '-'], '', $row["previous_day_closing_price"]);
                 
@@ -0,0 +1,37 @@
+<?php
+// 실시간 파이프라인 지연 지표 (MD/python_modules/realtime_latency.py가 5초마다 갱신하는 /dev/shm/kiwoom_realtime_metrics.json)
+// GET → JSON / ?format=prometheus → Prometheus 텍스트 형식 (수집기 시작 후 누적, 구간은 ms 기준)
+$path = is_dir('/dev/shm') ? '/dev/shm/kiwoom_realtime_metrics.json' : __DIR__ . '/../data/kiwoom_realtime_metrics.json';
+$metrics = is_readable($path) ? json_decode(@file_get_contents($path), true) : null;
+
+if (!is_array($metrics)) {
+    http_response_code(503);
+    header('Content-Type: application/json; charset=utf-8');
+    echo json_encode(['error' => '지연 지표가 없습니다. realtime_data_updater.py 실행 여부를 확인하세요.'], JSON_UNESCAPED_UNICODE);
+    exit;
+}
+// 지표 파일이 오래됐으면 수집기가 멈춘 것
+$metrics['stale'] = (microtime(true) - $metrics['updated_at']) > 30;
+
+if (($_GET['format'] ?? '') !== 'prometheus') {
+    header('Content-Type: application/json; charset=utf-8');
+    echo json_encode($metrics, JSON_UNESCAPED_UNICODE);
+    exit;
+}
+
+header('Content-Type: text/plain; version=0.0.4; charset=utf-8');
+echo "# HELP kiwoom_realtime_latency_ms Realtime pipeline stage latency in milliseconds (cumulative since collector start)\n";
+echo "# TYPE kiwoom_realtime_latency_ms histogram\n";
+foreach ($metrics['stages'] as $stage => $summary) {
+    $label = str_replace(['\\', '"'], ['\\\\', '\\"'], $stage);
+    $cumulative = 0;
+    foreach ($summary['buckets'] as $bound => $count) {
+        $cumulative += $count;
+        echo "kiwoom_realtime_latency_ms_bucket{stage=\"{$label}\",le=\"{$bound}\"} {$cumulative}\n";
+    }
+    echo "kiwoom_realtime_latency_ms_sum{stage=\"{$label}\"} " . $summary['sum_ms'] . "\n";
+    echo "kiwoom_realtime_latency_ms_count{stage=\"{$label}\"} {$summary['count']}\n";
+}
+echo "# HELP kiwoom_realtime_metrics_age_seconds Seconds since the metrics file was written\n";
+echo "# TYPE kiwoom_realtime_metrics_age_seconds gauge\n";
+echo "kiwoom_realtime_metrics_age_seconds " . round(microtime(true) - $metrics['updated_at'], 3) . "\n";
@@ -0,0 +1,45 @@
+<?php
+// 실시간 조건검색 편입 종목 조회 API
+// GET ?seq=67 → 해당 조건식만, seq 생략 → 전체 조건식 / &quotes=1 → 공유 메모리 최신 시세 포함
+header('Content-Type: application/json; charset=utf-8');
+require_once __DIR__ . '/../assets/includes/condition_results.php';
+require_once __DIR__ . '/../assets/includes/shared_quotes.php';
+
+$snapshot = read_condition_results();
+if ($snapshot === null) {
+    http_response_code(503);
+    echo json_encode(['error' => '실시간 조건검색 결과가 없습니다. realtime_condition_search.py 또는 realtime_data_updater.py --conditions 실행 여부를 확인하세요.'], JSON_UNESCAPED_UNICODE);
+    exit;
+}
+
+$conditions = $snapshot['conditions'] ?? [];
+$events = $snapshot['recent_events'] ?? [];
+if (isset($_GET['seq']) && $_GET['seq'] !== '') {
+    $seq = (string)$_GET['seq'];
+    if (!isset($conditions[$seq])) {
+        http_response_code(404);
+        echo json_encode(['error' => "조건식 {$seq}의 실시간 결과가 없습니다."], JSON_UNESCAPED_UNICODE);
+        exit;
+    }
+    $conditions = [$seq => $conditions[$seq]];
+    $events = array_values(array_filter($events, function ($event) use ($seq) {
+        return (string)$event['seq'] === $seq;
+    }));
+}
+
+$quotes = !empty($_GET['quotes']) ? read_shared_quotes() : [];
+foreach ($conditions as $seq => $condition) {
+    $stocks = [];
+    foreach ($condition['codes'] as $code) {
+        $stocks[] = ['stock_code' => $code] + ($quotes[$code] ?? []);
+    }
+    $conditions[$seq]['stocks'] = $stocks;
+    unset($conditions[$seq]['codes']);
+}
+
+echo json_encode([
+    'updated_at' => $snapshot['updated_at'],
+    'conditions' => $conditions,
+    'names' => $snapshot['names'] ?? [],
+    'recent_events' => array_slice($events, 0, 50),
+], JSON_UNESCAPED_UNICODE);
@@ -0,0 +1,16 @@
+<?php
+// 실시간 조건검색 결과 스냅샷 읽기 (/dev/shm/kiwoom_conditions.json)
+// MD/python_modules/condition_result_store.py가 결과가 바뀔 때마다 임시 파일에 쓴 뒤 교체하므로 잠금 없이 읽어도 됨
+
+function condition_results_path() {
+    return is_dir('/dev/shm') ? '/dev/shm/kiwoom_conditions.json' : __DIR__ . '/../../data/kiwoom_conditions.json';
+}
+
+function read_condition_results($path = null) {
+    $path = $path ?? condition_results_path();
+    if (!is_readable($path)) {
+        return null;
+    }
+    $snapshot = json_decode(@file_get_contents($path), true);
+    return is_array($snapshot) ? $snapshot : null;
+}
@@ -0,0 +1,62 @@
+<?php
+// 실시간 클라이언트가 공유 메모리(/dev/shm/kiwoom_quotes.bin)에 유지하는 최신 시세 테이블 읽기
+// 형식과 seqlock 규칙은 python_modules/shared_quote_table.py 참고
+
+function shared_quotes_path() {
+    return is_dir('/dev/shm') ? '/dev/shm/kiwoom_quotes.bin' : __DIR__ . '/../../data/kiwoom_quotes.bin';
+}
+
+function read_shared_quotes($path = null) {
+    $path = $path ?? shared_quotes_path();
+    if (!is_readable($path)) {
+        return [];
+    }
+    // seqlock: 두 번 읽어 seq가 짝수이고 두 복사본이 같은 레코드만 채택 (쓰는 중이던 레코드는 다시 읽음)
+    $first = @file_get_contents($path);
+    $second = @file_get_contents($path);
+    if ($first === false || $second === false || strlen($first) < 64 || substr($first, 0, 8) !== 'KQUOTE01') {
+        return [];
+    }
+    $header = unpack('Vcapacity/Vcount/Vrecord_size', $first, 8);
+    if ($header['record_size'] != 64) {
+        return [];
+    }
+
+    $quotes = [];
+    $records_offset = 64 + $header['capacity'] * 8;
+    $handle = null;
+    for ($row = 0; $row < $header['count']; $row++) {
+        $code = rtrim(substr($first, 64 + $row * 8, 8), "\0");
+        $offset = $records_offset + $row * 64;
+        $record = substr($first, $offset, 64);
+        $retries = 0;
+        while ($record !== substr($second, $offset, 64) || (unpack('V', $record)[1] & 1)) {
+            if (++$retries > 10) {
+                $record = null;
+                break;
+            }
+            $handle = $handle ?? fopen($path, 'rb');
+            fseek($handle, $offset);
+            $first_read = fread($handle, 64);
+            fseek($handle, $offset);
+            $second = substr_replace($second, fread($handle, 64), $offset, 64);
+            $record = $first_read;
+        }
+        if ($record === null || unpack('V', $record)[1] == 0) {
+            continue; // 쓰는 중이거나 아직 시세가 없는 종목
+        }
+        $values = unpack('qprice/qchange/qvolume/qamount/echange_rate/qupdated_at', $record, 8);
+        $quotes[$code] = [
+            'current_price' => $values['price'],
+            'change' => $values['change'],
+            'volume' => $values['volume'],
+            'amount' => $values['amount'],
+            'change_rate' => $values['change_rate'],
+            'updated_at' => $values['updated_at'] / 1e9,
+        ];
+    }
+    if ($handle) {
+        fclose($handle);
+    }
+    return $quotes;
+}
@@ -0,0 +1,444 @@
+import asyncio
+import bisect
+import configparser
+import logging
+import os
+import sys
+import numpy as np
+import mysql.connector
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+CONFIG_FILE = os.path.join(PROJECT_ROOT, 'config.ini')
+
+# python_modules의 공용 레코드/스냅샷을 재사용합니다.
+sys.path.append(os.path.join(PROJECT_ROOT, 'python_modules'))
+from market_snapshot import MarketSnapshot, MISSING, load_snapshot  # noqa: E402
+from stock_record import StockRecord, parse_price  # noqa: E402
+
+# --- 로그 설정 ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- 실시간 모드 설정 ---
+REALTIME_TOP_N = 30
+REALTIME_FLUSH_INTERVAL = 3  # 초
+
+# --- 랭킹 그룹 키 ---
+ALL_GROUP = ('all', None)
+
+def market_group(market):
+    return ('market', market)
+
+def sector_group(sector):
+    return ('sector', sector)
+
+def get_db_connection():
+    """config.ini에서 DB 정보를 읽어와 연결을 생성합니다."""
+    config = configparser.ConfigParser()
+    if not os.path.exists(CONFIG_FILE):
+        logger.error(f"설정 파일을 찾을 수 없습니다: {CONFIG_FILE}")
+        return None
+
+    config.read(CONFIG_FILE)
+
+    try:
+        db_config = {
+            'host': config.get('DB', 'HOST'),
+            'user': config.get('DB', 'USER'),
+            'password': config.get('DB', 'PASSWORD'),
+            'database': config.get('DB', 'DATABASE'),
+            'port': config.getint('DB', 'PORT')
+        }
+        return mysql.connector.connect(**db_config)
+    except (configparser.NoSectionError, configparser.NoOptionError) as e:
+        logger.error(f"config.ini 파일에 [DB] 섹션 또는 필요한 키가 없습니다. ({e})")
+        return None
+    except mysql.connector.Error as err:
+        logger.error(f"데이터베이스 연결 오류: {err}")
+        return None
+
+def compute_market_caps(prices, circulating_shares, listed_shares):
+    """
+    전종목 시가총액을 한 번의 벡터 연산으로 계산합니다.
+    유통주식수가 있으면 유통주식수를, 없으면 상장주식수를 사용하며
+    가격이나 주식수가 없는(MISSING/0) 종목은 MISSING을 돌려줍니다.
+    """
+    prices = np.asarray(prices, dtype=np.int64)
+    circulating_shares = np.asarray(circulating_shares, dtype=np.int64)
+    listed_shares = np.asarray(listed_shares, dtype=np.int64)
+
+    shares = np.where(circulating_shares > 0, circulating_shares, listed_shares)
+    valid = (prices > 0) & (shares > 0)
+    return np.where(valid, prices * shares, MISSING), shares
+
+class MarketCapEngine:
+    """
+    시가총액 계산 및 순위 엔진입니다.
+
+    그룹(전체, 시장별, 업종별)마다 (-시가총액, 종목코드) 키를 정렬된 리스트로 유지합니다.
+    가격이 바뀌면 해당 종목의 키만 각 그룹에서 빼고 다시 넣으므로 전체를 재정렬하지 않으며,
+    상위 N개 조회는 정렬된 리스트의 앞부분을 잘라내기만 하므로 전체 종목 수와 무관합니다.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        columns = snapshot.columns
+        caps, shares = compute_market_caps(
+            np.frombuffer(columns['current_price'], dtype=np.int64),
+            np.frombuffer(columns['circulating_shares'], dtype=np.int64),
+            np.frombuffer(columns['listed_shares'], dtype=np.int64),
+        )
+        self.market_caps = caps
+        self.shares = shares
+        self.rankings = {}
+        self._build_rankings()
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(MarketSnapshot.from_records(records))
+
+    def groups_of(self, stock_code):
+        """종목이 속한 순위 그룹(전체, 시장, 업종) 목록. 모르는 종목이면 빈 리스트."""
+        row = self.snapshot.index.get(stock_code)
+        return [] if row is None else self._groups_of(row)
+
+    def _groups_of(self, row):
+        groups = [ALL_GROUP]
+        market = self.snapshot.market_labels[self.snapshot.market_ids[row]]
+        sector = self.snapshot.sector_labels[self.snapshot.sector_ids[row]]
+        if market:
+            groups.append(market_group(market))
+        if sector:
+            groups.append(sector_group(sector))
+        return groups
+
+    def _build_rankings(self):
+        """전체 순위를 한 번 만듭니다. 이후에는 update_price()로 증분 갱신합니다."""
+        # 시가총액 내림차순, 동률이면 종목코드 오름차순
+        order = np.lexsort((np.array(self.snapshot.codes), -self.market_caps))
+        rankings = {}
+        for row in order.tolist():
+            cap = int(self.market_caps[row])
+            if cap == MISSING:
+                continue
+            key = (-cap, self.snapshot.codes[row])
+            for group in self._groups_of(row):
+                rankings.setdefault(group, []).append(key)
+        self.rankings = rankings
+
+    def update_price(self, stock_code, current_price):
+        """
+        한 종목의 현재가를 반영해 시가총액과 순위를 갱신합니다.
+        순위가 바뀌었으면 True, 종목을 모르거나 시가총액이 그대로면 False를 반환합니다.
+        """
+        row = self.snapshot.index.get(stock_code)
+        if row is None:
+            return False
+        self.snapshot.update_price(stock_code, current_price)
+
+        old_cap = int(self.market_caps[row])
+        shares = int(self.shares[row])
+        new_cap = current_price * shares if current_price > 0 and shares > 0 else MISSING
+        if new_cap == old_cap:
+            return False
+        self.market_caps[row] = new_cap
+
+        for group in self._groups_of(row):
+            ranking = self.rankings.setdefault(group, [])
+            if old_cap != MISSING:
+                old_key = (-old_cap, stock_code)
+                pos = bisect.bisect_left(ranking, old_key)
+                if pos < len(ranking) and ranking[pos] == old_key:
+                    del ranking[pos]
+            if new_cap != MISSING:
+                bisect.insort(ranking, (-new_cap, stock_code))
+        return True
+
+    def market_cap_of(self, stock_code):
+        row = self.snapshot.index.get(stock_code)
+        if row is None or self.market_caps[row] == MISSING:
+            return None
+        return int(self.market_caps[row])
+
+    def rank_of(self, stock_code, market=None, sector=None):
+        """종목의 순위(1부터)를 반환합니다. 순위에 없으면 None."""
+        cap = self.market_cap_of(stock_code)
+        if cap is None:
+            return None
+        ranking = self.rankings.get(self._group_for(market, sector), [])
+        pos = bisect.bisect_left(ranking, (-cap, stock_code))
+        if pos < len(ranking) and ranking[pos] == (-cap, stock_code):
+            return pos + 1
+        return None
+
+    def _group_for(self, market, sector):
+        if market and sector:
+            raise ValueError("market과 sector는 동시에 지정할 수 없습니다.")
+        if market:
+            return market_group(market)
+        if sector:
+            return sector_group(sector)
+        return ALL_GROUP
+
+    def top(self, n=30, market=None, sector=None):
+        """시가총액 상위 n개 종목을 순위 순서대로 반환합니다. market 또는 sector로 범위를 좁힐 수 있습니다."""
+        ranking = self.rankings.get(self._group_for(market, sector), [])
+        result = []
+        for rank, (neg_cap, stock_code) in enumerate(ranking[:n], start=1):
+            row = self.snapshot.index[stock_code]
+            result.append({
+                'rank': rank,
+                'stock_code': stock_code,
+                'stock_name': self.snapshot.names[row],
+                'market': self.snapshot.market_labels[self.snapshot.market_ids[row]],
+                'sector': self.snapshot.sector_labels[self.snapshot.sector_ids[row]],
+                'current_price': int(self.snapshot.columns['current_price'][row]),
+                'shares': int(self.shares[row]),
+                'market_cap': -neg_cap,
+            })
+        return result
+
+def save_ranking_to_db(engine):
+    """전체 시가총액 순위를 market_cap_ranking 테이블에 저장합니다."""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("DB 연결 실패: 시가총액 순위를 저장할 수 없습니다.")
+        return
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS market_cap_ranking (
+            stock_code VARCHAR(10) PRIMARY KEY,
+            stock_name VARCHAR(100),
+            market VARCHAR(20),
+            sector VARCHAR(100),
+            current_price BIGINT,
+            shares BIGINT,
+            market_cap BIGINT,
+            overall_rank INT,
+            market_rank INT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            KEY idx_overall_rank (overall_rank),
+            KEY idx_market_rank (market, market_rank)
+        )
+        """)
+        rows = []
+        for item in engine.top(len(engine.snapshot)):
+            rows.append((
+                item['stock_code'], item['stock_name'], item['market'], item['sector'],
+                item['current_price'], item['shares'], item['market_cap'],
+                item['rank'], engine.rank_of(item['stock_code'], market=item['market']),
+            ))
+        cursor.execute("DELETE FROM market_cap_ranking")
+        if rows:
+            cursor.executemany("""
+            INSERT INTO market_cap_ranking
+                (stock_code, stock_name, market, sector, current_price, shares, market_cap, overall_rank, market_rank)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, rows)
+        conn.commit()
+        logger.info(f"{len(rows)}개 종목의 시가총액 순위를 저장했습니다.")
+    except mysql.connector.Error as err:
+        logger.error(f"시가총액 순위 저장 중 오류 발생: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+def load_snapshot_from_db():
+    """stock_details와 all_stocks를 읽어 시장 스냅샷을 만듭니다."""
+    conn = get_db_connection()
+    if conn is None:
+        return MarketSnapshot()
+
+    records = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT sd.stock_code, sd.stock_name, sd.market, a.sector, a.listed_shares,
+                   sd.current_price, sd.previous_day_closing_price, sd.circulating_shares
+            FROM stock_details sd
+            LEFT JOIN all_stocks a ON a.stock_code = sd.stock_code
+        """)
+        for code, name, market, sector, listed, price, prev_close, circulating in cursor.fetchall():
+            records.append(StockRecord(
+                stock_code=code, stock_name=name, market=market, sector=sector,
+                listed_shares=parse_price(listed), current_price=parse_price(price),
+                previous_day_closing_price=parse_price(prev_close), circulating_shares=parse_price(circulating),
+            ))
+        cursor.close()
+    except mysql.connector.Error as err:
+        logger.error(f"시가총액 계산용 종목 정보 조회 중 오류 발생: {err}")
+    finally:
+        conn.close()
+    return MarketSnapshot.from_records(records)
+
+def build_engine():
+    """저장된 시장 스냅샷(없으면 DB)으로 엔진을 만듭니다."""
+    snapshot = load_snapshot()
+    if snapshot is None:
+        logger.info("스냅샷 파일을 사용할 수 없어 DB에서 불러옵니다.")
+        snapshot = load_snapshot_from_db()
+    engine = MarketCapEngine(snapshot)
+    logger.info(f"종목 {len(snapshot)}개 중 {len(engine.rankings.get(ALL_GROUP, []))}개의 시가총액을 계산했습니다.")
+    return engine
+
+def parse_tick_price(tick):
+    """실시간 체결 데이터에서 현재가를 꺼냅니다. ('lastPrice' 또는 FID '10')"""
+    return parse_price(tick.get('lastPrice') or tick.get('10'))
+
+def scope_name(group):
+    kind, value = group
+    return 'ALL' if kind == 'all' else f"{kind}:{value}"
+
+class RealtimeMarketCapRanker:
+    """
+    실시간 체결 틱을 받아 시가총액 순위를 증분 갱신하고, 상위 N 순위가 바뀐 범위만 DB에 반영합니다.
+    WebSocketClient.add_tick_handler(ranker.on_tick)로 연결하고 run_flush_loop()를 함께 실행합니다.
+    """
+
+    def __init__(self, engine, top_n=REALTIME_TOP_N, flush_interval=REALTIME_FLUSH_INTERVAL):
+        self.engine = engine
+        self.top_n = top_n
+        self.flush_interval = flush_interval
+        self.dirty_groups = set()
+        self.tick_count = 0
+
+    def on_tick(self, stock_code, tick):
+        price = parse_tick_price(tick)
+        if not price:
+            return
+        self.tick_count += 1
+        groups = self.engine.groups_of(stock_code)
+        if not groups:
+            return
+
+        old_ranks = [self._rank_in(group, stock_code) for group in groups]
+        if not self.engine.update_price(stock_code, price):
+            return
+        for group, old_rank in zip(groups, old_ranks):
+            new_rank = self._rank_in(group, stock_code)
+            # 상위 N에 있었거나 새로 들어온 경우에만 해당 범위의 상위 N이 바뀝니다.
+            if (old_rank is not None and old_rank <= self.top_n) or (new_rank is not None and new_rank <= self.top_n):
+                self.dirty_groups.add(group)
+
+    def _rank_in(self, group, stock_code):
+        kind, value = group
+        if kind == 'market':
+            return self.engine.rank_of(stock_code, market=value)
+        if kind == 'sector':
+            return self.engine.rank_of(stock_code, sector=value)
+        return self.engine.rank_of(stock_code)
+
+    def _top_rows(self, group):
+        kind, value = group
+        if kind == 'market':
+            items = self.engine.top(self.top_n, market=value)
+        elif kind == 'sector':
+            items = self.engine.top(self.top_n, sector=value)
+        else:
+            items = self.engine.top(self.top_n)
+        scope = scope_name(group)
+        return [
+            (scope, item['rank'], item['stock_code'], item['stock_name'], item['market'], item['sector'],
+             item['current_price'], item['market_cap'])
+            for item in items
+        ]
+
+    def collect_rows(self, groups):
+        rows = []
+        for group in groups:
+            rows.extend(self._top_rows(group))
+        return rows
+
+    def write_rows(self, rows, groups):
+        """
+        상위 N 행을 market_cap_top30 테이블에 씁니다. 범위의 종목 수가 줄었으면 남은 뒤쪽 순위를 같은 트랜잭션에서 지웁니다.
+        (쓴 행 수, 저장하지 못한 범위)를 반환합니다. 별도 스레드에서 실행되므로 dirty_groups는 건드리지 않고,
+        실패한 범위는 호출하는 쪽이 이벤트 루프 스레드에서 다시 dirty로 표시합니다.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return 0, groups
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS market_cap_top30 (
+                scope VARCHAR(120) NOT NULL,
+                `rank` INT NOT NULL,
+                stock_code VARCHAR(10) NOT NULL,
+                stock_name VARCHAR(100),
+                market VARCHAR(20),
+                sector VARCHAR(100),
+                current_price BIGINT,
+                market_cap BIGINT,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (scope, `rank`)
+            )
+            """)
+            if rows:
+                cursor.executemany("""
+                REPLACE INTO market_cap_top30 (scope, `rank`, stock_code, stock_name, market, sector, current_price, market_cap)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, rows)
+            row_counts = {scope_name(group): 0 for group in groups}
+            for row in rows:
+                row_counts[row[0]] += 1
+            cursor.executemany(
+                "DELETE FROM market_cap_top30 WHERE scope = %s AND `rank` > %s",
+                list(row_counts.items()),
+            )
+            conn.commit()
+            cursor.close()
+            logger.debug(f"{len(groups)}개 범위의 상위 {self.top_n} 시가총액 순위를 갱신했습니다.")
+            return len(rows), set()
+        except mysql.connector.Error as err:
+            logger.error(f"실시간 시가총액 순위 저장 중 오류 발생: {err}")
+            conn.rollback()
+            return 0, groups
+        finally:
+            conn.close()
+
+    def flush(self, groups=None):
+        """변경된 범위(또는 지정한 범위)의 상위 N 순위를 market_cap_top30 테이블에 씁니다."""
+        if groups is None:
+            groups, self.dirty_groups = self.dirty_groups, set()
+        if not groups:
+            return 0
+        written, failed = self.write_rows(self.collect_rows(groups), groups)
+        self.dirty_groups.update(failed)
+        return written
+
+    def flush_all(self):
+        """모든 범위의 상위 N을 씁니다. 실시간 모드 시작 시 한 번 호출합니다."""
+        return self.flush(set(self.engine.rankings))
+
+    async def run_flush_loop(self):
+        """
+        flush_interval마다 변경분을 기록합니다. 순위 조회는 틱 처리와 같은 이벤트 루프 스레드에서 하고,
+        DB 쓰기만 별도 스레드에서 실행해 수신을 막지 않습니다.
+        """
+        await self._write_in_thread(set(self.engine.rankings))
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self.dirty_groups:
+                continue
+            groups, self.dirty_groups = self.dirty_groups, set()
+            await self._write_in_thread(groups)
+
+    async def _write_in_thread(self, groups):
+        _, failed = await asyncio.to_thread(self.write_rows, self.collect_rows(groups), groups)
+        # 실패한 범위는 await가 끝난 뒤 on_tick과 같은 이벤트 루프 스레드에서 다시 dirty로 표시
+        self.dirty_groups.update(failed)
+
+def main():
+    engine = build_engine()
+    save_ranking_to_db(engine)
+    for item in engine.top(10):
+        logger.info(f"{item['rank']:>3}. {item['stock_name']}({item['stock_code']}) {item['market_cap']:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from market_cap_fetcher import MarketCapEngine, compute_market_caps, MISSING  # noqa: E402
+from stock_record import StockRecord  # noqa: E402
+
+
+def make_record(code, price, circulating=None, listed=None, market='KOSPI', sector='전기전자'):
+    return StockRecord(
+        stock_code=code, stock_name=f"종목{code}", market=market, sector=sector,
+        listed_shares=listed, current_price=price, circulating_shares=circulating,
+    )
+
+
+@pytest.fixture
+def engine():
+    return MarketCapEngine.from_records([
+        make_record('000001', 1000, circulating=100),                       # 100,000
+        make_record('000002', 500, circulating=1000, market='KOSDAQ'),      # 500,000
+        make_record('000003', 2000, listed=100, sector='화학'),             # 200,000 (상장주식수 사용)
+        make_record('000004', 300, circulating=1000, market='KOSDAQ', sector='화학'),  # 300,000
+        make_record('000005', None, circulating=1000),                      # 가격 없음 → 제외
+    ])
+
+
+def test_compute_market_caps_prefers_circulating_shares():
+    caps, shares = compute_market_caps([100, 100, 0], [10, 0, 10], [50, 50, 50])
+    assert caps.tolist() == [1000, 5000, MISSING]
+    assert shares.tolist() == [10, 50, 10]
+
+
+def test_top_overall(engine):
+    assert [item['stock_code'] for item in engine.top(10)] == ['000002', '000004', '000003', '000001']
+    assert engine.top(2)[0]['market_cap'] == 500000
+    assert engine.market_cap_of('000005') is None
+
+
+def test_top_by_market_and_sector(engine):
+    assert [item['stock_code'] for item in engine.top(5, market='KOSPI')] == ['000003', '000001']
+    assert [item['stock_code'] for item in engine.top(5, sector='화학')] == ['000004', '000003']
+    assert engine.top(5, market='KONEX') == []
+    with pytest.raises(ValueError):
+        engine.top(5, market='KOSPI', sector='화학')
+
+
+def test_update_price_reranks_incrementally(engine):
+    assert engine.update_price('000001', 6000)  # 600,000 → 1위
+    assert [item['stock_code'] for item in engine.top(2)] == ['000001', '000002']
+    assert engine.rank_of('000001') == 1
+    assert engine.rank_of('000001', market='KOSPI') == 1
+    assert engine.rank_of('000003', market='KOSPI') == 2
+    assert engine.snapshot.get_value('000001', 'current_price') == 6000
+
+
+def test_update_price_adds_and_removes_from_ranking(engine):
+    assert engine.update_price('000005', 10)  # 가격이 생기면 순위에 들어옴
+    assert engine.rank_of('000005') == 5
+    assert engine.update_price('000005', 0)   # 가격이 없어지면 다시 제외
+    assert engine.rank_of('000005') is None
+    assert len(engine.top(100)) == 4
+
+
+def test_update_price_unknown_or_unchanged(engine):
+    assert not engine.update_price('999999', 1000)
+    assert not engine.update_price('000001', 1000)
+
+
+def test_realtime_ranker_marks_only_affected_scopes(engine):
+    from market_cap_fetcher import RealtimeMarketCapRanker, ALL_GROUP, market_group, sector_group
+
+    ranker = RealtimeMarketCapRanker(engine, top_n=2)
+    ranker.on_tick('000001', {'lastPrice': '+1,000'})  # 가격 변화 없음
+    assert ranker.dirty_groups == set()
+
+    ranker.on_tick('000001', {'10': '+6000'})  # KOSPI/전기전자 1위, 전체 1위로 진입
+    assert ranker.dirty_groups == {ALL_GROUP, market_group('KOSPI'), sector_group('전기전자')}
+
+    ranker.dirty_groups.clear()
+    ranker.on_tick('999999', {'lastPrice': '100'})  # 모르는 종목
+    assert ranker.dirty_groups == set()
+    rows = ranker.collect_rows([ALL_GROUP])
+    assert [(row[0], row[1], row[2]) for row in rows] == [('ALL', 1, '000001'), ('ALL', 2, '000002')]
+
+
+def test_groups_of(engine):
+    from market_cap_fetcher import ALL_GROUP, market_group, sector_group
+
+    assert engine.groups_of('000004') == [ALL_GROUP, market_group('KOSDAQ'), sector_group('화학')]
+    assert engine.groups_of('999999') == []
+
+
+def test_write_rows_trims_ranks_beyond_scope_size(engine, monkeypatch):
+    import market_cap_fetcher
+    from market_cap_fetcher import RealtimeMarketCapRanker, market_group
+
+    statements = []
+
+    class FakeCursor:
+        def execute(self, sql, params=None):
+            statements.append((sql.split()[0], params))
+
+        def executemany(self, sql, seq):
+            statements.append((sql.split()[0], list(seq)))
+
+        def close(self):
+            pass
+
+    class FakeConnection:
+        def cursor(self):
+            return FakeCursor()
+
+        def commit(self):
+            statements.append(('COMMIT', None))
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(market_cap_fetcher, 'get_db_connection', FakeConnection)
+    ranker = RealtimeMarketCapRanker(engine, top_n=30)
+    engine.update_price('000004', 0)  # 코스닥이 2종목 → 1종목으로 줄어듦
+    groups = {market_group('KOSDAQ')}
+    assert ranker.write_rows(ranker.collect_rows(groups), groups) == (1, set())
+
+    assert [kind for kind, _ in statements] == ['CREATE', 'REPLACE', 'DELETE', 'COMMIT']
+    assert statements[2][1] == [('market:KOSDAQ', 1)]  # 커밋 전에 2위 이하 삭제
@@ -78,6 +78,14 @@ def setup_database():
             ADD COLUMN IF NOT EXISTS theme VARCHAR(255)
         """)
         logger.info("stock_news 테이블에 theme 컬럼 추가 완료.")
+        # 재송고 기사 묶음용 컬럼 (story_id가 NULL이면 대표 기사, 아니면 대표 기사의 id)
+        cursor.execute("""
+            ALTER TABLE stock_news
+            ADD COLUMN IF NOT EXISTS simhash BIGINT UNSIGNED,
+            ADD COLUMN IF NOT EXISTS story_id INT,
+            ADD INDEX IF NOT EXISTS idx_story_id (story_id)
+        """)
+        logger.info("stock_news 테이블에 simhash/story_id 컬럼 추가 완료.")
 
         # 3. `stock_details` 테이블 생성
         logger.info("`stock_details` 테이블을 생성합니다...")
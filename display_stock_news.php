@@ -40,11 +40,18 @@ $news_list = [];
 if (!empty($search_query)) {
     $search_term = "%" . $conn->real_escape_string($search_query) . "%";
     
-    $sql = "SELECT sn.stock_code, sd.stock_name, sn.title, sn.link, sn.description, sn.pub_date 
-            FROM stock_news sn
-            JOIN stock_details sd ON sn.stock_code = sd.stock_code
-            WHERE sd.stock_name LIKE ? OR sn.stock_code LIKE ?
-            ORDER BY sn.pub_date DESC LIMIT 100";
+    // 여러 언론사/종목에 재송고된 같은 기사(story_id로 묶임)는 대표 기사 하나만 보여주고 묶인 건수를 표시
+    $sql = "SELECT stock_code, stock_name, title, link, description, pub_date, story_size
+            FROM (
+                SELECT sn.stock_code, sd.stock_name, sn.title, sn.link, sn.description, sn.pub_date,
+                       ROW_NUMBER() OVER (PARTITION BY COALESCE(sn.story_id, sn.id) ORDER BY sn.story_id IS NOT NULL, sn.pub_date DESC) AS story_rn,
+                       COUNT(*) OVER (PARTITION BY COALESCE(sn.story_id, sn.id)) AS story_size
+                FROM stock_news sn
+                JOIN stock_details sd ON sn.stock_code = sd.stock_code
+                WHERE sd.stock_name LIKE ? OR sn.stock_code LIKE ?
+            ) s
+            WHERE story_rn = 1
+            ORDER BY pub_date DESC LIMIT 100";
     
     $stmt = $conn->prepare($sql);
     $stmt->bind_param("ss", $search_term, $search_term);
@@ -83,6 +90,10 @@ $conn->close();
         .news-meta { font-size: 0.9em; color: #666; margin-bottom: 10px; }
         .news-description { font-size: 1em; line-height: 1.6; color: #555; }
         .stock-info { font-weight: bold; color: #28a745; margin-right: 10px; }
+        .story-size { margin-left: 10px; color: #6c757d; font-size: 0.85em; }
+        .theme-info { margin-left: 10px; color: #007bff; font-size: 0.85em; }
+        .pagination { text-align: center; margin: 20px 0; }
+        .pagination a { margin: 0 10px; color: #007bff; text-decoration: none; }
         .message { text-align: center; color: #6c757d; font-size: 1.1em; padding: 40px 0; }
         .home-link { display: block; text-align: center; margin-top: 30px; text-decoration: none; color: #007bff; font-weight: bold; }
         .search-suggestions { position: absolute; background: white; border: 1px solid #ddd; border-top: none; max-height: 200px; overflow-y: auto; width: 50%; z-index: 1000; display: none; }
@@ -112,7 +123,7 @@ $conn->close();
             <?php if (!empty($news_list)): ?>
                 <?php foreach ($news_list as $row): ?>
                     <div class="news-item">
-                        <div class="news-meta"><span class="stock-info"><?php echo htmlspecialchars($row['stock_name']); ?> (<?php echo htmlspecialchars($row['stock_code']); ?>)</span><?php echo htmlspecialchars($row['pub_date']); ?></div>
+                        <div class="news-meta"><span class="stock-info"><?php echo htmlspecialchars($row['stock_name']); ?> (<?php echo htmlspecialchars($row['stock_code']); ?>)</span><?php echo htmlspecialchars($row['pub_date']); ?><?php if ($row['story_size'] > 1): ?><span class="story-size">유사 기사 <?php echo $row['story_size'] - 1; ?>건</span><?php endif; ?></div>
                         <div class="news-title"><a href="<?php echo htmlspecialchars($row['link']); ?>" target="_blank"><?php echo htmlspecialchars($row['title']); ?></a></div>
                         <div class="news-description"><?php echo htmlspecialchars($row['description']); ?></div>
                     </div>
@@ -173,11 +184,15 @@ $conn->close();
                 });
         }
 
-        // 뉴스 실시간 검색
+        // 뉴스 실시간 검색 (제목/요약 검색 색인, 점수 순)
         function searchNews(query) {
+            loadNews('search_news.php?q=' + encodeURIComponent(query));
+        }
+
+        function loadNews(url) {
             newsResults.innerHTML = '<p class="loading">검색 중...</p>';
             
-            fetch('search_news.php?q=' + encodeURIComponent(query))
+            fetch(url)
                 .then(response => response.text())
                 .then(html => {
                     newsResults.innerHTML = html;
@@ -192,9 +207,18 @@ $conn->close();
         function selectStock(code, name) {
             searchInput.value = name;
             suggestions.style.display = 'none';
-            searchNews(name);
+            // 종목명 검색은 같은 이름이 들어간 다른 종목 기사까지 섞이므로 종목코드로 그 종목 뉴스만 불러옴
+            loadNews('search_news.php?stock=' + encodeURIComponent(code));
         }
 
+        // 검색 결과 페이지 이동은 결과 영역만 다시 불러옴
+        newsResults.addEventListener('click', function(e) {
+            const link = e.target.closest('.pagination a');
+            if (!link) return;
+            e.preventDefault();
+            loadNews(link.getAttribute('href'));
+        });
+
         // 외부 클릭 시 자동완성 숨기기
         document.addEventListener('click', function(e) {
             if (!e.target.closest('.search-container')) {
@@ -210,7 +234,7 @@ $conn->close();
                 <?php if (!empty($news_list)): ?>
                     <?php foreach ($news_list as $row): ?>
                         <div class="news-item">
-                            <div class="news-meta"><span class="stock-info"><?php echo htmlspecialchars($row['stock_name']); ?> (<?php echo htmlspecialchars($row['stock_code']); ?>)</span><?php echo htmlspecialchars($row['pub_date']); ?></div>
+                            <div class="news-meta"><span class="stock-info"><?php echo htmlspecialchars($row['stock_name']); ?> (<?php echo htmlspecialchars($row['stock_code']); ?>)</span><?php echo htmlspecialchars($row['pub_date']); ?><?php if ($row['story_size'] > 1): ?><span class="story-size">유사 기사 <?php echo $row['story_size'] - 1; ?>건</span><?php endif; ?></div>
                             <div class="news-title"><a href="<?php echo htmlspecialchars($row['link']); ?>" target="_blank"><?php echo htmlspecialchars($row['title']); ?></a></div>
                             <div class="news-description"><?php echo htmlspecialchars($row['description']); ?></div>
                         </div>
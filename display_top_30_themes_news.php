@@ -114,6 +114,7 @@
         $conn->set_charset("utf8mb4");
 
         // SQL 쿼리: 상위 30위 종목 정보와 각 종목의 최신 뉴스 3개를 가져옵니다.
+        // 재송고된 같은 기사(story_id로 묶임)는 종목마다 한 번만 세어 서로 다른 기사 3개를 보여줍니다.
         $sql = "
             SELECT
                 t.rank,
@@ -131,7 +132,13 @@
                 SELECT
                     *,
                     ROW_NUMBER() OVER(PARTITION BY stock_code ORDER BY pub_date DESC) as rn
-                FROM stock_news
+                FROM (
+                    SELECT
+                        *,
+                        ROW_NUMBER() OVER(PARTITION BY stock_code, COALESCE(story_id, id) ORDER BY story_id IS NOT NULL, pub_date DESC) as story_rn
+                    FROM stock_news
+                ) s
+                WHERE story_rn = 1
             ) n ON t.stock_code = n.stock_code AND n.rn <= 3
             ORDER BY
                 t.rank ASC, n.pub_date DESC;
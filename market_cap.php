@@ -0,0 +1,171 @@
+<?php
+// 시가총액 순위 (auto_trade_backend/market_cap_fetcher.py가 저장하는 market_cap_ranking 테이블 조회)
+$config = parse_ini_file(__DIR__ . '/config.ini', true);
+$conn = new mysqli($config['DB']['HOST'], $config['DB']['USER'], $config['DB']['PASSWORD'], $config['DB']['DATABASE'], $config['DB']['PORT']);
+if ($conn->connect_error) {
+    die("<p class='error'>DB 연결 실패: " . htmlspecialchars($conn->connect_error) . "</p>");
+}
+$conn->set_charset("utf8mb4");
+
+const PAGE_SIZE = 50;
+
+$markets = ['' => '전체', 'KOSPI' => '코스피', 'KOSDAQ' => '코스닥'];
+$market = isset($_GET['market']) && isset($markets[$_GET['market']]) ? $_GET['market'] : '';
+$sector = isset($_GET['sector']) ? trim($_GET['sector']) : '';
+$page = isset($_GET['page']) ? max(1, (int)$_GET['page']) : 1;
+$offset = ($page - 1) * PAGE_SIZE;
+
+// 업종 선택 목록
+$sectors = [];
+$result = $conn->query("SELECT DISTINCT sector FROM market_cap_ranking WHERE sector IS NOT NULL AND sector != '' ORDER BY sector");
+while ($result && $row = $result->fetch_assoc()) {
+    $sectors[] = $row['sector'];
+}
+if ($sector !== '' && !in_array($sector, $sectors, true)) {
+    $sector = '';
+}
+
+$filters = [];
+$params = [];
+if ($market !== '') { $filters[] = 'market = ?'; $params[] = $market; }
+if ($sector !== '') { $filters[] = 'sector = ?'; $params[] = $sector; }
+$where = $filters ? 'WHERE ' . implode(' AND ', $filters) : '';
+
+// 순위는 overall_rank 순서 그대로이므로, 시장/업종으로 좁혀도 (건너뛴 수 + 행 번호)가 그 범위의 순위입니다.
+$rows = [];
+$total_count = 0;
+$updated_at = null;
+$stmt = $conn->prepare("SELECT stock_code, stock_name, market, sector, current_price, market_cap, overall_rank, market_rank, updated_at,
+                               COUNT(*) OVER () AS total_count, MAX(updated_at) OVER () AS last_updated
+                        FROM market_cap_ranking
+                        $where
+                        ORDER BY overall_rank
+                        LIMIT ? OFFSET ?");
+if ($stmt) {
+    $params[] = PAGE_SIZE;
+    $params[] = $offset;
+    $stmt->bind_param(str_repeat('s', count($params) - 2) . 'ii', ...$params);
+    $stmt->execute();
+    $result = $stmt->get_result();
+    while ($row = $result->fetch_assoc()) {
+        $rows[] = $row;
+    }
+    $stmt->close();
+}
+$conn->close();
+
+if ($rows) {
+    $total_count = (int)$rows[0]['total_count'];
+    $updated_at = $rows[0]['last_updated'];
+}
+$page_count = (int)ceil($total_count / PAGE_SIZE);
+
+function formatMarketCap($value) {
+    // 원 단위 시가총액을 조 / 억 단위로 표시
+    $eok = floor($value / 100000000);
+    if ($eok >= 10000) {
+        return number_format(floor($eok / 10000)) . '조 ' . number_format($eok % 10000) . '억';
+    }
+    return number_format($eok) . '억';
+}
+
+function pageUrl($market, $sector, $page) {
+    return '?' . http_build_query(array_filter(['market' => $market, 'sector' => $sector, 'page' => $page > 1 ? $page : null]));
+}
+?>
+<!DOCTYPE html>
+<html lang="ko">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>시가총액 순위</title>
+    <link rel="stylesheet" href="assets/css/market_cap.css">
+</head>
+<body>
+    <div class="container">
+        <h1>시가총액 순위</h1>
+        <div class="updated">
+            <?php echo $updated_at ? '최종 계산: ' . htmlspecialchars($updated_at) : '계산 기록 없음'; ?>
+            <button type="button" id="refresh-btn" class="refresh-btn">다시 계산</button>
+            <span id="refresh-message" class="refresh-message"></span>
+        </div>
+
+        <form class="filters" method="get">
+            <div class="tabs">
+                <?php foreach ($markets as $key => $label): ?>
+                    <a href="<?php echo htmlspecialchars(pageUrl($key, $sector, 1)); ?>" class="<?php echo $key === $market ? 'active' : ''; ?>"><?php echo htmlspecialchars($label); ?></a>
+                <?php endforeach; ?>
+            </div>
+            <input type="hidden" name="market" value="<?php echo htmlspecialchars($market); ?>">
+            <select name="sector" onchange="this.form.submit()">
+                <option value="">전체 업종</option>
+                <?php foreach ($sectors as $name): ?>
+                    <option value="<?php echo htmlspecialchars($name); ?>" <?php echo $name === $sector ? 'selected' : ''; ?>><?php echo htmlspecialchars($name); ?></option>
+                <?php endforeach; ?>
+            </select>
+            <a href="views/market_cap_top30.php" class="realtime-link">실시간 상위 30</a>
+        </form>
+
+        <?php if (empty($rows)): ?>
+            <p class="no-data">시가총액 순위 데이터가 없습니다. '다시 계산'을 누르거나 'auto_trade_backend/market_cap_fetcher.py'를 실행해주세요.</p>
+        <?php else: ?>
+            <table>
+                <thead>
+                    <tr><th>순위</th><th>종목명</th><th>종목코드</th><th>시장</th><th>업종</th><th>현재가</th><th>시가총액</th><th>전체 순위</th><th>시장 순위</th></tr>
+                </thead>
+                <tbody>
+                    <?php foreach ($rows as $i => $row): ?>
+                        <tr>
+                            <td><?php echo $offset + $i + 1; ?></td>
+                            <td><?php echo htmlspecialchars($row['stock_name']); ?></td>
+                            <td><?php echo htmlspecialchars($row['stock_code']); ?></td>
+                            <td><?php echo htmlspecialchars($row['market']); ?></td>
+                            <td><?php echo htmlspecialchars($row['sector'] ?? ''); ?></td>
+                            <td class="num"><?php echo number_format($row['current_price']); ?></td>
+                            <td class="num"><?php echo formatMarketCap($row['market_cap']); ?></td>
+                            <td class="num"><?php echo (int)$row['overall_rank']; ?></td>
+                            <td class="num"><?php echo $row['market_rank'] !== null ? (int)$row['market_rank'] : '-'; ?></td>
+                        </tr>
+                    <?php endforeach; ?>
+                </tbody>
+            </table>
+
+            <?php if ($page_count > 1): ?>
+                <div class="pagination">
+                    <?php if ($page > 1): ?>
+                        <a href="<?php echo htmlspecialchars(pageUrl($market, $sector, $page - 1)); ?>">이전</a>
+                    <?php endif; ?>
+                    <span><?php echo $page . ' / ' . $page_count; ?></span>
+                    <?php if ($page < $page_count): ?>
+                        <a href="<?php echo htmlspecialchars(pageUrl($market, $sector, $page + 1)); ?>">다음</a>
+                    <?php endif; ?>
+                </div>
+            <?php endif; ?>
+        <?php endif; ?>
+        <a href="index.php" class="home-link">메인으로 돌아가기</a>
+    </div>
+
+    <script>
+        document.getElementById('refresh-btn').addEventListener('click', function() {
+            const button = this;
+            const message = document.getElementById('refresh-message');
+            button.disabled = true;
+            message.textContent = '계산 중...';
+            fetch('refresh_market_cap.php', { method: 'POST' })
+                .then(response => response.json())
+                .then(data => {
+                    message.textContent = data.message;
+                    if (data.status === 'started') {
+                        setTimeout(() => location.reload(), 5000);
+                    } else {
+                        button.disabled = false;
+                    }
+                })
+                .catch(() => {
+                    message.textContent = '요청에 실패했습니다.';
+                    button.disabled = false;
+                });
+        });
+    </script>
+</body>
+</html>
@@ -0,0 +1,89 @@
+import random
+import sys
+import time
+from classify_news import THEMES_KEYWORDS, NEGATIVE_KEYWORDS
+from keyword_matcher import KeywordMatcher
+from theme_classifier import BASIC_THEMES_KEYWORDS
+
+# --- 벤치마크 설정 ---
+NEWS_COUNT = 100000
+API_THEME_COUNT = 200      # 키움 API 테마 수 (실제 ka90001 응답 규모)
+API_STOCKS_PER_THEME = 15  # 테마당 소속 종목 수
+
+FILLER_WORDS = [
+    "주가", "상승", "하락", "전망", "투자자", "외국인", "기관", "매수", "매도", "실적", "발표", "분기",
+    "시장", "증권가", "목표가", "상향", "코스피", "코스닥", "거래량", "급증", "수혜", "기대감", "공시",
+    "the", "market", "shares", "said", "investors",
+]
+
+def make_api_themes(rng):
+    """theme_classifier.load_themes_keywords()가 돌려주는 형태의 가상 테마 → 종목명 목록을 만듭니다."""
+    themes = dict(BASIC_THEMES_KEYWORDS)
+    for i in range(API_THEME_COUNT):
+        themes[f"테마{i:03d}"] = [f"종목{rng.randrange(3000):04d}" for _ in range(API_STOCKS_PER_THEME)]
+    return themes
+
+def make_news(count, rng, keywords):
+    """제목 약 40자, 요약 약 150자 분량의 가상 뉴스를 만듭니다. 일부 단어는 실제 키워드입니다."""
+    news = []
+    for news_id in range(count):
+        words = [rng.choice(keywords) if rng.random() < 0.12 else rng.choice(FILLER_WORDS) for _ in range(45)]
+        news.append((news_id, ' '.join(words[:8]), ' '.join(words[8:])))
+    return news
+
+def naive_classify(news_item, themes_keywords, negative_keywords=()):
+    """기존 classify_news_item과 같은 방식: 키워드마다 `in`으로 본문 전체를 다시 훑습니다."""
+    news_id, title, description = news_item
+    text_to_check = (title + ' ' + (description or '')).lower()
+    for neg_keyword in negative_keywords:
+        if neg_keyword.lower() in text_to_check:
+            return news_id, "부정"
+    best_theme = None
+    max_score = 0
+    for theme, keywords in themes_keywords.items():
+        items = keywords.items() if isinstance(keywords, dict) else ((keyword, 1) for keyword in keywords)
+        score = sum(weight for keyword, weight in items if keyword.lower() in text_to_check)
+        if score > max_score:
+            max_score = score
+            best_theme = theme
+    return news_id, best_theme
+
+def matcher_classify(matcher, news_item):
+    news_id, title, description = news_item
+    best_theme, negative_keyword = matcher.classify(title + ' ' + (description or ''))
+    return news_id, "부정" if negative_keyword else best_theme
+
+def run_case(label, themes_keywords, negative_keywords, news):
+    keyword_count = sum(len(keywords) for keywords in themes_keywords.values()) + len(negative_keywords)
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(themes_keywords, negative_keywords)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive_results = [naive_classify(item, themes_keywords, negative_keywords) for item in news]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher_results = [matcher_classify(matcher, item) for item in news]
+    matcher_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(naive_results, matcher_results) if a != b)
+    print(f"[{label}] 테마 {len(themes_keywords)}개 / 키워드 {keyword_count:,}개 / 오토마톤 상태 {len(matcher.goto):,}개 (생성 {build_time * 1000:.1f} ms)")
+    print(f"  키워드별 `in` 반복: {naive_time:.2f} 초 ({len(news) / naive_time:,.0f}건/초)")
+    print(f"  Aho-Corasick 1회 스캔: {matcher_time:.2f} 초 ({len(news) / matcher_time:,.0f}건/초, {naive_time / matcher_time:.1f}배)")
+    print(f"  결과 불일치: {mismatches}건")
+
+def main():
+    rng = random.Random(42)
+    api_themes = make_api_themes(rng)
+    keywords = [keyword for keywords in THEMES_KEYWORDS.values() for keyword in keywords] + NEGATIVE_KEYWORDS
+    keywords += [name for names in api_themes.values() for name in names]
+    news = make_news(NEWS_COUNT, rng, keywords)
+
+    print(f"=== 테마 키워드 매칭 벤치마크 (뉴스 {NEWS_COUNT:,}건, Python {sys.version.split()[0]}) ===")
+    run_case("classify_news.py 가중치 키워드 + 부정 키워드", THEMES_KEYWORDS, NEGATIVE_KEYWORDS, news)
+    run_case("theme_classifier.py 기본 키워드 + API 테마 종목명", api_themes, (), news)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from market_snapshot import MarketSnapshot
+from stock_record import StockRecord
+
+# --- 벤치마크 설정 ---
+STOCK_COUNT = 2500
+PRICE_UPDATES = 200000
+
+def make_raw_stocks(count):
+    """기존 수집기가 다루던 형태(문자열 숫자가 들어 있는 dict 리스트)의 가상 전종목 데이터를 만듭니다."""
+    rng = random.Random(42)
+    sectors = ['전기전자', '화학', '의약품', '서비스업', '운수장비', '금융업', '유통업', '기계', '철강금속', '건설업']
+    stocks = []
+    for i in range(count):
+        price = rng.randint(1000, 500000)
+        stocks.append({
+            'stock_code': f"{i:06d}",
+            'stock_name': f"종목{i:04d}",
+            'market': 'KOSPI' if i % 2 == 0 else 'KOSDAQ',
+            'sector': sectors[i % len(sectors)],
+            'listed_shares': str(rng.randint(1_000_000, 6_000_000_000)),
+            'current_price': str(price),
+            'previous_day_closing_price': str(price + rng.randint(-5000, 5000)),
+            'circulating_shares': str(rng.randint(1_000_000, 5_000_000_000)),
+        })
+    return stocks
+
+def to_records(raw_stocks):
+    return [
+        StockRecord(
+            stock_code=s['stock_code'], stock_name=s['stock_name'], market=s['market'], sector=s['sector'],
+            listed_shares=int(s['listed_shares']), current_price=int(s['current_price']),
+            previous_day_closing_price=int(s['previous_day_closing_price']),
+            circulating_shares=int(s['circulating_shares']),
+        ) for s in raw_stocks
+    ]
+
+def measure_memory(builder):
+    """builder()가 만든 객체가 차지하는 메모리(바이트)를 tracemalloc으로 측정합니다."""
+    gc.collect()
+    tracemalloc.start()
+    obj = builder()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+def time_it(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    raw_stocks = make_raw_stocks(STOCK_COUNT)
+    records = to_records(raw_stocks)
+
+    # 원본 데이터를 공유하지 않도록 각 구조를 새로 만들어 측정합니다.
+    _, dict_bytes = measure_memory(lambda: make_raw_stocks(STOCK_COUNT))
+    _, record_bytes = measure_memory(lambda: to_records(make_raw_stocks(STOCK_COUNT)))
+    snapshot, snapshot_bytes = measure_memory(lambda: MarketSnapshot.from_records(to_records(make_raw_stocks(STOCK_COUNT))))
+
+    rng = random.Random(7)
+    codes = [s['stock_code'] for s in raw_stocks]
+    updates = [(rng.choice(codes), rng.randint(1000, 500000)) for _ in range(PRICE_UPDATES)]
+    dict_by_code = {s['stock_code']: s for s in raw_stocks}
+
+    def update_dicts():
+        for code, price in updates:
+            dict_by_code[code]['current_price'] = str(price)
+
+    def update_snapshot():
+        for code, price in updates:
+            snapshot.update_price(code, price)
+
+    def scan_dict_market_cap():
+        return sum(int(s['current_price']) * int(s['circulating_shares']) for s in raw_stocks)
+
+    prices = snapshot.columns['current_price']
+    shares = snapshot.columns['circulating_shares']
+
+    def scan_snapshot_market_cap():
+        return sum(p * s for p, s in zip(prices, shares))
+
+    build_time = time_it(lambda: MarketSnapshot.from_records(records), repeat=5)
+    dict_update_time = time_it(update_dicts)
+    snapshot_update_time = time_it(update_snapshot)
+    dict_scan_time = time_it(scan_dict_market_cap, repeat=20)
+    snapshot_scan_time = time_it(scan_snapshot_market_cap, repeat=20)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'snapshot.bin')
+        dump_time = time_it(lambda: snapshot.dump(path), repeat=5)
+        load_time = time_it(lambda: MarketSnapshot.load(path), repeat=5)
+        file_size = os.path.getsize(path)
+
+    print(f"=== 시장 스냅샷 벤치마크 ({STOCK_COUNT:,}개 종목, 상세 정보 포함, Python {sys.version.split()[0]}) ===")
+    print(f"{'구조':<28}{'메모리':>14}{'종목당':>12}")
+    for label, size in [('dict 리스트 (문자열 숫자)', dict_bytes), ('StockRecord (__slots__)', record_bytes), ('MarketSnapshot (array)', snapshot_bytes)]:
+        print(f"{label:<28}{size / 1024:>11.1f} KB{size / STOCK_COUNT:>10.0f} B")
+    print()
+    print(f"스냅샷 생성 (StockRecord → MarketSnapshot): {build_time * 1000:.2f} ms")
+    print(f"현재가 갱신 {PRICE_UPDATES:,}건  dict: {dict_update_time * 1000:.1f} ms / 스냅샷: {snapshot_update_time * 1000:.1f} ms"
+          f" ({PRICE_UPDATES / snapshot_update_time:,.0f}건/초)")
+    print(f"전종목 시가총액 합계 계산  dict: {dict_scan_time * 1000:.2f} ms / 스냅샷: {snapshot_scan_time * 1000:.2f} ms")
+    print(f"스냅샷 파일 저장: {dump_time * 1000:.2f} ms / 읽기: {load_time * 1000:.2f} ms / 크기: {file_size / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
+import argparse
 import configparser
 import os
 import logging
 import mysql.connector
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from keyword_matcher import KeywordMatcher
+from news_classification_state import classifier_version, start_id_for, iter_news_batches, max_news_id, save_state
+from news_theme_writer import ThemeResultWriter
+from news_classification_pool import classify_batches, resolve_workers
 
 # --- 로그 설정 ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -65,6 +69,14 @@ NEGATIVE_KEYWORDS = [
     "영업정지", "실적 악화", "주가 조작", "혐의", "논란", "피소"
 ]
 
+# --- 증분 분류 설정 ---
+# 분류 로직(점수 계산, 부정 처리 등)을 바꾸면 올려 주세요. 키워드/가중치 변경은 자동으로 감지됩니다.
+CLASSIFIER_NAME = 'classify_news'
+CLASSIFIER_LOGIC_VERSION = 2  # 2: theme_source 기록 (보조 분류기 결과 보존)
+
+# 테마/부정 키워드 전체를 한 번에 찾는 오토마톤 (모듈 로드 시 한 번만 생성)
+KEYWORD_MATCHER = KeywordMatcher(THEMES_KEYWORDS, NEGATIVE_KEYWORDS)
+
 
 def get_db_connection():
     """config.ini에서 DB 정보를 읽어와 연결을 생성합니다."""
@@ -92,47 +104,26 @@ def get_db_connection():
         return None
 
 def classify_news_item(news_item):
-    """[1단계 개선] 가중치와 부정 키워드를 고려하여 단일 뉴스 아이템의 테마를 분류합니다."""
+    """[1단계 개선] 가중치와 부정 키워드를 고려하여 단일 뉴스 아이템의 테마를 분류합니다. (news_id, 테마, 점수)를 반환합니다."""
     news_id, title, description = news_item
-    text_to_check = (title + ' ' + (description or '')).lower()
 
-    # 1. 부정 키워드가 있는지 먼저 확인
-    for neg_keyword in NEGATIVE_KEYWORDS:
-        if neg_keyword.lower() in text_to_check:
-            # 부정 키워드 발견 시, "부정" 테마로 즉시 분류하고 종료
-            return news_id, "부정" 
+    # 본문을 한 번 훑어 가중치 점수가 가장 높은 테마와 부정 키워드 포함 여부를 함께 구함
+    best_theme, score, negative_keyword = KEYWORD_MATCHER.classify_with_score(title + ' ' + (description or ''))
 
-    # 2. 가중치 기반으로 가장 관련성 높은 테마를 찾기
-    best_theme = None
-    max_score = 0
-    
-    for theme, keywords_with_weights in THEMES_KEYWORDS.items():
-        score = 0
-        for keyword, weight in keywords_with_weights.items():
-            if keyword.lower() in text_to_check:
-                score += weight  # 키워드의 가중치를 점수에 더함
-        
-        # 가장 높은 점수를 가진 테마를 best_theme으로 선정
-        if score > max_score:
-            max_score = score
-            best_theme = theme
-            
-    return news_id, best_theme
-
-def update_theme_in_db(conn, news_id, theme):
-    """데이터베이스에 분류된 테마를 업데이트합니다."""
-    try:
-        cursor = conn.cursor()
-        update_query = "UPDATE stock_news SET theme = %s WHERE id = %s"
-        cursor.execute(update_query, (theme, news_id))
-        cursor.close()
-        return True
-    except mysql.connector.Error as err:
-        logger.error(f"ID {news_id} 테마 업데이트 중 오류 발생: {err}")
-        return False
+    # 부정 키워드 발견 시, 테마 점수와 관계없이 "부정"으로 분류
+    if negative_keyword:
+        return news_id, "부정", None
+    return news_id, best_theme, score or None
 
-def main():
-    """뉴스 테마를 분류하고 데이터베이스를 업데이트하는 메인 함수."""
+def classify_news_batch(batch):
+    """뉴스 배치를 분류합니다. 프로세스 풀 작업자는 모듈을 불러올 때 KEYWORD_MATCHER를 한 번 만들어 둡니다."""
+    return [classify_news_item(news_item) for news_item in batch]
+
+def main(workers=1):
+    """
+    새로 들어온 뉴스(워터마크 이후)만 분류하고, 키워드/가중치가 바뀐 경우에만 전체를 다시 분류합니다.
+    workers가 2 이상이면 프로세스 풀로 분류합니다 (전체 재분류 등 대량 처리용).
+    """
     conn = None
     try:
         conn = get_db_connection()
@@ -141,45 +132,49 @@ def main():
             return
 
         cursor = conn.cursor()
-        # 모든 뉴스를 대상으로 재분류
-        cursor.execute("SELECT id, title, description FROM stock_news")
-        news_to_classify = cursor.fetchall()
-        cursor.close()
+        version = classifier_version(CLASSIFIER_LOGIC_VERSION, THEMES_KEYWORDS, NEGATIVE_KEYWORDS)
+        start_id = start_id_for(cursor, CLASSIFIER_NAME, version)
+        max_id = max_news_id(cursor)
+        logger.info(f"id {start_id} 이후 뉴스를 분류합니다 (분류기 버전 {version}, 작업 프로세스 {workers}개).")
 
-        if not news_to_classify:
-            logger.info("분류할 뉴스가 없습니다.")
-            return
-
-        logger.info(f"총 {len(news_to_classify)}개의 뉴스를 전체 재분류합니다.")
-        
+        writer = ThemeResultWriter(conn, CLASSIFIER_NAME, logger=logger)
+        writer.prepare()
         update_count = 0
-        
-        # ThreadPoolExecutor를 사용하여 병렬 처리
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_news = {executor.submit(classify_news_item, news): news for news in news_to_classify}
-            
-            # DB 커밋을 위한 단일 연결 사용
-            db_conn_writer = get_db_connection()
-            if db_conn_writer is None:
-                logger.error("DB Writer 연결 실패.")
-                return
+        last_id = start_id
 
+        # workers > 1이면 배치를 프로세스 풀에서 분류하고, 결과는 배치 순서대로 이 연결 하나로 저장
+        for batch, results in classify_batches(iter_news_batches(conn, start_id, max_id), classify_news_batch, workers):
             try:
-                for future in as_completed(future_to_news):
-                    news_id, theme = future.result()
-                    
-                    if update_theme_in_db(db_conn_writer, news_id, theme):
-                        update_count += 1
-                
-                db_conn_writer.commit() # 모든 업데이트가 끝난 후 한 번에 커밋
-                logger.info(f"총 {update_count}개의 뉴스 테마를 성공적으로 업데이트하고 커밋했습니다.")
+                # 배치 결과를 임시 테이블에 모아 조인 UPDATE로 한 번에 반영
+                update_count += writer.write(results)
+                # 이 구간의 재송고 기사는 분류하지 않고 대표 기사의 테마를 복사
+                writer.propagate(last_id, batch[-1][0])
+                # 배치의 테마 업데이트와 워터마크를 함께 커밋해 중단되어도 다음 실행이 이어서 처리
+                save_state(cursor, CLASSIFIER_NAME, version, batch[-1][0])
+                conn.commit()
+                last_id = batch[-1][0]
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"업데이트 중 오류가 발생하여 롤백합니다 (id {batch[0][0]}~{batch[-1][0]}): {e}")
+                return
+            logger.info(f"id {batch[-1][0]}까지 분류했습니다 (누적 {update_count}건).")
 
+        # 마지막 대표 기사 배치 뒤(또는 대표 기사 없이)에 들어온 재송고 기사도 테마를 복사하고 워터마크를 끝까지 올림
+        if max_id > last_id:
+            try:
+                writer.propagate(last_id, max_id)
+                save_state(cursor, CLASSIFIER_NAME, version, max_id)
+                conn.commit()
             except Exception as e:
-                db_conn_writer.rollback()
-                logger.error(f"업데이트 중 오류가 발생하여 롤백합니다: {e}")
-            finally:
-                if db_conn_writer and db_conn_writer.is_connected():
-                    db_conn_writer.close()
+                conn.rollback()
+                logger.error(f"재송고 기사 테마 복사 중 오류가 발생하여 롤백합니다 (id {last_id + 1}~{max_id}): {e}")
+                return
+
+        if update_count:
+            logger.info(f"총 {update_count}개의 뉴스 테마를 성공적으로 업데이트하고 커밋했습니다.")
+        else:
+            logger.info("새로 분류할 뉴스가 없습니다.")
+        cursor.close()
 
     except mysql.connector.Error as err:
         logger.error(f"스크립트 실행 중 DB 오류 발생: {err}")
@@ -191,4 +186,8 @@ def main():
             logger.info("메인 데이터베이스 연결을 닫습니다.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="뉴스 테마 증분 분류 (가중치 키워드 + 부정 키워드)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="분류 프로세스 수 (기본 1, 0이면 CPU 코어 수). 전체 재분류 시 늘리면 코어 수만큼 빨라집니다.")
+    args = parser.parse_args()
+    main(resolve_workers(args.workers))
\ No newline at end of file
@@ -1,3 +1,4 @@
+import datetime
 import json
 import sys
 import logging
@@ -5,6 +6,11 @@ import os
 import configparser
 import pandas as pd
 from kiwoom_api import KiwoomAPI, logger
+from tick_bar_aggregator import load_session_bars
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+MINUTE_HISTORY_DIR = os.path.join(PROJECT_ROOT, 'data', 'minute_history')  # 종목별 오늘 API 분봉 이력 캐시
 
 def calculate_moving_averages(df):
     """Pandas를 사용하여 이동평균선을 계산합니다."""
@@ -55,44 +61,129 @@ def standardize_chart_data(raw_chart_data, chart_type):
     
     return standardized_data
 
-def get_chart_data_from_api(stock_code, chart_type):
+def standardize_session_bars(bars, prev_close=None):
+    """
+    실시간 수집기가 저장한 오늘 분봉(stock_bars)을 API 분봉과 같은 형식으로 변환합니다.
+    API 분봉의 change는 전일 종가 대비이므로 prev_close(전일 종가)를 주면 같은 기준으로 계산하고,
+    없으면 (API 조회 실패 시) 직전 봉 종가 대비로 계산합니다.
+    """
+    standardized_data = []
+    prev_bar_close = None
+    for bar in bars:
+        close_price = float(bar['close_price'])
+        if prev_close is not None:
+            base = prev_close
+        else:
+            base = prev_bar_close if prev_bar_close is not None else float(bar['open_price'])
+        standardized_data.append({
+            'date': bar['bar_time'].strftime('%Y%m%d%H%M%S'),
+            'open': float(bar['open_price']),
+            'high': float(bar['high_price']),
+            'low': float(bar['low_price']),
+            'close': close_price,
+            'volume': int(bar['volume']),
+            'change': close_price - base,
+            'prev_close': base,
+        })
+        prev_bar_close = close_price
+    return standardized_data
+
+def merge_session_bars(chart_data, session_bars):
     """
-    API에서 직접 차트 데이터를 조회하고, 표준화 및 이동평균선 계산 후 JSON으로 반환합니다.
+    API 분봉(여러 날) 위에 오늘 실시간 분봉을 덮어씁니다. 같은 시각의 봉은 실시간 분봉(형성 중 봉 포함)이 우선하고,
+    API에 아직 없는 최근 봉은 추가합니다. 결과는 API 응답과 같은 정렬 방향을 유지합니다.
     """
+    today = session_bars[0]['bar_time'].strftime('%Y%m%d')
+    # 오늘 API 분봉에서 전일 종가를 얻어 실시간 분봉의 change도 전일 종가 대비로 맞춤
+    prev_close = next((item['prev_close'] for item in chart_data if item['date'].startswith(today)), None)
+    merged = {item['date']: item for item in chart_data}
+    for item in standardize_session_bars(session_bars, prev_close):
+        merged[item['date']] = item
+    descending = len(chart_data) > 1 and chart_data[0]['date'] > chart_data[-1]['date']
+    return sorted(merged.values(), key=lambda item: item['date'], reverse=descending)
+
+def load_minute_history(stock_code, path=None):
+    """오늘 받아 둔 API 분봉 이력(표준화된 형식)을 반환합니다. 없거나 날짜가 지났으면 None."""
+    path = path or os.path.join(MINUTE_HISTORY_DIR, f"{stock_code}.json")
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('date') != datetime.date.today().isoformat():
+        return None
+    return data.get('bars')
+
+def save_minute_history(stock_code, chart_data, path=None):
+    """API 분봉 이력을 오늘 날짜와 함께 원자적으로 저장합니다. (같은 날 다시 REST로 받지 않도록)"""
+    path = path or os.path.join(MINUTE_HISTORY_DIR, f"{stock_code}.json")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'date': datetime.date.today().isoformat(), 'bars': chart_data}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"분봉 이력 캐시 저장 실패 ({stock_code}): {e}")
+
+def fetch_chart_data(stock_code, chart_type):
+    """REST로 차트 데이터를 조회해 표준화된 리스트로 반환합니다. 실패하면 오류 메시지 문자열을 반환합니다."""
     api = KiwoomAPI()
     if not api.token:
-        return json.dumps({"error": "API 접근 토큰을 발급받을 수 없습니다."})
+        return "API 접근 토큰을 발급받을 수 없습니다."
+    response = api.get_chart_data(stock_code, chart_type)
+    if not response:
+        return f"API로부터 데이터를 가져오지 못했습니다: {stock_code}, {chart_type}"
 
+    chart_data_key_map = {
+        'daily': 'stk_dt_pole_chart_qry', 'weekly': 'stk_wk_pole_chart_qry', 'minute': 'stk_min_pole_chart_qry'
+    }
+    raw_data = response.get(chart_data_key_map.get(chart_type), [])
+    return standardize_chart_data(raw_data, chart_type)
+
+def to_json_records(chart_data, chart_type):
+    """표준화된 차트 데이터에 (일봉/주봉이면) 이동평균선을 붙여 JSON으로 반환합니다."""
+    df = pd.DataFrame(chart_data)
+    if df.empty:
+        return json.dumps([])
+
+    # 일봉/주봉의 경우 이동평균선 계산
+    if chart_type in ['daily', 'weekly']:
+        df = calculate_moving_averages(df)
+
+    # NaN 값을 None으로 변환하여 JSON 호환성 확보
+    df = df.astype(object).where(pd.notnull(df), None)
+
+    return json.dumps(df.to_dict('records'))
+
+def get_chart_data_from_api(stock_code, chart_type):
+    """
+    차트 데이터를 조회하고, 표준화 및 이동평균선 계산 후 JSON으로 반환합니다.
+    장중 분봉은 실시간 수집기(tick_bar_aggregator)가 만든 오늘 분봉(형성 중 봉 포함)으로 응답하고,
+    여러 날 분봉 이력(ka10080)은 하루 한 번만 받아 data/minute_history에 두고 재사용합니다.
+    REST 분봉 조회는 오늘 이력 캐시가 없을 때, 또는 실시간 분봉이 없거나 오래됐을 때만 합니다.
+    """
     try:
-        response = api.get_chart_data(stock_code, chart_type)
-        if not response:
-            return json.dumps({"error": f"API로부터 데이터를 가져오지 못했습니다: {stock_code}, {chart_type}"})
+        session_bars = load_session_bars(stock_code, '1m') if chart_type == 'minute' else []
+        if session_bars:
+            history = load_minute_history(stock_code)
+            if history is None:
+                fetched = fetch_chart_data(stock_code, chart_type)
+                if isinstance(fetched, str):
+                    # 이력 조회가 실패해도 장중에는 오늘 분봉만으로 응답
+                    logger.warning(f"분봉 이력 조회 실패, 오늘 분봉만 반환합니다: {fetched}")
+                    return json.dumps(standardize_session_bars(session_bars))
+                history = fetched
+                save_minute_history(stock_code, history)
+            return to_json_records(merge_session_bars(history, session_bars), chart_type)
 
-        chart_data_key_map = {
-            'daily': 'stk_dt_pole_chart_qry', 'weekly': 'stk_wk_pole_chart_qry', 'minute': 'stk_min_pole_chart_qry'
-        }
-        raw_data = response.get(chart_data_key_map.get(chart_type), [])
-        
-        if not raw_data:
-            return json.dumps([])
+        chart_data = fetch_chart_data(stock_code, chart_type)
+        if isinstance(chart_data, str):
+            return json.dumps({"error": chart_data})
+        if chart_type == 'minute' and chart_data:
+            save_minute_history(stock_code, chart_data)
+        return to_json_records(chart_data, chart_type)
 
-        # 데이터 표준화
-        chart_data = standardize_chart_data(raw_data, chart_type)
-        
-        # 데이터프레임으로 변환
-        df = pd.DataFrame(chart_data)
-        if df.empty:
-            return json.dumps([])
-
-        # 일봉/주봉의 경우 이동평균선 계산
-        if chart_type in ['daily', 'weekly']:
-            df = calculate_moving_averages(df)
-        
-        # NaN 값을 None으로 변환하여 JSON 호환성 확보
-        df = df.astype(object).where(pd.notnull(df), None)
-        
-        return json.dumps(df.to_dict('records'))
-            
     except Exception as e:
         logger.error(f"데이터 처리 중 오류 발생: {e}", exc_info=True)
         return json.dumps({"error": f"데이터 처리 중 심각한 오류 발생: {e}"})
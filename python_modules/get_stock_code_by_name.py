@@ -5,6 +5,7 @@ import logging
 import mysql.connector
 import os
 import configparser
+from market_snapshot import load_snapshot
 
 # --- 로그 설정 ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -35,10 +36,24 @@ def get_db_connection():
         logger.error(f"DB 설정 또는 연결 오류: {e}")
         return None
 
+def find_in_snapshot(snapshot, stock_name):
+    """시장 스냅샷에서 종목명이 정확히 같은 종목, 없으면 이름에 포함된 첫 종목을 찾습니다."""
+    partial = None
+    for code, name in zip(snapshot.codes, snapshot.names):
+        if name == stock_name:
+            return {"stock_code": code}
+        if partial is None and name and stock_name in name:
+            partial = {"stock_code": code, "found_name": name}
+    return partial or {"error": f"'{stock_name}'에 해당하는 종목을 찾을 수 없습니다."}
+
 def get_stock_code_by_name(stock_name):
     """
-    stock_details 테이블에서 종목명으로 종목 코드를 조회합니다.
+    종목명으로 종목 코드를 조회합니다. 시장 스냅샷이 있으면 DB 조회 없이 찾고, 없으면 stock_details 테이블을 조회합니다.
     """
+    snapshot = load_snapshot()
+    if snapshot is not None:
+        return find_in_snapshot(snapshot, stock_name)
+
     conn = get_db_connection()
     if conn is None:
         return {"error": "데이터베이스 연결 실패"}
@@ -3,10 +3,13 @@ import configparser
 import os
 import logging
 import mysql.connector
-import requests
-from datetime import datetime
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+from keyword_matcher import get_matcher
+from naver_news_async import NaverNewsCollector, NewsBatchWriter, news_item_to_row
+from news_dedup import NearDuplicateIndex
+from news_ingest import insert_news
+from news_search_index import prepare_search_index, refresh_search_index
 
 # --- 로그 설정 ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -109,97 +112,52 @@ def get_top_30_stocks():
         logger.error(f"상승률 데이터 가져오기 오류: {e}")
         return []
 
-def search_naver_news(query, client_id, client_secret, display=3):
-    """네이버 뉴스 API를 사용하여 뉴스를 검색합니다."""
-    naver_api_url = "https://openapi.naver.com/v1/search/news.json"
-    headers = {"X-Naver-Client-Id": client_id, "X-Naver-Client-Secret": client_secret}
-    params = {"query": query, "display": display, "sort": "date"}
-    try:
-        response = requests.get(naver_api_url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"네이버 뉴스 API 호출 중 오류 발생 (쿼리: {query}): {e}")
-        return None
-
-def save_news_to_db(conn, stock_code, news_items):
-    """검색된 뉴스 데이터를 데이터베이스에 저장하고 새로 삽입된 뉴스의 ID를 반환합니다."""
+def classify_news_row(row):
+    """stock_news 행 (stock_code, title, link, description, pub_date)의 테마를 기본 키워드로 분류합니다 (없으면 None)."""
+    best_theme, _ = get_matcher(BASIC_THEMES_KEYWORDS).classify(row[1] + ' ' + (row[3] or ''))
+    return best_theme
+
+def save_and_classify(conn, entries, dedup=None):
+    """
+    수집된 (종목, 기사 목록) 묶음을 저장하고 새로 들어온 뉴스의 테마를 분류합니다. 연결 하나를 계속 사용합니다.
+    테마는 저장 전에 메모리에서 분류해 여러 행 INSERT IGNORE에 함께 넣으므로, 묶음 하나가 왕복 1~2번에 커밋 한 번입니다.
+    dedup(유사 기사 색인)이 주어지면 재송고 기사는 다시 분류하지 않고 대표 기사의 테마를 받습니다.
+    새 기사는 커밋 후 검색 색인에 반영합니다. 새로 삽입된 뉴스의 id 목록을 반환합니다.
+    """
+    rows = [news_item_to_row(stock['code'], item) for stock, items in entries for item in items]
+    if not rows:
+        return []
     cursor = conn.cursor()
-    new_news_ids = []
-    for item in news_items:
-        title = item.get('title', '').replace('<b>', '').replace('</b>', '')
-        link = item.get('link', '')
-        description = item.get('description', '').replace('<b>', '').replace('</b>', '')
-        try:
-            pub_date_str = item.get('pubDate', '')
-            pub_date = datetime.strptime(pub_date_str, '%a, %d %b %Y %H:%M:%S %z')
-            pub_date_formatted = pub_date.strftime('%Y-%m-%d %H:%M:%S')
-        except (ValueError, TypeError):
-            pub_date_formatted = None
-        
-        try:
-            # ON DUPLICATE KEY UPDATE 대신 INSERT IGNORE 사용
-            insert_query = "INSERT IGNORE INTO stock_news (stock_code, title, link, description, pub_date) VALUES (%s, %s, %s, %s, %s)"
-            cursor.execute(insert_query, (stock_code, title, link, description, pub_date_formatted))
-            if cursor.lastrowid:
-                new_news_ids.append(cursor.lastrowid)
-        except mysql.connector.Error as err:
-            logger.error(f"뉴스 데이터 저장 중 오류 발생: {err}")
-    
-    conn.commit()
-    cursor.close()
-    logger.info(f"{stock_code} 관련 뉴스 {len(new_news_ids)}건 신규 저장 완료.")
-    return new_news_ids
-
-def classify_and_update_theme(conn, news_id):
-    """단일 뉴스의 테마를 분류하고 DB에 업데이트합니다."""
-    cursor = conn.cursor(dictionary=True)
+    if dedup is not None:
+        dedup.begin()
     try:
-        cursor.execute("SELECT title, description FROM stock_news WHERE id = %s", (news_id,))
-        news_item = cursor.fetchone()
-        if not news_item:
-            return
-
-        text_to_check = (news_item['title'] + ' ' + (news_item['description'] or '')).lower()
-        best_theme = None
-        max_score = 0
-        
-        for theme, keywords in BASIC_THEMES_KEYWORDS.items():
-            score = sum(1 for keyword in keywords if keyword.lower() in text_to_check)
-            if score > max_score:
-                max_score = score
-                best_theme = theme
-        
-        if best_theme:
-            cursor.execute("UPDATE stock_news SET theme = %s WHERE id = %s", (best_theme, news_id))
-            conn.commit()
-            logger.info(f"뉴스 ID {news_id}에 테마 '{best_theme}'를 할당했습니다.")
-
+        inserted = insert_news(cursor, rows, classify=classify_news_row, dedup=dedup)
+        conn.commit()
+        if dedup is not None:
+            dedup.commit()
     except mysql.connector.Error as err:
-        logger.error(f"뉴스 ID {news_id} 테마 분류/업데이트 중 오류: {err}")
+        conn.rollback()
+        logger.error(f"뉴스 데이터 저장 중 오류 발생: {err}")
+        return []
     finally:
         cursor.close()
-
-def process_stock(stock, client_id, client_secret):
-    """단일 종목에 대한 뉴스 수집 및 테마 분류를 처리합니다."""
-    conn = get_db_connection()
-    if conn is None:
-        return
-    
-    try:
-        query = f"{stock['stock_name']}"
-        logger.info(f"'{stock['stock_name']}' ({stock['stock_code']}) 관련 뉴스 검색 중...")
-        news_data = search_naver_news(query, client_id, client_secret, display=5)
-        
-        if news_data and 'items' in news_data:
-            new_ids = save_news_to_db(conn, stock['stock_code'], news_data['items'])
-            for news_id in new_ids:
-                classify_and_update_theme(conn, news_id)
-        else:
-            logger.info(f"'{stock['stock_name']}' 관련 뉴스를 찾지 못했습니다.")
-    finally:
-        if conn.is_connected():
-            conn.close()
+        if dedup is not None:
+            dedup.rollback()  # 커밋하지 못한 색인 변경(롤백된 id로 바꾼 키 등)을 되돌림
+    themed = sum(1 for _, _, theme in inserted if theme)
+    logger.info(f"{len(entries)}개 종목 관련 뉴스 {len(inserted)}건 신규 저장 완료 (테마 할당 {themed}건).")
+    if inserted:
+        refresh_search_index(conn)
+    return [news_id for news_id, _, _ in inserted]
+
+async def collect_top_stock_news(conn, top_stocks, client_id, client_secret, dedup=None):
+    """상위 종목 뉴스를 하나의 HTTP 연결 풀로 동시에 검색합니다. 순위가 높은 종목부터 요청합니다."""
+    collector = NaverNewsCollector(client_id, client_secret, display=5)
+    stocks = [
+        {'code': stock['stock_code'], 'name': stock['stock_name'], 'priority': rank}
+        for rank, stock in enumerate(top_stocks)
+    ]
+    writer = NewsBatchWriter(lambda entries: save_and_classify(conn, entries, dedup))
+    await collector.collect(stocks, writer)
 
 def main():
     """메인 실행 함수"""
@@ -210,24 +168,25 @@ def main():
     if conn is None: return
     
     client_id, client_secret = get_naver_api_keys()
-    if not all([client_id, client_secret]): return
+    if not all([client_id, client_secret]):
+        conn.close()
+        return
 
     # 상위 30위 종목 가져오기
     top_stocks = get_top_30_stocks()
-    conn.close() # 메인 연결은 여기서 닫음
-
     if not top_stocks:
         logger.warning("처리할 상위 종목이 없습니다.")
+        conn.close()
         return
 
-    # 병렬 처리
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [executor.submit(process_stock, stock, client_id, client_secret) for stock in top_stocks]
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f"종목 처리 중 오류 발생: {e}")
+    # 검색은 동시에, 저장과 테마 분류는 이 연결 하나로 모아서 처리
+    try:
+        dedup = NearDuplicateIndex.load(conn, logger=logger)
+        prepare_search_index(conn)
+        asyncio.run(collect_top_stock_news(conn, top_stocks, client_id, client_secret, dedup))
+    finally:
+        if conn.is_connected():
+            conn.close()
 
     end_time = time.time()
     logger.info(f"모든 작업 완료. 총 소요 시간: {end_time - start_time:.2f}초")
@@ -0,0 +1,148 @@
+import threading
+from collections import deque
+
+class KeywordMatcher:
+    """
+    테마 키워드 전체를 Aho-Corasick 오토마톤 하나로 컴파일해 뉴스 본문을 한 번만 훑어 테마별 점수를 계산합니다.
+    키워드마다 `keyword.lower() in text`를 반복하던 기존 방식과 결과가 같습니다.
+
+    - 대소문자 구분 없이 부분 문자열로 일치하며, 같은 키워드는 본문에 여러 번 나와도 한 번만 셉니다.
+    - 테마별 점수는 일치한 키워드 가중치의 합입니다 (키워드 목록이 list면 가중치 1).
+    - 점수가 같으면 먼저 정의된 테마를 고릅니다.
+
+    themes_keywords: {테마: {키워드: 가중치}} 또는 {테마: [키워드, ...]}
+    negative_keywords: 하나라도 있으면 classify()가 테마 대신 알려 주는 부정 키워드 목록
+    """
+
+    def __init__(self, themes_keywords, negative_keywords=()):
+        self.themes = list(themes_keywords)
+        self.negative_keywords = list(negative_keywords)
+        self.goto = [{}]      # 상태별 다음 문자 전이
+        self.fail = [0]       # 실패 링크
+        self.outputs = [()]   # 상태에서 끝나는 패턴 번호 (실패 링크로 이어진 접미사 패턴 포함)
+        self.pattern_hits = []  # 패턴 번호 -> ((테마 번호, 가중치), ...)
+        self.negative_patterns = {}  # 패턴 번호 -> (정의 순서, 원래 부정 키워드)
+        patterns = {}
+
+        def add_pattern(keyword):
+            keyword = keyword.lower()
+            if keyword not in patterns:
+                patterns[keyword] = len(patterns)
+                self.pattern_hits.append({})
+            return patterns[keyword]
+
+        for theme_index, theme in enumerate(self.themes):
+            keywords = themes_keywords[theme]
+            items = keywords.items() if isinstance(keywords, dict) else ((keyword, 1) for keyword in keywords)
+            for keyword, weight in items:
+                if not keyword:
+                    continue  # 빈 문자열은 모든 본문에 '포함'되어 점수를 왜곡하므로 제외
+                hits = self.pattern_hits[add_pattern(keyword)]
+                hits[theme_index] = hits.get(theme_index, 0) + weight
+        for order, keyword in enumerate(self.negative_keywords):
+            if keyword:
+                self.negative_patterns.setdefault(add_pattern(keyword), (order, keyword))
+        self.pattern_hits = [tuple(hits.items()) for hits in self.pattern_hits]
+        self.pattern_count = len(patterns)
+        self._build(patterns)
+
+    def _build(self, patterns):
+        goto, outputs = self.goto, self.outputs
+        for keyword, pattern_id in patterns.items():
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    self.fail.append(0)
+                    outputs.append(())
+                state = next_state
+            outputs[state] += (pattern_id,)
+
+        # 너비 우선으로 실패 링크를 채우고, 접미사 상태의 출력을 미리 합쳐 검색 중 링크를 따라가지 않도록 합니다.
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                if outputs[self.fail[next_state]]:
+                    outputs[next_state] += outputs[self.fail[next_state]]
+
+    def find(self, text):
+        """본문(이미 소문자)에 나타난 패턴 번호 집합을 반환합니다."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = set()
+        state = 0
+        for ch in text:
+            next_state = goto[state].get(ch)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(ch)
+            if next_state is None:
+                state = 0
+                continue
+            state = next_state
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def scan(self, text):
+        """본문을 한 번 훑어 ({테마: 점수}, 처음 정의된 순서상 첫 부정 키워드 또는 None)을 반환합니다."""
+        found = self.find(text.lower())
+        scores = {}
+        negative = None
+        for pattern_id in found:
+            for theme_index, weight in self.pattern_hits[pattern_id]:
+                scores[theme_index] = scores.get(theme_index, 0) + weight
+        if self.negative_patterns:
+            negative_hits = [self.negative_patterns[pattern_id] for pattern_id in found if pattern_id in self.negative_patterns]
+            if negative_hits:
+                negative = min(negative_hits)[1]
+        return {self.themes[theme_index]: score for theme_index, score in scores.items()}, negative
+
+    def classify(self, text):
+        """(가장 점수가 높은 테마 또는 None, 부정 키워드 또는 None)을 반환합니다."""
+        best_theme, _, negative = self.classify_with_score(text)
+        return best_theme, negative
+
+    def classify_with_score(self, text):
+        """(가장 점수가 높은 테마 또는 None, 그 점수, 부정 키워드 또는 None)을 반환합니다."""
+        scores, negative = self.scan(text)
+        best_theme = None
+        max_score = 0
+        for theme in self.themes:
+            score = scores.get(theme, 0)
+            if score > max_score:
+                max_score = score
+                best_theme = theme
+        return best_theme, max_score, negative
+
+# --- 키워드 집합별 매처 캐시 ---
+# 같은 키워드 dict 객체로 여러 번 호출하면 오토마톤을 한 번만 만듭니다.
+# dict 내용을 바꿨다면 새 dict를 넘기거나 clear_matcher_cache()를 호출해야 합니다.
+_matcher_cache = {}
+_matcher_cache_lock = threading.Lock()
+
+def get_matcher(themes_keywords, negative_keywords=()):
+    """키워드 집합에 대한 KeywordMatcher를 반환합니다. 여러 스레드가 동시에 불러도 한 번만 만듭니다."""
+    key = (id(themes_keywords), id(negative_keywords))
+    cached = _matcher_cache.get(key)
+    if cached is not None and cached[0] is themes_keywords and cached[1] is negative_keywords:
+        return cached[2]
+    with _matcher_cache_lock:
+        cached = _matcher_cache.get(key)
+        if cached is None or cached[0] is not themes_keywords or cached[1] is not negative_keywords:
+            cached = (themes_keywords, negative_keywords, KeywordMatcher(themes_keywords, negative_keywords))
+            _matcher_cache[key] = cached
+    return cached[2]
+
+def clear_matcher_cache():
+    with _matcher_cache_lock:
+        _matcher_cache.clear()
@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import struct
+import sys
+from array import array
+from stock_record import StockRecord
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+SNAPSHOT_FILE = os.path.join(PROJECT_ROOT, 'data', 'market_snapshot.bin')
+
+# --- 숫자 컬럼 (값이 없으면 MISSING으로 저장) ---
+NUMERIC_COLUMNS = ('current_price', 'previous_day_closing_price', 'circulating_shares', 'listed_shares')
+MISSING = -1
+
+# --- 스냅샷 파일 형식: 매직 + 헤더(JSON) 길이 + 헤더 + 컬럼별 바이트 ---
+SNAPSHOT_MAGIC = b'MKTSNAP1'
+
+logger = logging.getLogger(__name__)
+
+class MarketSnapshot:
+    """
+    전종목 시세를 컬럼 단위 array('q')로 보관하는 스냅샷 컨테이너입니다.
+    종목마다 dict/객체를 만드는 대신 종목코드 → 행 번호 인덱스 하나와 숫자 배열 몇 개만 유지하므로
+    수집기, 스크리너, 웹 데몬이 같은 구조를 적은 메모리로 공유할 수 있습니다.
+    시장/업종 문자열은 코드 테이블에 한 번만 저장하고 행에는 번호(array('H'))만 둡니다.
+    """
+
+    def __init__(self):
+        self.codes = []
+        self.names = []
+        self.index = {}
+        self.market_ids = array('H')
+        self.sector_ids = array('H')
+        self.market_labels = []
+        self.sector_labels = []
+        self._label_ids = ({}, {})
+        self.columns = {name: array('q') for name in NUMERIC_COLUMNS}
+
+    @classmethod
+    def from_records(cls, records):
+        snapshot = cls()
+        for record in records:
+            snapshot.upsert(record)
+        return snapshot
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, stock_code):
+        return stock_code in self.index
+
+    def __iter__(self):
+        for row in range(len(self.codes)):
+            yield self.record_at(row)
+
+    def _label_id(self, kind, label):
+        ids = self._label_ids[kind]
+        labels = self.market_labels if kind == 0 else self.sector_labels
+        label_id = ids.get(label)
+        if label_id is None:
+            label_id = len(labels)
+            labels.append(label)
+            ids[label] = label_id
+        return label_id
+
+    def upsert(self, record):
+        """StockRecord를 추가하거나 같은 종목코드의 행을 갱신하고 행 번호를 반환합니다."""
+        row = self.index.get(record.stock_code)
+        if row is None:
+            row = len(self.codes)
+            self.index[record.stock_code] = row
+            self.codes.append(sys.intern(record.stock_code))
+            self.names.append(record.stock_name)
+            self.market_ids.append(self._label_id(0, record.market))
+            self.sector_ids.append(self._label_id(1, record.sector))
+            for name, column in self.columns.items():
+                value = getattr(record, name)
+                column.append(MISSING if value is None else value)
+            return row
+
+        self.names[row] = record.stock_name
+        self.market_ids[row] = self._label_id(0, record.market)
+        self.sector_ids[row] = self._label_id(1, record.sector)
+        for name, column in self.columns.items():
+            value = getattr(record, name)
+            column[row] = MISSING if value is None else value
+        return row
+
+    def update_price(self, stock_code, current_price):
+        """실시간 체결 등으로 현재가만 바뀐 경우 해당 행만 갱신합니다. 모르는 종목이면 False."""
+        row = self.index.get(stock_code)
+        if row is None:
+            return False
+        self.columns['current_price'][row] = current_price
+        return True
+
+    def get_value(self, stock_code, column_name):
+        row = self.index.get(stock_code)
+        if row is None:
+            return None
+        value = self.columns[column_name][row]
+        return None if value == MISSING else value
+
+    def record_at(self, row):
+        """행 번호의 데이터를 StockRecord로 만들어 반환합니다."""
+        values = {}
+        for name, column in self.columns.items():
+            value = column[row]
+            values[name] = None if value == MISSING else value
+        return StockRecord(
+            stock_code=self.codes[row],
+            stock_name=self.names[row],
+            market=self.market_labels[self.market_ids[row]],
+            sector=self.sector_labels[self.sector_ids[row]],
+            **values,
+        )
+
+    def get(self, stock_code):
+        row = self.index.get(stock_code)
+        return None if row is None else self.record_at(row)
+
+    def market_of(self, stock_code):
+        row = self.index.get(stock_code)
+        return None if row is None else self.market_labels[self.market_ids[row]]
+
+    def sector_of(self, stock_code):
+        row = self.index.get(stock_code)
+        return None if row is None else self.sector_labels[self.sector_ids[row]]
+
+    def dump(self, path=SNAPSHOT_FILE):
+        """
+        스냅샷을 파일로 저장합니다. 다른 프로세스(웹 데몬 등)는 load()로 API/DB 조회 없이 읽습니다.
+        임시 파일에 쓴 뒤 교체하므로 읽는 쪽이 쓰다 만 파일을 보지 않습니다.
+        """
+        header = {
+            'count': len(self.codes),
+            'codes': self.codes,
+            'names': self.names,
+            'market_labels': self.market_labels,
+            'sector_labels': self.sector_labels,
+            'columns': list(self.columns),
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            self.market_ids.tofile(f)
+            self.sector_ids.tofile(f)
+            for column in self.columns.values():
+                column.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_FILE):
+        """dump()로 저장한 스냅샷 파일을 읽습니다."""
+        snapshot = cls()
+        with open(path, 'rb') as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"스냅샷 파일 형식이 올바르지 않습니다: {path}")
+            header_len, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            count = header['count']
+
+            snapshot.codes = [sys.intern(code) for code in header['codes']]
+            snapshot.names = header['names']
+            snapshot.index = {code: row for row, code in enumerate(snapshot.codes)}
+            snapshot.market_labels = header['market_labels']
+            snapshot.sector_labels = header['sector_labels']
+            snapshot._label_ids = (
+                {label: i for i, label in enumerate(snapshot.market_labels)},
+                {label: i for i, label in enumerate(snapshot.sector_labels)},
+            )
+            snapshot.market_ids.fromfile(f, count)
+            snapshot.sector_ids.fromfile(f, count)
+            for name in header['columns']:
+                column = array('q')
+                column.fromfile(f, count)
+                snapshot.columns[name] = column
+        return snapshot
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """
+    stock_universe_pipeline.py가 남긴 스냅샷을 읽습니다. 파일이 없거나 형식이 다르면 None을 반환하므로
+    호출하는 쪽은 그때만 stock_details를 조회합니다.
+    """
+    try:
+        return MarketSnapshot.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.info(f"시장 스냅샷을 사용할 수 없습니다: {e}")
+        return None
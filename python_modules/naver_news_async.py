@@ -0,0 +1,291 @@
+import asyncio
+import datetime
+import heapq
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from news_freshness import MAX_PAGES
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+QUOTA_FILE = os.path.join(PROJECT_ROOT, 'data', 'naver_news_quota.json')
+
+# --- 네이버 검색 API 설정 ---
+NAVER_NEWS_URL = "https://openapi.naver.com/v1/search/news.json"
+NAVER_DAILY_QUOTA = 25000   # 검색 API 일일 호출 한도 (애플리케이션 단위, 자정 초기화)
+MAX_SEARCH_START = 1000     # 검색 API start 파라미터 최댓값
+NAVER_QPS = 10              # 초당 요청 수 (이를 넘으면 429 / 오류 코드 012)
+CONCURRENCY = 8             # 동시에 진행하는 요청 수 (응답 지연을 가리는 만큼만)
+MAX_RETRIES = 3             # 429/일시 오류 재시도 횟수
+RETRY_DELAY = 1.0           # 초, 재시도 전 대기 (시도마다 두 배)
+QUOTA_SAVE_EVERY = 50       # 요청 N건마다 사용량 파일 갱신
+
+# --- DB 일괄 저장 설정 ---
+WRITE_BATCH_SIZE = 500      # 기사 N건이 모이면 저장
+WRITE_FLUSH_INTERVAL = 2.0  # 초, 덜 모였어도 이 간격마다 저장
+
+logger = logging.getLogger(__name__)
+
+_RETRY = object()  # 재시도할 만한 응답(429, 5xx, 연결 오류) 표시
+FETCH_FAILED = object()  # fetch_stock 실패 표시 (재시도 소진, 401 등 비정상 응답). 빈 결과와 구분해 상태를 갱신하지 않음
+
+class QuotaExhausted(Exception):
+    """오늘 사용할 수 있는 검색 API 호출 수를 모두 썼습니다."""
+
+def clean_news_text(text):
+    return (text or '').replace('<b>', '').replace('</b>', '')
+
+def parse_pub_date(pub_date_str):
+    """RFC 822 날짜(예: Sat, 26 Jul 2025 09:00:00 +0900)를 'YYYY-MM-DD HH:MM:SS'로 바꿉니다. 실패 시 None."""
+    try:
+        return datetime.datetime.strptime(pub_date_str, '%a, %d %b %Y %H:%M:%S %z').strftime('%Y-%m-%d %H:%M:%S')
+    except (ValueError, TypeError):
+        return None
+
+def news_item_to_row(stock_code, item):
+    """검색 API 기사 하나를 stock_news 행 (stock_code, title, link, description, pub_date)으로 바꿉니다."""
+    return (
+        stock_code,
+        clean_news_text(item.get('title')),
+        item.get('link', ''),
+        clean_news_text(item.get('description')),
+        parse_pub_date(item.get('pubDate', '')),
+    )
+
+class NaverRateLimiter:
+    """
+    초당 요청 수(qps)와 일일 한도를 함께 지키는 요청 허가기입니다.
+    일일 사용량은 날짜별로 파일에 남겨 같은 날 여러 번 실행하거나 여러 수집기가 번갈아 돌아도 한도를 넘지 않습니다.
+    """
+
+    def __init__(self, qps=NAVER_QPS, daily_quota=NAVER_DAILY_QUOTA, quota_path=QUOTA_FILE):
+        self.interval = 1.0 / qps
+        self.daily_quota = daily_quota
+        self.quota_path = quota_path
+        self.lock = asyncio.Lock()
+        self.next_at = 0.0
+        self.day, self.used = self._load_usage()
+        self.unsaved = 0
+
+    def _load_usage(self):
+        today = datetime.date.today().isoformat()
+        try:
+            with open(self.quota_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('date') == today:
+                return today, int(data.get('used', 0))
+        except (OSError, ValueError):
+            pass
+        return today, 0
+
+    def save_usage(self):
+        os.makedirs(os.path.dirname(self.quota_path), exist_ok=True)
+        tmp_path = f"{self.quota_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'date': self.day, 'used': self.used}, f)
+        os.replace(tmp_path, self.quota_path)
+        self.unsaved = 0
+
+    @property
+    def remaining(self):
+        return max(0, self.daily_quota - self.used)
+
+    async def acquire(self):
+        """요청 하나를 허가합니다. 간격을 맞춰 기다리고, 오늘 한도를 다 썼으면 QuotaExhausted."""
+        async with self.lock:
+            today = datetime.date.today().isoformat()
+            if today != self.day:
+                self.day, self.used = today, 0  # 자정이 지나 한도 초기화
+            if self.used >= self.daily_quota:
+                raise QuotaExhausted()
+            now = time.monotonic()
+            if self.next_at > now:
+                await asyncio.sleep(self.next_at - now)
+            self.next_at = max(now, self.next_at) + self.interval
+            self.used += 1
+            self.unsaved += 1
+            if self.unsaved >= QUOTA_SAVE_EVERY:
+                self.save_usage()
+
+class NewsBatchWriter:
+    """
+    수집 태스크들이 넘긴 (종목, 기사 목록)을 모아 save_batch(entries)로 한 번에 저장합니다.
+    save_batch는 동기 함수로 별도 스레드에서 실행되며, DB 연결 하나를 계속 씁니다.
+    """
+
+    def __init__(self, save_batch, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.save_batch = save_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.entries = []
+        self.item_count = 0
+        self.saved_items = 0
+        self.lock = asyncio.Lock()
+        self.stopped = asyncio.Event()
+
+    async def put(self, stock, items):
+        self.entries.append((stock, items))
+        self.item_count += len(items)
+        if self.item_count >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self.lock:
+            if not self.entries:
+                return
+            entries, self.entries = self.entries, []
+            count, self.item_count = self.item_count, 0
+            try:
+                await asyncio.to_thread(self.save_batch, entries)
+                self.saved_items += count
+            except Exception as e:
+                logger.error(f"뉴스 일괄 저장 중 오류 발생 ({len(entries)}종목, {count}건): {e}")
+
+    async def run_flush_loop(self):
+        """flush_interval마다 저장합니다. stop() 후에는 남은 기사를 저장하고 끝납니다 (저장 도중 취소되지 않도록)."""
+        while not self.stopped.is_set():
+            try:
+                await asyncio.wait_for(self.stopped.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def stop(self):
+        self.stopped.set()
+
+class NaverNewsCollector:
+    """
+    여러 종목의 뉴스를 하나의 HTTP 연결 풀로 동시에 검색합니다.
+
+    - 요청은 NaverRateLimiter로 초당 요청 수와 일일 한도 안에서만 나갑니다.
+    - 종목은 priority가 낮은(숫자가 작은) 순서로 처리되므로 한도가 바닥나도 중요한 종목은 먼저 수집됩니다.
+    - 결과는 NewsBatchWriter 하나로 모여 일괄 저장됩니다.
+
+    stocks: [{'code': 종목코드, 'name': 종목명, 'priority': 숫자(선택, 없으면 목록 순서)}, ...]
+    종목에 'state'(news_freshness.NewsFetchState)가 있으면 이미 저장한 기사에 닿을 때까지만 페이지를 넘기고
+    새 기사만 돌려주며, 새 기사가 없어도 확인 결과(빈 목록)를 writer로 넘겨 상태가 갱신되게 합니다.
+    요청이 실패한 종목은 writer로 넘기지 않아 상태가 그대로 남고 다음 실행에서 다시 확인됩니다.
+    """
+
+    def __init__(self, client_id, client_secret, limiter=None, concurrency=CONCURRENCY, display=3, query_format="{name}"):
+        self.limiter = limiter or NaverRateLimiter()
+        self.concurrency = concurrency
+        self.display = display
+        self.query_format = query_format
+        self.session = requests.Session()
+        self.session.headers.update({"X-Naver-Client-Id": client_id, "X-Naver-Client-Secret": client_secret})
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        # 기본 to_thread 실행기는 코어 수에 따라 작아질 수 있어 동시 요청 수만큼 전용 스레드를 둡니다.
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='naver-news')
+        self.request_count = 0
+        self.failed_count = 0
+        self.processed_count = 0
+        self.quota_exhausted = False
+
+    def _search(self, query, display, start=1):
+        """검색 요청 하나 (작업 스레드에서 실행). 재시도할 만한 오류면 None 대신 _RETRY를 돌려줍니다."""
+        try:
+            params = {"query": query, "display": display, "start": start, "sort": "date"}
+            response = self.session.get(NAVER_NEWS_URL, params=params, timeout=10)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"네이버 뉴스 API 요청 오류 (쿼리: {query}): {e}")
+            return _RETRY
+        if response.status_code == 429 or response.status_code >= 500:
+            return _RETRY
+        if response.status_code != 200:
+            logger.error(f"네이버 뉴스 API 오류 (쿼리: {query}): HTTP {response.status_code} {response.text[:200]}")
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            logger.error(f"네이버 뉴스 API 응답 JSON 파싱 오류 (쿼리: {query})")
+            return None
+
+    async def search(self, query, display=None, start=1):
+        """한도/간격을 지키며 검색합니다. 일시 오류는 MAX_RETRIES번까지 다시 시도합니다."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(MAX_RETRIES + 1):
+            await self.limiter.acquire()
+            self.request_count += 1
+            result = await loop.run_in_executor(self.executor, self._search, query, display or self.display, start)
+            if result is not _RETRY:
+                if result is None:
+                    self.failed_count += 1
+                return result
+            await asyncio.sleep(RETRY_DELAY * (2 ** attempt))
+        self.failed_count += 1
+        return None
+
+    async def fetch_stock(self, stock):
+        """
+        종목 하나의 기사 목록을 가져옵니다. 검색 결과가 없으면 빈 리스트, 요청이 실패하면 FETCH_FAILED.
+        상태가 있는 종목은 중간 페이지에서 실패해도 FETCH_FAILED입니다 (일부만 저장하면 워터마크가 앞서 나가
+        받지 못한 기사를 이미 아는 기사로 보게 되므로, 다음 실행에서 처음부터 다시 확인).
+        """
+        query = self.query_format.format(name=stock['name'], code=stock['code'])
+        state = stock.get('state')
+        if state is None:
+            news_data = await self.search(query)
+            if news_data is None:
+                return FETCH_FAILED
+            return news_data.get('items') or []
+
+        # 최신순 결과를 넘기다가 이미 저장한 기사(워터마크)에 닿으면 멈춥니다.
+        display = stock.get('display') or self.display
+        new_items = []
+        for page in range(MAX_PAGES):
+            news_data = await self.search(query, display, start=page * display + 1)
+            if news_data is None:
+                return FETCH_FAILED
+            items = news_data.get('items') or []
+            for item in items:
+                if state.is_known(parse_pub_date(item.get('pubDate', '')), item.get('link', '')):
+                    return new_items
+                new_items.append(item)
+            if len(items) < display or state.newest_pub_date is None or page * display + display >= MAX_SEARCH_START:
+                break
+        return new_items
+
+    async def _worker(self, queue, writer):
+        while queue:
+            _, _, stock = heapq.heappop(queue)
+            try:
+                items = await self.fetch_stock(stock)
+            except QuotaExhausted:
+                if not self.quota_exhausted:
+                    self.quota_exhausted = True
+                    logger.warning(f"네이버 검색 API 일일 한도({self.limiter.daily_quota}건)를 모두 사용했습니다. 남은 {len(queue) + 1}종목은 다음 실행에서 수집합니다.")
+                queue.clear()
+                return
+            if items is FETCH_FAILED:
+                # 확인하지 못한 종목은 상태(기사 빈도, 다음 확인 시각)를 그대로 두어 다음 실행에서 다시 확인
+                continue
+            self.processed_count += 1
+            if items or 'state' in stock:
+                await writer.put(stock, items)
+
+    async def collect(self, stocks, writer):
+        """stocks 전체를 수집해 writer로 넘깁니다. 검색을 마친 종목 수를 반환합니다 (한도 소진 시 일부)."""
+        started = time.monotonic()
+        queue = [(stock.get('priority', index), index, stock) for index, stock in enumerate(stocks)]
+        heapq.heapify(queue)
+        flush_task = asyncio.create_task(writer.run_flush_loop())
+        try:
+            await asyncio.gather(*(self._worker(queue, writer) for _ in range(min(self.concurrency, len(stocks)) or 1)))
+        finally:
+            writer.stop()
+            await flush_task
+            self.limiter.save_usage()
+            self.executor.shutdown(wait=False)
+            self.session.close()
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"뉴스 수집 완료: {self.processed_count}/{len(stocks)}종목, 요청 {self.request_count}건 (실패 {self.failed_count}), 저장 {writer.saved_items}건, "
+            f"{elapsed:.1f}초 ({self.request_count / elapsed if elapsed else 0:.1f}건/초), 오늘 남은 한도 {self.limiter.remaining}건"
+        )
+        return self.processed_count
@@ -1,10 +1,19 @@
-import requests
+import argparse
+import asyncio
 import configparser
+import datetime
 import os
 import logging
 import mysql.connector
-from datetime import datetime
-import time
+from naver_news_async import (
+    NAVER_DAILY_QUOTA, NAVER_QPS, NaverNewsCollector, NaverRateLimiter, NewsBatchWriter, news_item_to_row,
+)
+from news_dedup import NearDuplicateIndex
+from news_freshness import load_fetch_states, save_fetch_states, select_due_stocks
+from news_ingest import insert_news
+from news_search_index import prepare_search_index, refresh_search_index
+from market_snapshot import load_snapshot
+from stock_record import parse_price
 
 # --- 로그 설정 ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -57,85 +66,103 @@ def get_naver_api_keys():
         logger.error(f"config.ini 파일에 [NAVER_API] 섹션 또는 필요한 키가 없습니다. ({e})")
         return None, None
 
+def get_naver_rate_settings():
+    """config.ini [NAVER_API]의 QPS / DAILY_QUOTA (없으면 네이버 검색 API 기본 한도)."""
+    config = configparser.ConfigParser()
+    config.read(CONFIG_FILE)
+    return (
+        config.getint('NAVER_API', 'QPS', fallback=NAVER_QPS),
+        config.getint('NAVER_API', 'DAILY_QUOTA', fallback=NAVER_DAILY_QUOTA),
+    )
+
 def get_stock_codes(conn):
-    """데이터베이스에서 주식 코드와 종목명을 가져옵니다. (stock_details 테이블이 있다고 가정)"""
+    """
+    주식 코드와 종목명을 가져옵니다. 시장 스냅샷(data/market_snapshot.bin)이 있으면 그것을, 없으면 stock_details를 읽습니다.
+    유통 시가총액이 큰 종목부터 priority를 매겨, 일일 한도가 바닥나도 대형주 뉴스는 먼저 수집되도록 합니다.
+    """
+    snapshot = load_snapshot()
+    if snapshot is not None:
+        stock_list = [
+            {'code': record.stock_code, 'name': record.stock_name,
+             'market_cap': (record.current_price or 0) * record.circulating_shares}
+            for record in snapshot if record.circulating_shares
+        ]
+        return rank_by_market_cap(stock_list)
+
     cursor = conn.cursor()
     stock_list = []
     try:
         # 'stock_details' 테이블이 존재하고 'stock_code', 'stock_name' 컬럼이 있다고 가정
-        cursor.execute("SELECT stock_code, stock_name FROM stock_details WHERE circulating_shares IS NOT NULL AND circulating_shares != '' AND circulating_shares != '0'")
-        for (stock_code, stock_name) in cursor:
-            stock_list.append({'code': stock_code, 'name': stock_name})
-        logger.info(f"총 {len(stock_list)}개의 주식 종목을 가져왔습니다. (유통주식수 있는 종목만)")
+        cursor.execute("SELECT stock_code, stock_name, current_price, circulating_shares FROM stock_details WHERE circulating_shares IS NOT NULL AND circulating_shares != '' AND circulating_shares != '0'")
+        for (stock_code, stock_name, current_price, circulating_shares) in cursor:
+            market_cap = (parse_price(current_price) or 0) * (parse_price(circulating_shares) or 0)
+            stock_list.append({'code': stock_code, 'name': stock_name, 'market_cap': market_cap})
     except mysql.connector.Error as err:
         logger.error(f"주식 종목을 가져오는 중 오류 발생: {err}. 'stocks' 테이블이 존재하는지 확인하세요.")
     finally:
         cursor.close()
+    return rank_by_market_cap(stock_list)
+
+def rank_by_market_cap(stock_list):
+    stock_list.sort(key=lambda stock: stock['market_cap'], reverse=True)
+    for rank, stock in enumerate(stock_list):
+        stock['priority'] = rank
+    logger.info(f"총 {len(stock_list)}개의 주식 종목을 가져왔습니다. (유통주식수 있는 종목만)")
     return stock_list
 
-def search_naver_news(query, client_id, client_secret, display=3):
-    """네이버 뉴스 API를 사용하여 뉴스를 검색합니다."""
-    naver_api_url = "https://openapi.naver.com/v1/search/news.json"
-    headers = {
-        "X-Naver-Client-Id": client_id,
-        "X-Naver-Client-Secret": client_secret
-    }
-    params = {
-        "query": query,
-        "display": display,
-        "sort": "date" # 날짜순 정렬
-    }
-    
+def save_news_to_db(conn, entries, dedup=None):
+    """
+    수집된 (종목, 기사 목록) 묶음을 한 번에 저장합니다. NewsBatchWriter가 별도 스레드에서 호출합니다.
+    기사는 여러 행 INSERT IGNORE로 한 번에 넣습니다 (news_ingest.insert_news). 기사 목록은 워터마크 이후의 새 기사뿐이므로 바뀌지 않은 기사는 다시 쓰지 않고,
+    같은 트랜잭션에서 종목별 신선도 상태(news_fetch_state)를 갱신합니다.
+    dedup(유사 기사 색인)이 주어지면 여러 언론사/종목에 재송고된 기사는 대표 기사에 묶어 저장합니다.
+    새 기사가 있으면 커밋 후 검색 색인에 반영합니다.
+    """
+    now = datetime.datetime.now()
+    rows = []
+    states = []
+    for stock, items in entries:
+        stock_rows = [news_item_to_row(stock['code'], item) for item in items]
+        rows.extend(stock_rows)
+        state = stock.get('state')
+        if state is not None:
+            state.record_check(stock_rows, now)
+            states.append(state)
+    cursor = conn.cursor()
+    if dedup is not None:
+        dedup.begin()
     try:
-        response = requests.get(naver_api_url, headers=headers, params=params)
-        response.raise_for_status() # HTTP 오류 발생 시 예외 발생
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"네이버 뉴스 API 호출 중 오류 발생: {e}")
-        return None
+        inserted = insert_news(cursor, rows, dedup=dedup)
+        save_fetch_states(cursor, states)
+        conn.commit()
+        if dedup is not None:
+            dedup.commit()
+        logger.info(f"{len(entries)}개 종목 확인, 새 뉴스 {len(inserted)}건 저장 완료.")
+    except mysql.connector.Error as err:
+        conn.rollback()
+        logger.error(f"뉴스 데이터 저장 중 오류 발생: {err}")
+        return
+    finally:
+        cursor.close()
+        if dedup is not None:
+            dedup.rollback()  # 커밋하지 못한 색인 변경(롤백된 id로 바꾼 키 등)을 되돌림
+    if inserted:
+        refresh_search_index(conn)
 
-def save_news_to_db(conn, stock_code, news_items):
-    """검색된 뉴스 데이터를 데이터베이스에 저장합니다."""
-    cursor = conn.cursor()
-    insert_count = 0
-    for item in news_items:
-        title = item.get('title', '').replace('<b>', '').replace('</b>', '')
-        link = item.get('link', '')
-        description = item.get('description', '').replace('<b>', '').replace('</b>', '')
-        pub_date_str = item.get('pubDate', '')
-        
-        # 날짜 형식 변환 (RFC 822 -> YYYY-MM-DD HH:MM:SS)
-        try:
-            # 예: Sat, 26 Jul 2025 09:00:00 +0900
-            pub_date = datetime.strptime(pub_date_str, '%a, %d %b %Y %H:%M:%S %z')
-            pub_date_formatted = pub_date.strftime('%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            pub_date_formatted = None
-            logger.warning(f"날짜 형식 오류: {pub_date_str}")
-
-        try:
-            insert_query = """
-                INSERT INTO stock_news (stock_code, title, link, description, pub_date)
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    title = VALUES(title),
-                    description = VALUES(description),
-                    pub_date = VALUES(pub_date);
-            """
-            cursor.execute(insert_query, (stock_code, title, link, description, pub_date_formatted))
-            insert_count += 1
-        except mysql.connector.Error as err:
-            # UNIQUE KEY 제약 조건 위반 시 무시 (이미 존재하는 뉴스)
-            if err.errno == 1062: # Duplicate entry error
-                logger.debug(f"이미 존재하는 뉴스: {link}")
-            else:
-                logger.error(f"뉴스 데이터 저장 중 오류 발생: {err}")
-    
-    conn.commit()
-    cursor.close()
-    logger.info(f"{stock_code} 관련 뉴스 {insert_count}건 저장 완료.")
+async def collect_news(conn, stock_list, client_id, client_secret, dedup=None):
+    """확인할 때가 된 종목 뉴스를 요청 한도 안에서 동시에 검색하고, 결과는 연결 하나로 일괄 저장합니다."""
+    qps, daily_quota = get_naver_rate_settings()
+    collector = NaverNewsCollector(
+        client_id, client_secret,
+        limiter=NaverRateLimiter(qps=qps, daily_quota=daily_quota),
+        display=3,
+        query_format="{name} 주식 뉴스",  # 종목명으로 검색
+    )
+    logger.info(f"{len(stock_list)}개 종목 뉴스 수집 시작 (초당 {qps}건, 오늘 남은 한도 {collector.limiter.remaining}건)")
+    writer = NewsBatchWriter(lambda entries: save_news_to_db(conn, entries, dedup))
+    await collector.collect(stock_list, writer)
 
-def main():
+def main(check_all=False):
     conn = None
     try:
         conn = get_db_connection()
@@ -153,17 +180,15 @@ def main():
             logger.warning("가져올 주식 종목이 없습니다. 'stocks' 테이블에 데이터가 있는지 확인하세요.")
             return
 
-        for stock in stock_list:
-            query = f"{stock['name']} 주식 뉴스" # 종목명으로 검색
-            logger.info(f"'{stock['name']}' ({stock['code']}) 관련 뉴스 검색 중...")
-            news_data = search_naver_news(query, client_id, client_secret, display=3)
-            
-            if news_data and 'items' in news_data:
-                save_news_to_db(conn, stock['code'], news_data['items'])
-            else:
-                logger.info(f"'{stock['name']}' ({stock['code']}) 관련 뉴스를 찾을 수 없거나 오류가 발생했습니다.")
-            
-            time.sleep(0.1) # API 호출 간 지연 (과도한 호출 방지)
+        # 기사 빈도에 따라 정한 다음 확인 시각이 지난 종목만 (--all이면 전 종목)
+        due_stocks = select_due_stocks(stock_list, load_fetch_states(conn), datetime.datetime.now(), check_all)
+        logger.info(f"{len(stock_list)}개 종목 중 {len(due_stocks)}개 종목이 확인할 때가 되었습니다.")
+        if not due_stocks:
+            return
+
+        dedup = NearDuplicateIndex.load(conn, logger=logger)
+        prepare_search_index(conn)
+        asyncio.run(collect_news(conn, due_stocks, client_id, client_secret, dedup))
 
     finally:
         if conn:
@@ -171,4 +196,7 @@ def main():
             logger.info("데이터베이스 연결을 닫습니다.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="네이버 뉴스 수집 (종목별 기사 빈도에 따라 확인 주기 조절)")
+    parser.add_argument('--all', action='store_true', help="다음 확인 시각과 관계없이 전 종목 확인")
+    args = parser.parse_args()
+    main(check_all=args.all)
@@ -0,0 +1,40 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# --- 병렬 분류 설정 ---
+# 키워드 매칭은 순수 파이썬 CPU 작업이라 스레드로는 GIL 때문에 빨라지지 않습니다.
+# 뉴스 배치를 프로세스 풀에 넘기고, 결과는 배치 순서대로 메인 프로세스로 돌려받아 한 곳에서 저장합니다.
+MAX_PENDING_PER_WORKER = 2  # 작업자당 미리 넘겨 두는 배치 수 (DB 조회와 분류를 겹치되 메모리는 제한)
+
+def resolve_workers(workers):
+    """0 이하이면 CPU 코어 수를 사용합니다."""
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+def classify_batches(batches, classify_batch, workers=1, initializer=None, initargs=()):
+    """
+    batches의 각 배치를 classify_batch(batch) -> 결과 리스트로 분류해 (batch, 결과)를 배치 순서대로 돌려줍니다.
+
+    - workers가 1이면 현재 프로세스에서 바로 분류합니다.
+    - 2 이상이면 프로세스 풀을 씁니다. 작업자는 initializer(*initargs)로 매처를 한 번만 만들어 두고,
+      classify_batch와 initializer는 다른 프로세스에서 불러야 하므로 모듈 최상위 함수여야 합니다.
+    결과가 배치 순서대로 나오므로 호출하는 쪽은 배치마다 저장과 워터마크 커밋을 그대로 이어 갈 수 있습니다.
+    """
+    if workers <= 1:
+        if initializer:
+            initializer(*initargs)
+        for batch in batches:
+            yield batch, classify_batch(batch)
+        return
+
+    max_pending = workers * MAX_PENDING_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(classify_batch, batch)))
+            if len(pending) >= max_pending:
+                done_batch, future = pending.popleft()
+                yield done_batch, future.result()
+        while pending:
+            done_batch, future = pending.popleft()
+            yield done_batch, future.result()
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# --- 분류 진행 상태 ---
+# 분류기별로 마지막으로 처리한 stock_news.id(워터마크)와 분류기 버전을 기록합니다.
+# 버전은 분류 로직 버전 + 키워드/가중치 해시라서 키워드가 바뀌면 달라지고, 그때만 전체를 다시 분류합니다.
+STATE_TABLE = 'news_classification_state'
+DEFAULT_BATCH_SIZE = 5000
+# 자동 증가 id는 INSERT 순서대로 받지만 커밋은 늦을 수 있어, 워터마크 직전 구간을 매 실행 다시 읽습니다.
+# (먼저 id를 받은 트랜잭션이 워터마크 저장 뒤에 커밋되면 그 행을 건너뛰지 않도록) 분류 결과 저장은
+# 같은 값을 다시 쓰는 것이라 중복 처리해도 결과가 같습니다.
+WATERMARK_SAFETY_WINDOW = 1000
+
+def classifier_version(logic_version, themes_keywords, negative_keywords=()):
+    """분류 로직 버전과 키워드 집합(테마 순서, 키워드, 가중치, 부정 키워드)으로 분류기 버전 문자열을 만듭니다."""
+    keyword_set = {
+        'themes': [
+            [theme, sorted(keywords.items()) if isinstance(keywords, dict) else list(keywords)]
+            for theme, keywords in themes_keywords.items()
+        ],
+        'negative': list(negative_keywords),
+    }
+    digest = hashlib.sha1(json.dumps(keyword_set, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f"{logic_version}:{digest[:16]}"
+
+def ensure_state_table(cursor):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        classifier VARCHAR(50) PRIMARY KEY,
+        version VARCHAR(64) NOT NULL,
+        last_news_id BIGINT NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+
+def load_state(cursor, classifier, for_update=False):
+    """(버전, 마지막 처리 id)를 반환합니다. 처음 실행이면 (None, 0). for_update면 커밋까지 다른 실행이 기다립니다."""
+    lock = " FOR UPDATE" if for_update else ""
+    cursor.execute(f"SELECT version, last_news_id FROM {STATE_TABLE} WHERE classifier = %s{lock}", (classifier,))
+    row = cursor.fetchone()
+    return (row[0], int(row[1])) if row else (None, 0)
+
+def save_state(cursor, classifier, version, last_news_id):
+    """워터마크를 저장합니다. 같은 트랜잭션의 테마 업데이트와 함께 커밋해야 중단 후 재실행 시 누락/중복이 없습니다."""
+    cursor.execute(f"""
+    INSERT INTO {STATE_TABLE} (classifier, version, last_news_id)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE version = VALUES(version), last_news_id = VALUES(last_news_id)
+    """, (classifier, version, last_news_id))
+
+def start_id_for(cursor, classifier, version, safety_window=WATERMARK_SAFETY_WINDOW):
+    """
+    이번 실행에서 분류를 시작할 워터마크를 정합니다. 저장된 버전과 같으면 마지막 처리 id에서
+    safety_window만큼 앞에서부터(늦게 커밋된 행 포함) 이어서, 다르면(키워드/가중치 변경 또는 첫 실행)
+    0부터 전체를 다시 분류합니다.
+    """
+    ensure_state_table(cursor)
+    saved_version, last_news_id = load_state(cursor, classifier)
+    if saved_version == version:
+        return max(0, last_news_id - safety_window)
+    if saved_version is None:
+        logger.info(f"[{classifier}] 저장된 분류 상태가 없어 전체 뉴스를 분류합니다 (버전 {version}).")
+    else:
+        logger.info(f"[{classifier}] 분류기 버전이 바뀌어 전체 뉴스를 다시 분류합니다 ({saved_version} → {version}).")
+    return 0
+
+def max_news_id(cursor):
+    """현재 stock_news의 최대 id입니다. 이번 실행에서 분류/전파할 범위의 끝으로 씁니다."""
+    cursor.execute("SELECT MAX(id) FROM stock_news")
+    return cursor.fetchone()[0] or 0
+
+def iter_news_batches(conn, after_id, max_id=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    id > after_id인 뉴스를 id 순서대로 batch_size건씩 (id, title, description) 리스트로 돌려줍니다.
+    기본 키 범위 조회라 테이블 전체 크기와 관계없이 새 뉴스 수만큼만 읽습니다.
+    max_id(없으면 실행 시작 시점의 최대 id)까지만 읽어, 분류 중 새로 들어온 뉴스는 다음 실행에서 처리합니다.
+    재송고 기사(story_id가 있는 행)는 건너뛰고 대표 기사만 돌려줍니다 (테마는 ThemeResultWriter.propagate가 복사).
+    """
+    cursor = conn.cursor()
+    try:
+        if max_id is None:
+            max_id = max_news_id(cursor)
+        while after_id < max_id:
+            cursor.execute(
+                "SELECT id, title, description FROM stock_news WHERE id > %s AND id <= %s AND story_id IS NULL ORDER BY id LIMIT %s",
+                (after_id, max_id, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            yield rows
+            after_id = rows[-1][0]
+    finally:
+        cursor.close()
@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import re
+
+# --- 유사 기사(같은 기사 재송고) 판별 설정 ---
+# 제목+요약을 글자 3-gram으로 나눠 64비트 SimHash를 만들고, 해밍 거리 MAX_DISTANCE 이하를 같은 기사로 봅니다.
+# 64비트를 MAX_DISTANCE + 1개 구간(band)으로 나누면 거리가 MAX_DISTANCE 이하인 두 해시는 적어도 한 구간이 같으므로
+# 구간 값별 버킷(LSH)만 비교하면 됩니다 (전체 기사와 비교하지 않음).
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+MAX_DISTANCE = 3
+BAND_COUNT = MAX_DISTANCE + 1
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+MIN_SHINGLES = 10          # 이보다 짧은 글은 우연히 겹치기 쉬워 판별하지 않음
+INDEX_WINDOW_DAYS = 3      # 재송고는 대개 며칠 안에 일어나므로 최근 대표 기사만 색인
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_text(text):
+    """소문자로 바꾸고 공백/문장부호를 없앱니다 (띄어쓰기나 따옴표만 다른 재송고도 같게)."""
+    return _NON_WORD.sub('', (text or '').lower())
+
+def simhash(text):
+    """글자 SHINGLE_SIZE-gram의 64비트 SimHash. 판별하기에 너무 짧으면 None."""
+    normalized = normalize_text(text)
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    counts = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            counts[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit, count in enumerate(counts) if count > 0)
+
+def news_simhash(row):
+    """stock_news 행 (stock_code, title, link, description, pub_date)의 SimHash."""
+    return simhash(row[1] + ' ' + (row[3] or ''))
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+def ensure_dedup_columns(cursor):
+    """
+    stock_news에 simhash / story_id 컬럼을 준비합니다. story_id는 대표 기사의 id이고, NULL이면 그 기사가 대표입니다.
+    ALTER는 암묵적 커밋이 일어나므로 트랜잭션 전에 호출합니다.
+    """
+    cursor.execute("""
+    ALTER TABLE stock_news
+        ADD COLUMN IF NOT EXISTS simhash BIGINT UNSIGNED,
+        ADD COLUMN IF NOT EXISTS story_id INT,
+        ADD INDEX IF NOT EXISTS idx_story_id (story_id)
+    """)
+
+class NearDuplicateIndex:
+    """
+    대표 기사들의 SimHash를 구간별 버킷에 담아 두고, 새 기사가 어느 대표 기사의 재송고인지 찾습니다.
+    키는 대표 기사의 id이며 (저장 전에는 임시 키), 대표 기사의 테마를 함께 기억해 재송고 기사에 그대로 씁니다.
+
+    저장 트랜잭션과 함께 begin() → commit()/rollback()으로 감싸면, DB 롤백 시 그 사이의 추가/제거/키 변경도
+    되돌려 저장되지 않은 id가 색인에 남지 않습니다.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE, logger=None):
+        self.max_distance = max_distance
+        self.logger = logger or logging.getLogger(__name__)
+        self.buckets = [{} for _ in range(BAND_COUNT)]
+        self.stories = {}  # 키 → (simhash, theme)
+        self.undo_log = None  # begin() 이후의 변경 (되돌릴 작업, 키, simhash, theme)
+
+    def __len__(self):
+        return len(self.stories)
+
+    @staticmethod
+    def _bands(signature):
+        mask = (1 << BAND_BITS) - 1
+        return [(signature >> (band * BAND_BITS)) & mask for band in range(BAND_COUNT)]
+
+    def find(self, signature):
+        """가장 가까운 대표 기사의 키 (거리 max_distance 이하가 없으면 None)."""
+        best_key, best_distance = None, self.max_distance + 1
+        for band, value in enumerate(self._bands(signature)):
+            for key in self.buckets[band].get(value, ()):
+                distance = hamming_distance(signature, self.stories[key][0])
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        return best_key
+
+    def theme_of(self, key):
+        return self.stories[key][1]
+
+    def add(self, key, signature, theme=None):
+        self._add(key, signature, theme)
+        if self.undo_log is not None:
+            self.undo_log.append(('remove', key, signature, theme))
+
+    def remove(self, key):
+        signature, theme = self._remove(key)
+        if self.undo_log is not None:
+            self.undo_log.append(('add', key, signature, theme))
+
+    def _add(self, key, signature, theme):
+        self.stories[key] = (signature, theme)
+        for band, value in enumerate(self._bands(signature)):
+            self.buckets[band].setdefault(value, []).append(key)
+
+    def _remove(self, key):
+        signature, theme = self.stories.pop(key)
+        for band, value in enumerate(self._bands(signature)):
+            bucket = self.buckets[band][value]
+            bucket.remove(key)
+            if not bucket:
+                del self.buckets[band][value]
+        return signature, theme
+
+    def begin(self):
+        """이후의 변경을 기록합니다. DB 트랜잭션을 시작할 때 호출합니다."""
+        self.undo_log = []
+
+    def commit(self):
+        """DB 커밋에 성공하면 호출합니다. 기록한 변경을 확정합니다."""
+        self.undo_log = None
+
+    def rollback(self):
+        """begin() 이후의 변경을 역순으로 되돌립니다. 커밋 뒤나 begin() 전에 불러도 아무 일도 하지 않습니다."""
+        undo_log, self.undo_log = self.undo_log or [], None
+        for action, key, signature, theme in reversed(undo_log):
+            if action == 'remove':
+                self._remove(key)
+            else:
+                self._add(key, signature, theme)
+
+    def rekey(self, old_key, new_key):
+        """저장 전 임시 키를 저장 후 받은 id로 바꿉니다."""
+        signature, theme = self.stories[old_key]
+        self.remove(old_key)
+        self.add(new_key, signature, theme)
+
+    @classmethod
+    def load(cls, conn, days=INDEX_WINDOW_DAYS, logger=None):
+        """컬럼을 준비하고 최근 days일 대표 기사로 색인을 만듭니다."""
+        index = cls(logger=logger)
+        cursor = conn.cursor()
+        try:
+            ensure_dedup_columns(cursor)
+            cursor.execute(
+                "SELECT id, simhash, theme FROM stock_news "
+                "WHERE story_id IS NULL AND simhash IS NOT NULL AND pub_date >= NOW() - INTERVAL %s DAY",
+                (days,),
+            )
+            for news_id, signature, theme in cursor.fetchall():
+                index.add(news_id, int(signature), theme)
+        finally:
+            cursor.close()
+        index.logger.info(f"유사 기사 색인: 최근 {days}일 대표 기사 {len(index)}건")
+        return index
@@ -0,0 +1,125 @@
+import datetime
+import math
+
+# --- 종목별 뉴스 신선도 상태 ---
+# 종목마다 이미 저장한 가장 최신 기사(pub_date, link)와 기사 빈도(시간당 건수, 지수 평활)를 기록합니다.
+# 수집기는 기사가 자주 나오는 종목은 자주, 뜸한 종목은 드물게 확인하고, 이미 아는 기사에 닿으면 페이지 넘기기를 멈춥니다.
+FETCH_STATE_TABLE = 'news_fetch_state'
+MIN_CHECK_INTERVAL = datetime.timedelta(minutes=10)
+MAX_CHECK_INTERVAL = datetime.timedelta(hours=24)
+TARGET_NEW_PER_CHECK = 2     # 한 번 확인할 때 새 기사가 이 정도 쌓이도록 간격을 맞춤
+RATE_SMOOTHING = 0.3         # 기사 빈도 지수 평활 계수 (클수록 최근 관측을 빨리 반영)
+DEFAULT_NEWS_RATE = 0.1      # 시간당 기사 수, 처음 보는 종목의 초기값
+FIRST_FETCH_DISPLAY = 3      # 처음 보는 종목은 최신 기사 몇 건만
+MAX_DISPLAY = 100            # 네이버 검색 API 한 페이지 최대 건수
+MAX_PAGES = 5                # 아는 기사에 닿지 못해도 이 이상은 넘기지 않음
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class NewsFetchState:
+    """종목 하나의 뉴스 수집 상태입니다. pub_date는 stock_news와 같은 'YYYY-MM-DD HH:MM:SS' 문자열로 다룹니다."""
+
+    __slots__ = ('stock_code', 'newest_pub_date', 'newest_link', 'news_rate', 'last_checked_at', 'next_check_at')
+
+    def __init__(self, stock_code, newest_pub_date=None, newest_link=None, news_rate=DEFAULT_NEWS_RATE,
+                 last_checked_at=None, next_check_at=None):
+        self.stock_code = stock_code
+        self.newest_pub_date = newest_pub_date
+        self.newest_link = newest_link
+        self.news_rate = news_rate
+        self.last_checked_at = last_checked_at
+        self.next_check_at = next_check_at
+
+    def is_due(self, now):
+        return self.next_check_at is None or self.next_check_at <= now
+
+    def display_for(self, now):
+        """지난 확인 이후 쌓였을 기사 수의 두 배를 한 페이지로 요청해, 보통은 한 번에 아는 기사까지 닿게 합니다."""
+        if self.newest_pub_date is None or self.last_checked_at is None:
+            return FIRST_FETCH_DISPLAY
+        hours = max((now - self.last_checked_at).total_seconds() / 3600, 0)
+        return max(FIRST_FETCH_DISPLAY, min(MAX_DISPLAY, math.ceil(self.news_rate * hours * 2)))
+
+    def is_known(self, pub_date, link):
+        """최신순 검색 결과에서 이 기사부터는 이미 저장한 기사인지 (여기서 페이지 넘기기를 멈춤)."""
+        if self.newest_pub_date is None:
+            return False
+        return link == self.newest_link or (pub_date is not None and pub_date < self.newest_pub_date)
+
+    def record_check(self, rows, now):
+        """
+        확인 결과를 반영합니다. rows는 이번에 찾은 새 기사 행 (stock_code, title, link, description, pub_date).
+        새 기사 수 / 경과 시간으로 기사 빈도를 갱신하고, 그 빈도에 맞춰 다음 확인 시각을 정합니다.
+        """
+        dated = [row for row in rows if row[4]]
+        if dated:
+            newest = max(dated, key=lambda row: row[4])
+            if self.newest_pub_date is None or newest[4] >= self.newest_pub_date:
+                self.newest_pub_date, self.newest_link = newest[4], newest[2]
+        if self.last_checked_at is not None:
+            hours = max((now - self.last_checked_at).total_seconds() / 3600, 1 / 60)
+            self.news_rate = RATE_SMOOTHING * (len(rows) / hours) + (1 - RATE_SMOOTHING) * self.news_rate
+        self.last_checked_at = now
+        interval = datetime.timedelta(hours=TARGET_NEW_PER_CHECK / self.news_rate) if self.news_rate > 0 else MAX_CHECK_INTERVAL
+        self.next_check_at = now + min(MAX_CHECK_INTERVAL, max(MIN_CHECK_INTERVAL, interval))
+
+def ensure_fetch_state_table(cursor):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {FETCH_STATE_TABLE} (
+        stock_code VARCHAR(20) PRIMARY KEY,
+        newest_pub_date DATETIME,
+        newest_link VARCHAR(512),
+        news_rate DOUBLE NOT NULL DEFAULT {DEFAULT_NEWS_RATE},
+        last_checked_at DATETIME,
+        next_check_at DATETIME,
+        KEY idx_next_check_at (next_check_at)
+    )
+    """)
+
+def load_fetch_states(conn):
+    """{종목코드: NewsFetchState}. 테이블이 없으면 만듭니다."""
+    cursor = conn.cursor()
+    try:
+        ensure_fetch_state_table(cursor)
+        cursor.execute(f"SELECT stock_code, newest_pub_date, newest_link, news_rate, last_checked_at, next_check_at FROM {FETCH_STATE_TABLE}")
+        return {
+            stock_code: NewsFetchState(
+                stock_code,
+                newest_pub_date.strftime(DATETIME_FORMAT) if newest_pub_date else None,
+                newest_link, float(news_rate), last_checked_at, next_check_at,
+            )
+            for stock_code, newest_pub_date, newest_link, news_rate, last_checked_at, next_check_at in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+
+def save_fetch_states(cursor, states):
+    if not states:
+        return
+    cursor.executemany(f"""
+    INSERT INTO {FETCH_STATE_TABLE} (stock_code, newest_pub_date, newest_link, news_rate, last_checked_at, next_check_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        newest_pub_date = VALUES(newest_pub_date), newest_link = VALUES(newest_link), news_rate = VALUES(news_rate),
+        last_checked_at = VALUES(last_checked_at), next_check_at = VALUES(next_check_at)
+    """, [
+        (s.stock_code, s.newest_pub_date, s.newest_link, s.news_rate, s.last_checked_at, s.next_check_at)
+        for s in states
+    ])
+
+def select_due_stocks(stock_list, states, now, check_all=False):
+    """
+    확인할 때가 된 종목만 골라 상태(state), 요청 건수(display), 우선순위(priority)를 붙여 반환합니다.
+    기사가 자주 나오는 종목이 먼저이고, 빈도가 같으면 원래 목록 순서(시가총액 순)를 따릅니다.
+    """
+    due = []
+    for index, stock in enumerate(stock_list):
+        state = states.get(stock['code'])
+        if state is None:
+            state = states[stock['code']] = NewsFetchState(stock['code'])
+        if check_all or state.is_due(now):
+            due.append((-state.news_rate, index, dict(stock, state=state, display=state.display_for(now))))
+    due.sort(key=lambda entry: entry[:2])
+    for priority, (_, _, stock) in enumerate(due):
+        stock['priority'] = priority
+    return [stock for _, _, stock in due]
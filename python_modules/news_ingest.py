@@ -0,0 +1,93 @@
+from news_dedup import news_simhash
+
+# --- 뉴스 일괄 저장 설정 ---
+# 기사 묶음을 여러 행 INSERT IGNORE 한 문장으로 넣고, 새로 들어간 행은 id/link 조회 한 번으로 찾습니다.
+# 테마는 INSERT 전에 메모리에서 분류해 같은 문장에 넣으므로, 청크 하나가 왕복 1~2번입니다 (새 행이 없으면 조회 생략).
+# 유사 기사 색인(news_dedup.NearDuplicateIndex)을 주면 재송고 기사는 대표 기사에 묶어(story_id) 함께 저장합니다.
+INSERT_CHUNK_SIZE = 1000
+
+NEWS_COLUMNS = ('stock_code', 'title', 'link', 'description', 'pub_date', 'theme')
+DEDUP_COLUMNS = ('simhash', 'story_id')
+
+def insert_news(cursor, rows, classify=None, dedup=None):
+    """
+    rows: stock_news 행 (stock_code, title, link, description, pub_date) 목록.
+    classify(row) -> 테마 또는 None 이 주어지면 새 행에 테마를 함께 저장합니다 (이미 있는 기사는 건드리지 않음).
+    dedup이 주어지면 대표 기사만 분류하고, 재송고 기사는 대표 기사의 테마와 story_id를 받습니다.
+    새로 삽입된 [(id, row, theme), ...]를 반환합니다. 커밋은 호출하는 쪽에서 합니다.
+    dedup 변경(임시 대표 기사 추가, id로 키 변경)도 커밋 전이므로, 호출하는 쪽은 dedup.begin()으로 시작해
+    DB 커밋 후 dedup.commit(), 롤백 시 dedup.rollback()을 불러야 저장되지 않은 id가 색인에 남지 않습니다.
+    """
+    columns = NEWS_COLUMNS + (DEDUP_COLUMNS if dedup is not None else ())
+    inserted = []
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[i:i + INSERT_CHUNK_SIZE]
+        values, stories = _prepare_chunk(chunk, classify, dedup, i)
+        placeholders = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(chunk))
+        params = [value for row, extra in zip(chunk, values) for value in (*row, *extra)]
+        new_ids = {}
+        cursor.execute(f"INSERT IGNORE INTO stock_news ({', '.join(columns)}) VALUES {placeholders}", params)
+        if cursor.rowcount > 0:
+            # 여러 행 INSERT의 lastrowid는 이 문장이 처음 만든 id입니다. 그보다 크거나 같은 id 중
+            # 이번에 넣은 (종목, 링크)만 새 행입니다 (이미 있던 기사는 더 작은 id를 가짐).
+            links = list({row[2] for row in chunk})
+            cursor.execute(
+                f"SELECT id, stock_code, link FROM stock_news WHERE id >= %s AND link IN ({', '.join(['%s'] * len(links))})",
+                [cursor.lastrowid, *links],
+            )
+            new_ids = {(stock_code, link): news_id for news_id, stock_code, link in cursor.fetchall()}
+        chunk_ids = [new_ids.pop((row[0], row[2]), None) for row in chunk]
+        for news_id, row, extra in zip(chunk_ids, chunk, values):
+            if news_id is not None:
+                inserted.append((news_id, row, extra[0]))
+        if stories:
+            _link_pending_stories(cursor, dedup, stories, chunk_ids, i)
+    return inserted
+
+def _prepare_chunk(chunk, classify, dedup, offset):
+    """
+    행마다 INSERT에 덧붙일 값 (theme[, simhash, story_id])과, 이번 청크에서 처음 나온 대표 기사에 묶인
+    {대표 기사 위치: [재송고 기사 위치, ...]}를 만듭니다. 새 대표 기사는 임시 키 ('pending', 위치)로 색인에 넣습니다.
+    """
+    values = []
+    stories = {}
+    for position, row in enumerate(chunk):
+        if dedup is None:
+            values.append((classify(row) if classify else None,))
+            continue
+        signature = news_simhash(row)
+        story = dedup.find(signature) if signature is not None else None
+        if story is None:
+            theme = classify(row) if classify else None
+            if signature is not None:
+                dedup.add(('pending', offset + position), signature, theme)
+                stories[position] = []
+            values.append((theme, signature, None))
+            continue
+        theme = dedup.theme_of(story)
+        if theme is None and classify:
+            theme = classify(row)
+        if isinstance(story, tuple):
+            stories[story[1] - offset].append(position)
+            values.append((theme, signature, None))  # 대표 기사의 id를 받은 뒤 연결
+        else:
+            values.append((theme, signature, story))
+    return values, stories
+
+def _link_pending_stories(cursor, dedup, stories, chunk_ids, offset):
+    """이번 청크의 새 대표 기사를 id로 색인하고, 같은 청크의 재송고 기사 story_id를 한 문장으로 채웁니다."""
+    links = []
+    for position, duplicates in stories.items():
+        story_id = chunk_ids[position]
+        key = ('pending', offset + position)
+        if story_id is None:
+            dedup.remove(key)  # 이미 있던 기사라 저장되지 않음
+            continue
+        dedup.rekey(key, story_id)
+        links.extend((chunk_ids[d], story_id) for d in duplicates if chunk_ids[d] is not None)
+    if links:
+        cases = ' '.join(['WHEN %s THEN %s'] * len(links))
+        cursor.execute(
+            f"UPDATE stock_news SET story_id = CASE id {cases} END WHERE id IN ({', '.join(['%s'] * len(links))})",
+            [value for link in links for value in link] + [news_id for news_id, _ in links],
+        )
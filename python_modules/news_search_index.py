@@ -0,0 +1,291 @@
+import argparse
+import configparser
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+import mysql.connector
+from news_classification_state import ensure_state_table, load_state, save_state
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+CONFIG_FILE = os.path.join(PROJECT_ROOT, 'config.ini')
+
+# --- 뉴스 검색 색인 설정 ---
+# 제목/요약을 단어별 글자 2-gram(한 글자 단어는 그 글자)으로 나눈 역색인을 DB에 둡니다.
+# 한국어는 조사가 붙어 띄어쓰기 단위로는 찾을 수 없고('삼성전자가'), MariaDB FULLTEXT에는 n-gram 파서가 없어 직접 관리합니다.
+# 검색어의 모든 2-gram을 포함한 기사를 찾고, 2-gram마다 (제목 가중치 포함 등장 횟수 × idf)를 더해 순위를 매깁니다.
+# 토큰 규칙은 search_news.php의 search_terms()와 같아야 합니다 (바꾸면 SEARCH_INDEX_VERSION을 올려 재색인).
+POSTINGS_TABLE = 'news_search_postings'
+TERMS_TABLE = 'news_search_terms'
+INDEX_NAME = 'news_search_index'    # news_classification_state의 워터마크 이름
+SEARCH_INDEX_VERSION = '1'
+TOTAL_DOCS_TERM = ''                # news_search_terms에서 이 term 행의 doc_count는 색인된 전체 기사 수
+TITLE_WEIGHT = 3                    # 제목에 나온 2-gram은 요약보다 이만큼 더 셈
+MAX_WEIGHT = 255
+INDEX_BATCH_SIZE = 2000
+LATE_COMMIT_WINDOW = 1000           # 워터마크 직전 id 구간은 매번 다시 보고 늦게 커밋된 기사(색인 안 된 것만)를 색인
+MAX_CANDIDATES = 2000               # 필터를 통과한 기사 중 가장 드문 2-gram의 최신 N건만 후보로 (흔한 검색어도 일정한 시간에 응답)
+DEFAULT_PAGE_SIZE = 20
+
+_WORD_SPLIT = re.compile(r'[\W_]+')
+
+logger = logging.getLogger(__name__)
+
+def get_db_connection():
+    """config.ini에서 DB 정보를 읽어와 연결을 생성합니다."""
+    config = configparser.ConfigParser()
+    if not os.path.exists(CONFIG_FILE):
+        logger.error(f"설정 파일을 찾을 수 없습니다: {CONFIG_FILE}")
+        return None
+    config.read(CONFIG_FILE)
+    try:
+        db_config = {
+            'host': config.get('DB', 'HOST'),
+            'user': config.get('DB', 'USER'),
+            'password': config.get('DB', 'PASSWORD'),
+            'database': config.get('DB', 'DATABASE'),
+            'port': config.getint('DB', 'PORT')
+        }
+        return mysql.connector.connect(**db_config)
+    except (configparser.NoSectionError, configparser.NoOptionError) as e:
+        logger.error(f"config.ini 파일에 [DB] 섹션 또는 필요한 키가 없습니다. ({e})")
+        return None
+    except mysql.connector.Error as err:
+        logger.error(f"데이터베이스 연결 오류: {err}")
+        return None
+
+def tokenize(text):
+    """소문자 단어마다 글자 2-gram을 순서대로 돌려줍니다 (한 글자 단어는 그대로)."""
+    terms = []
+    for word in _WORD_SPLIT.split((text or '').lower()):
+        if len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+def term_weights(title, description):
+    """기사 하나의 {2-gram: 가중치}. 제목 등장은 TITLE_WEIGHT배로 셉니다."""
+    weights = Counter()
+    for term in tokenize(title):
+        weights[term] += TITLE_WEIGHT
+    weights.update(tokenize(description))
+    return {term: min(weight, MAX_WEIGHT) for term, weight in weights.items()}
+
+def ensure_search_tables(cursor):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {POSTINGS_TABLE} (
+        term VARCHAR(2) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+        news_id INT NOT NULL,
+        weight TINYINT UNSIGNED NOT NULL,
+        PRIMARY KEY (term, news_id),
+        KEY idx_news_id (news_id)
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TERMS_TABLE} (
+        term VARCHAR(2) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin PRIMARY KEY,
+        doc_count INT NOT NULL
+    )
+    """)
+    ensure_state_table(cursor)
+
+def index_news_rows(cursor, rows):
+    """
+    (id, title, description) 목록을 색인합니다. 2-gram별 기사 수와 전체 기사 수도 함께 늘립니다.
+    2-gram이 하나도 없는 기사는 검색될 수 없으므로 전체 기사 수에도 넣지 않습니다
+    (그래야 게시 목록 유무로 '이미 색인한 기사'를 가려 다시 세지 않을 수 있음).
+    """
+    postings = []
+    doc_counts = Counter()
+    for news_id, title, description in rows:
+        weights = term_weights(title, description)
+        if not weights:
+            continue
+        postings.extend((term, news_id, weight) for term, weight in weights.items())
+        doc_counts.update(weights.keys())
+        doc_counts[TOTAL_DOCS_TERM] += 1
+    if not postings:
+        return 0
+    # mysql-connector는 INSERT ... VALUES의 executemany를 여러 행 INSERT 한 문장으로 보냅니다.
+    cursor.executemany(f"INSERT IGNORE INTO {POSTINGS_TABLE} (term, news_id, weight) VALUES (%s, %s, %s)", postings)
+    cursor.executemany(
+        f"INSERT INTO {TERMS_TABLE} (term, doc_count) VALUES (%s, %s) ON DUPLICATE KEY UPDATE doc_count = doc_count + VALUES(doc_count)",
+        list(doc_counts.items()),
+    )
+    return len(postings)
+
+def prepare_search_index(conn):
+    """테이블을 준비하고, 토큰 규칙 버전이 바뀌었으면 색인을 비워 처음부터 다시 만들게 합니다."""
+    cursor = conn.cursor()
+    try:
+        ensure_search_tables(cursor)
+        version, _ = load_state(cursor, INDEX_NAME)
+        if version != SEARCH_INDEX_VERSION:
+            if version is not None:
+                logger.info(f"검색 색인 버전이 바뀌어({version} → {SEARCH_INDEX_VERSION}) 전체를 다시 색인합니다.")
+            cursor.execute(f"TRUNCATE TABLE {POSTINGS_TABLE}")
+            cursor.execute(f"TRUNCATE TABLE {TERMS_TABLE}")
+            save_state(cursor, INDEX_NAME, SEARCH_INDEX_VERSION, 0)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def index_late_rows(cursor, after_id, window=LATE_COMMIT_WINDOW):
+    """
+    워터마크 직전 window개 id 중 아직 색인되지 않은 기사를 색인합니다. 자동 증가 id는 커밋 순서와 달라서,
+    먼저 id를 받고 늦게 커밋된 기사는 워터마크가 이미 지나간 뒤에 보일 수 있습니다.
+    게시 목록이 있는 기사는 건너뛰므로 기사 수(doc_count)를 두 번 세지 않습니다.
+    """
+    cursor.execute(f"""
+    SELECT n.id, n.title, n.description FROM stock_news n
+    WHERE n.id > %s AND n.id <= %s
+      AND NOT EXISTS (SELECT 1 FROM {POSTINGS_TABLE} p WHERE p.news_id = n.id)
+    ORDER BY n.id
+    """, (max(0, after_id - window), after_id))
+    rows = cursor.fetchall()
+    index_news_rows(cursor, rows)
+    return len(rows)
+
+def update_search_index(conn, batch_size=INDEX_BATCH_SIZE):
+    """
+    워터마크 이후 새 기사를 색인합니다. 뉴스 수집기가 저장을 커밋할 때마다 호출하고, 밀린 분량은 CLI update로도 채웁니다.
+    배치마다 워터마크 행을 잠그고(FOR UPDATE) 색인과 함께 커밋하므로, 수집기 여러 개가 동시에 불러도 한 번씩만 색인됩니다.
+    첫 배치에서는 워터마크 직전 구간의 늦게 커밋된 기사도 함께 색인합니다 (index_late_rows).
+    색인한 기사 수를 반환합니다.
+    """
+    cursor = conn.cursor()
+    indexed = 0
+    late_checked = False
+    try:
+        while True:
+            version, after_id = load_state(cursor, INDEX_NAME, for_update=True)
+            if version != SEARCH_INDEX_VERSION:
+                conn.rollback()
+                logger.warning("검색 색인이 준비되지 않았습니다. 'python news_search_index.py update'로 먼저 만드세요.")
+                return indexed
+            if not late_checked:
+                indexed += index_late_rows(cursor, after_id)
+                late_checked = True
+            cursor.execute(
+                "SELECT id, title, description FROM stock_news WHERE id > %s ORDER BY id LIMIT %s",
+                (after_id, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                conn.commit()  # 늦게 커밋된 기사를 색인했으면 반영 (없으면 잠금만 풀림)
+                return indexed
+            index_news_rows(cursor, rows)
+            save_state(cursor, INDEX_NAME, SEARCH_INDEX_VERSION, rows[-1][0])
+            conn.commit()
+            indexed += len(rows)
+            if len(rows) < batch_size:
+                return indexed
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def refresh_search_index(conn):
+    """수집기가 뉴스를 커밋한 뒤 부릅니다. 색인 오류는 기록만 하고 (저장된 뉴스는 다음 갱신 때 색인) 수집은 계속합니다."""
+    try:
+        return update_search_index(conn)
+    except mysql.connector.Error as err:
+        logger.error(f"뉴스 검색 색인 갱신 중 오류 발생: {err}")
+        return 0
+
+def search_news(cursor, query, theme=None, stock_code=None, date_from=None, date_to=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    검색어의 모든 2-gram을 포함한 기사를 점수 순으로 찾습니다. 재송고 기사는 이야기(story)마다 하나만 돌려줍니다.
+    (전체 건수, [기사 dict, ...])를 반환합니다. 후보는 테마/종목/기간 필터를 통과한 기사 중 가장 드문 2-gram의
+    최신 MAX_CANDIDATES건으로 제한됩니다 (필터를 후보 선택 뒤에 걸면 오래된 종목 기사가 잘려 나감).
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return 0, []
+    cursor.execute(
+        f"SELECT term, doc_count FROM {TERMS_TABLE} WHERE term IN ({', '.join(['%s'] * (len(terms) + 1))})",
+        [*terms, TOTAL_DOCS_TERM],
+    )
+    doc_counts = dict(cursor.fetchall())
+    total_docs = doc_counts.pop(TOTAL_DOCS_TERM, 0)
+    if len(doc_counts) < len(terms):
+        return 0, []  # 어떤 기사에도 없는 2-gram이 있음
+    rarest = min(terms, key=lambda term: doc_counts[term])
+    idf = {term: math.log(1 + total_docs / doc_counts[term]) for term in terms}
+
+    filters = []
+    filter_params = []
+    for condition, value in (("n.theme = %s", theme), ("n.stock_code = %s", stock_code),
+                             ("n.pub_date >= %s", date_from), ("n.pub_date < %s + INTERVAL 1 DAY", date_to)):
+        if value:
+            filters.append(condition)
+            filter_params.append(value)
+    # 필터는 후보를 고르는 게시 목록 조회에 바로 걸어, 자르기(LIMIT) 전에 적용합니다.
+    candidate_join = f"JOIN stock_news n ON n.id = c.news_id AND {' AND '.join(filters)}" if filters else ""
+    cursor.execute(f"""
+    SELECT id, stock_code, stock_name, title, link, description, pub_date, theme, score, COUNT(*) OVER () AS total_count
+    FROM (
+        SELECT n.id, n.stock_code, sd.stock_name, n.title, n.link, n.description, n.pub_date, n.theme, s.score,
+               ROW_NUMBER() OVER (PARTITION BY COALESCE(n.story_id, n.id) ORDER BY n.story_id IS NOT NULL, n.id) AS story_rn
+        FROM (
+            SELECT p.news_id, SUM(p.weight * CASE p.term {' '.join(['WHEN %s THEN %s'] * len(terms))} END) AS score
+            FROM (
+                SELECT c.news_id FROM {POSTINGS_TABLE} c
+                {candidate_join}
+                WHERE c.term = %s
+                ORDER BY c.news_id DESC
+                LIMIT %s
+            ) c
+            JOIN {POSTINGS_TABLE} p ON p.news_id = c.news_id AND p.term IN ({', '.join(['%s'] * len(terms))})
+            GROUP BY p.news_id
+            HAVING COUNT(*) = %s
+        ) s
+        JOIN stock_news n ON n.id = s.news_id
+        LEFT JOIN stock_details sd ON sd.stock_code = n.stock_code
+    ) r
+    WHERE story_rn = 1
+    ORDER BY score DESC, pub_date DESC
+    LIMIT %s OFFSET %s
+    """, [
+        *(value for term in terms for value in (term, idf[term])),
+        *filter_params, rarest, MAX_CANDIDATES, *terms, len(terms),
+        page_size, (max(page, 1) - 1) * page_size,
+    ])
+    columns = [column[0] for column in cursor.description]
+    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return (results[0]['total_count'] if results else 0), results
+
+if __name__ == '__main__':
+    # 사용법: python news_search_index.py update              (처음 한 번 전체 색인, 이후엔 수집기가 저장할 때마다 자동)
+    #         python news_search_index.py search 검색어 [--theme 테마] [--stock 종목코드] [--from 날짜] [--to 날짜] [--page N]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="뉴스 제목/요약 2-gram 검색 색인")
+    parser.add_argument('command', choices=['update', 'search'])
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('--theme')
+    parser.add_argument('--stock')
+    parser.add_argument('--from', dest='date_from')
+    parser.add_argument('--to', dest='date_to')
+    parser.add_argument('--page', type=int, default=1)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if conn is None:
+        raise SystemExit(1)
+    try:
+        if args.command == 'update':
+            prepare_search_index(conn)
+            logger.info(f"새 기사 {update_search_index(conn)}건을 색인했습니다.")
+        else:
+            cursor = conn.cursor()
+            total, results = search_news(cursor, args.query, args.theme, args.stock, args.date_from, args.date_to, args.page)
+            cursor.close()
+            print(json.dumps({'total': total, 'results': results}, ensure_ascii=False, default=str, indent=2))
+    finally:
+        conn.close()
@@ -0,0 +1,103 @@
+import logging
+from news_dedup import ensure_dedup_columns
+
+# --- 일괄 테마 저장 설정 ---
+# 분류 결과 (id, theme, score)를 세션 전용 임시 테이블에 여러 행 INSERT로 넣은 뒤
+# stock_news와 조인하는 UPDATE 한 번으로 반영합니다. 청크 하나가 왕복 3번(비우기, 넣기, 조인 UPDATE)입니다.
+STAGING_TABLE = 'tmp_news_theme'
+DEFAULT_CHUNK_SIZE = 5000
+
+class ThemeResultWriter:
+    """
+    뉴스 분류 결과를 stock_news.theme / theme_score / theme_source에 일괄 저장합니다.
+    write()는 커밋하지 않으므로 호출하는 쪽이 워터마크 저장과 함께 커밋합니다.
+    임시 테이블은 연결(세션)마다 따로 만들어지므로 여러 분류기가 동시에 실행되어도 섞이지 않습니다.
+
+    theme_source에는 테마를 정한 분류기 이름을 기록해 두 분류기가 서로의 결과를 지우지 않게 합니다.
+    - 기본 분류기(fill_gaps=False, classify_news): 테마를 찾은 행은 항상 덮어쓰고, 테마를 못 찾은 행은
+      자기가 정했던 테마만 지웁니다 (보조 분류기가 채운 테마는 유지).
+    - 보조 분류기(fill_gaps=True, theme_classifier): 테마가 비어 있는 행과 자기가 채웠던 행만 씁니다.
+      theme_score는 기본 분류기의 가중치 점수 전용이라 건드리지 않습니다.
+    """
+
+    def __init__(self, conn, source, fill_gaps=False, chunk_size=DEFAULT_CHUNK_SIZE, logger=None):
+        self.conn = conn
+        self.source = source
+        self.fill_gaps = fill_gaps
+        self.chunk_size = chunk_size
+        self.logger = logger or logging.getLogger(__name__)
+        self.prepared = False
+        self.written_count = 0
+
+    def prepare(self):
+        """theme_score/theme_source/story_id 컬럼과 임시 테이블을 준비합니다. ALTER는 암묵적 커밋이 일어나므로 배치 트랜잭션 전에 호출합니다."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("ALTER TABLE stock_news ADD COLUMN IF NOT EXISTS theme_score INT")
+            cursor.execute("ALTER TABLE stock_news ADD COLUMN IF NOT EXISTS theme_source VARCHAR(50)")
+            ensure_dedup_columns(cursor)
+            # CREATE TEMPORARY TABLE은 암묵적 커밋이 없어 배치 트랜잭션 안에서도 안전합니다.
+            cursor.execute(f"""
+            CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+                id BIGINT PRIMARY KEY,
+                theme VARCHAR(255),
+                score INT
+            ) ENGINE=MEMORY
+            """)
+        finally:
+            cursor.close()
+        self.prepared = True
+
+    def _update_sql(self):
+        if self.fill_gaps:
+            return f"""
+            UPDATE stock_news n
+            JOIN {STAGING_TABLE} t ON t.id = n.id
+            SET n.theme = t.theme, n.theme_source = IF(t.theme IS NULL, NULL, %s)
+            WHERE (n.theme IS NULL AND t.theme IS NOT NULL) OR n.theme_source = %s
+            """
+        return f"""
+        UPDATE stock_news n
+        JOIN {STAGING_TABLE} t ON t.id = n.id
+        SET n.theme = t.theme, n.theme_score = t.score, n.theme_source = IF(t.theme IS NULL, NULL, %s)
+        WHERE t.theme IS NOT NULL OR n.theme_source = %s
+        """
+
+    def write(self, results):
+        """results: 배치의 모든 뉴스에 대한 (news_id, 테마 또는 None, score) 목록. 실제로 바뀐 행 수를 반환합니다."""
+        results = list(results)
+        if not results:
+            return 0
+        if not self.prepared:
+            self.prepare()
+        cursor = self.conn.cursor()
+        try:
+            updated = 0
+            for i in range(0, len(results), self.chunk_size):
+                chunk = results[i:i + self.chunk_size]
+                cursor.execute(f"DELETE FROM {STAGING_TABLE}")
+                # mysql-connector는 INSERT ... VALUES의 executemany를 여러 행 INSERT 한 문장으로 보냅니다.
+                cursor.executemany(f"INSERT INTO {STAGING_TABLE} (id, theme, score) VALUES (%s, %s, %s)", chunk)
+                cursor.execute(self._update_sql(), (self.source, self.source))
+                updated += cursor.rowcount
+            self.written_count += updated
+            return updated
+        finally:
+            cursor.close()
+
+    def propagate(self, after_id, upto_id):
+        """
+        id가 (after_id, upto_id]인 재송고 기사에 대표 기사의 테마를 복사합니다. 대표 기사는 항상 재송고 기사보다
+        id가 작으므로, 배치마다 워터마크 구간으로 호출하면 같은 트랜잭션에서 분류한 대표 기사까지 반영됩니다.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+            UPDATE stock_news d
+            JOIN stock_news r ON r.id = d.story_id
+            SET d.theme = r.theme, d.theme_score = r.theme_score, d.theme_source = r.theme_source
+            WHERE d.id > %s AND d.id <= %s AND d.story_id IS NOT NULL
+            """, (after_id, upto_id))
+            return cursor.rowcount
+        finally:
+            cursor.close()
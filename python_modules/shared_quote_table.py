@@ -0,0 +1,218 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+
+# 메모리 기반 파일시스템(/dev/shm)에 두어 디스크 I/O 없이 여러 프로세스(Python, PHP)가 같은 메모리를 매핑합니다.
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else os.path.join(PROJECT_ROOT, 'data')
+QUOTE_TABLE_FILE = os.path.join(SHM_DIR, 'kiwoom_quotes.bin')
+
+# --- 테이블 형식 ---
+# 헤더(64바이트): 매직(8) + 용량(uint32) + 종목 수(uint32) + 레코드 크기(uint32) + 예약
+# 종목코드 표: 용량 × 8바이트 (ASCII, NUL 패딩) — 행 번호가 곧 레코드 번호
+# 레코드: 용량 × 64바이트
+QUOTE_MAGIC = b'KQUOTE01'
+HEADER_FORMAT = '<8sIII'
+HEADER_SIZE = 64
+CODE_SIZE = 8
+# seq(uint32) + 예약(uint32) + 현재가 + 전일대비 + 누적거래량 + 누적거래대금 (int64) + 등락률(float64) + 갱신시각(ns, int64)
+RECORD_FORMAT = '<IIqqqqdq'
+RECORD_SIZE = 64
+BODY_FORMAT = '<qqqqdq'
+BODY_OFFSET = 8
+DEFAULT_CAPACITY = 4096
+MAX_READ_RETRIES = 100
+
+def signed_number(value, cast=int):
+    """'+1,200', '-350' 같은 키움 숫자 문자열을 부호를 유지한 숫자로 변환합니다. 실패 시 None."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    try:
+        return cast(float(str(value).replace(',', '').replace('+', '').strip()))
+    except ValueError:
+        return None
+
+class SharedQuoteTable:
+    """
+    종목코드로 색인되는 고정 크기 레코드의 최신 시세 테이블입니다.
+    쓰는 쪽(실시간 클라이언트) 하나가 레코드를 갱신하고, 다른 로컬 프로세스는 잠금 없이 읽습니다.
+
+    일관성은 seqlock 방식으로 맞춥니다: 쓰는 쪽은 seq를 홀수로 올린 뒤 값을 쓰고 다시 짝수로 올리며,
+    읽는 쪽은 seq가 짝수이고 읽기 전후 seq가 같을 때만 값을 채택하고 아니면 다시 읽습니다.
+    종목 추가는 코드 표에 먼저 쓰고 종목 수를 나중에 올리므로, 읽는 쪽은 종목 수가 바뀌면 색인만 다시 읽습니다.
+    """
+
+    def __init__(self, path, mm, writable):
+        self.path = path
+        self.mm = mm
+        self.writable = writable
+        self.capacity = 0
+        self.index = {}
+        self.known_count = 0
+        self._read_header()
+
+    @classmethod
+    def create(cls, codes=(), path=QUOTE_TABLE_FILE, capacity=DEFAULT_CAPACITY):
+        """쓰는 쪽: 테이블 파일을 새로 만들고 종목코드를 등록합니다 (기존 파일은 덮어씀)."""
+        codes = list(dict.fromkeys(codes))
+        capacity = max(capacity, len(codes))
+        size = HEADER_SIZE + capacity * CODE_SIZE + capacity * RECORD_SIZE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(size)
+        # 완성된 파일로 교체해 읽는 쪽이 크기가 맞지 않는 파일을 보지 않도록 함
+        with open(tmp_path, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), size)
+        struct.pack_into(HEADER_FORMAT, mm, 0, QUOTE_MAGIC, capacity, 0, RECORD_SIZE)
+        os.replace(tmp_path, path)
+        table = cls(path, mm, writable=True)
+        for code in codes:
+            table.add_code(code)
+        return table
+
+    @classmethod
+    def open(cls, path=QUOTE_TABLE_FILE):
+        """읽는 쪽: 기존 테이블 파일을 읽기 전용으로 매핑합니다."""
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, mm, writable=False)
+
+    def _read_header(self):
+        magic, capacity, count, record_size = struct.unpack_from(HEADER_FORMAT, self.mm, 0)
+        if magic != QUOTE_MAGIC or record_size != RECORD_SIZE:
+            raise ValueError(f"시세 테이블 형식이 올바르지 않습니다: {self.path}")
+        self.capacity = capacity
+        self._refresh_index(count)
+
+    def _refresh_index(self, count):
+        for row in range(self.known_count, count):
+            offset = HEADER_SIZE + row * CODE_SIZE
+            code = self.mm[offset:offset + CODE_SIZE].rstrip(b'\0').decode('ascii')
+            self.index[code] = row
+        self.known_count = count
+
+    def _sync_index(self):
+        count = struct.unpack_from('<I', self.mm, 12)[0]
+        if count != self.known_count:
+            self._refresh_index(count)
+
+    def _record_offset(self, row):
+        return HEADER_SIZE + self.capacity * CODE_SIZE + row * RECORD_SIZE
+
+    def __len__(self):
+        self._sync_index()
+        return self.known_count
+
+    def add_code(self, stock_code):
+        """쓰는 쪽: 종목을 등록하고 행 번호를 반환합니다. 용량이 가득 차면 None."""
+        row = self.index.get(stock_code)
+        if row is not None:
+            return row
+        if self.known_count >= self.capacity:
+            return None
+        row = self.known_count
+        encoded = stock_code.encode('ascii')[:CODE_SIZE].ljust(CODE_SIZE, b'\0')
+        offset = HEADER_SIZE + row * CODE_SIZE
+        self.mm[offset:offset + CODE_SIZE] = encoded
+        self.index[stock_code] = row
+        self.known_count = row + 1
+        struct.pack_into('<I', self.mm, 12, self.known_count)  # 코드를 쓴 뒤 종목 수 공개
+        return row
+
+    def update(self, stock_code, price, change=0, volume=0, amount=0, change_rate=0.0, updated_at_ns=None):
+        """쓰는 쪽: 종목의 최신 시세를 seqlock으로 갱신합니다. 등록되지 않은 종목은 자동 등록."""
+        row = self.index.get(stock_code)
+        if row is None:
+            row = self.add_code(stock_code)
+            if row is None:
+                return False
+        offset = self._record_offset(row)
+        seq = struct.unpack_from('<I', self.mm, offset)[0]
+        struct.pack_into('<I', self.mm, offset, (seq + 1) & 0xFFFFFFFF)  # 홀수: 쓰는 중
+        struct.pack_into(BODY_FORMAT, self.mm, offset + BODY_OFFSET,
+                         price or 0, change or 0, volume or 0, amount or 0, change_rate or 0.0,
+                         updated_at_ns or time.time_ns())
+        struct.pack_into('<I', self.mm, offset, (seq + 2) & 0xFFFFFFFF)  # 짝수: 완료
+        return True
+
+    def update_from_tick(self, stock_code, tick):
+        """WebSocketClient.add_tick_handler()에 연결하는 체결 콜백입니다 (Mock API 필드명 또는 FID)."""
+        price = signed_number(tick.get('lastPrice') or tick.get('10'))
+        if not price:
+            return False
+        return self.update(
+            stock_code,
+            price=abs(price),
+            change=signed_number(tick.get('changeFromPrevDay') or tick.get('11')),
+            volume=signed_number(tick.get('tradeVolume') or tick.get('13')),
+            amount=signed_number(tick.get('tradeAmount') or tick.get('14')),
+            change_rate=signed_number(tick.get('fluctuationRate') or tick.get('12'), cast=float),
+        )
+
+    def _read_row(self, row):
+        offset = self._record_offset(row)
+        for _ in range(MAX_READ_RETRIES):
+            seq_before = struct.unpack_from('<I', self.mm, offset)[0]
+            if seq_before & 1:
+                continue
+            body = struct.unpack_from(BODY_FORMAT, self.mm, offset + BODY_OFFSET)
+            if struct.unpack_from('<I', self.mm, offset)[0] == seq_before:
+                if seq_before == 0:
+                    return None  # 아직 한 번도 갱신되지 않은 종목
+                price, change, volume, amount, change_rate, updated_at_ns = body
+                return {
+                    'current_price': price, 'change': change, 'volume': volume, 'amount': amount,
+                    'change_rate': change_rate, 'updated_at': updated_at_ns / 1e9,
+                }
+        return None
+
+    def get(self, stock_code):
+        """종목의 최신 시세를 dict로 반환합니다. 모르는 종목이거나 아직 시세가 없으면 None."""
+        row = self.index.get(stock_code)
+        if row is None:
+            self._sync_index()
+            row = self.index.get(stock_code)
+            if row is None:
+                return None
+        return self._read_row(row)
+
+    def read_all(self):
+        """전종목 최신 시세를 {종목코드: dict}로 반환합니다."""
+        self._sync_index()
+        quotes = {}
+        for code, row in self.index.items():
+            quote = self._read_row(row)
+            if quote is not None:
+                quotes[code] = quote
+        return quotes
+
+    def close(self):
+        self.mm.close()
+
+def main():
+    """사용법: python shared_quote_table.py [종목코드 ...] — 최신 시세를 JSON으로 출력 (종목코드 생략 시 전종목)"""
+    try:
+        table = SharedQuoteTable.open()
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"공유 시세 테이블을 열 수 없습니다: {e}"}, ensure_ascii=False))
+        sys.exit(1)
+    try:
+        if len(sys.argv) > 1:
+            quotes = {code: table.get(code) for code in sys.argv[1:]}
+        else:
+            quotes = table.read_all()
+        print(json.dumps(quotes, ensure_ascii=False))
+    finally:
+        table.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import datetime
+from typing import Optional
+
+# --- ka10099 응답의 필드명이 환경(모의/실서버, 버전)마다 달라 순서대로 확인합니다 ---
+CODE_FIELDS = ('code', 'stk_cd', '종목코드')
+NAME_FIELDS = ('name', 'stk_nm', '종목명')
+
+def _first_value(item, fields):
+    """여러 후보 필드 중 처음으로 값이 있는 필드의 값을 반환합니다."""
+    for field in fields:
+        value = item.get(field)
+        if value:
+            return value
+    return None
+
+def parse_price(value):
+    """'+1,200', '-70000' 같은 키움 가격 문자열을 부호 없는 int로 변환합니다. 실패 시 None."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(abs(value))
+    try:
+        return int(float(str(value).replace('+', '').replace('-', '').replace(',', '').strip()))
+    except ValueError:
+        return None
+
+def derive_previous_close(current_price, pred_pre):
+    """
+    ka10001의 현재가(cur_prc)와 전일대비(pred_pre)로 전일 종가를 계산합니다.
+    계산할 수 없으면 None을 반환합니다.
+    """
+    if not current_price or not pred_pre:
+        return None
+    try:
+        current_price_val = float(current_price.replace('+', '').replace('-', '').replace(',', ''))
+        pred_pre_val = float(pred_pre.replace('+', '').replace('-', '').replace(',', ''))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    if pred_pre.startswith('+'):
+        previous_close = current_price_val - pred_pre_val
+    elif pred_pre.startswith('-'):
+        previous_close = current_price_val + pred_pre_val
+    else:
+        previous_close = current_price_val
+    return str(int(previous_close))
+
+def extract_basic_details(ka10001_data):
+    """
+    ka10001 응답에서 현재가, 유통주식수, 전일 종가를 추출합니다.
+    응답이 'output' 리스트로 감싸져 있거나 평탄한 형태 모두 처리합니다.
+    """
+    output = ka10001_data.get('output') or ka10001_data
+    if isinstance(output, list):
+        output = output[0] if output else {}
+
+    current_price = output.get('cur_prc')
+    return {
+        'current_price': current_price,
+        'circulating_shares': output.get('dstr_stk'),
+        'previous_day_closing_price': derive_previous_close(current_price, output.get('pred_pre')),
+    }
+
+class StockRecord:
+    """
+    종목 목록 → 상세 정보 → 파생 지표 단계가 공유하는 종목 레코드입니다.
+    가격과 주식수는 DB 저장 형식과 무관하게 int로 보관합니다.
+    __slots__를 사용해 종목마다 __dict__를 만들지 않으므로 전종목을 메모리에 올려도 가볍습니다.
+    """
+    __slots__ = (
+        'stock_code', 'stock_name', 'market', 'sector', 'listed_shares',
+        'current_price', 'previous_day_closing_price', 'circulating_shares', 'details_updated_at',
+    )
+
+    def __init__(self, stock_code, stock_name, market, sector=None, listed_shares=None,
+                 current_price=None, previous_day_closing_price=None, circulating_shares=None,
+                 details_updated_at=None):
+        self.stock_code: str = stock_code
+        self.stock_name: str = stock_name
+        self.market: str = market
+        self.sector: Optional[str] = sector
+        self.listed_shares: Optional[int] = listed_shares
+        self.current_price: Optional[int] = current_price
+        self.previous_day_closing_price: Optional[int] = previous_day_closing_price
+        self.circulating_shares: Optional[int] = circulating_shares
+        self.details_updated_at: Optional[datetime.datetime] = details_updated_at
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"StockRecord({fields})"
+
+    def __eq__(self, other):
+        if not isinstance(other, StockRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    @classmethod
+    def from_list_item(cls, item, market):
+        """ka10099 응답의 종목 항목으로 레코드를 만듭니다. 코드나 이름이 없으면 None."""
+        stock_code = _first_value(item, CODE_FIELDS)
+        stock_name = _first_value(item, NAME_FIELDS)
+        if not stock_code or not stock_name:
+            return None
+        return cls(
+            stock_code=stock_code.strip(),
+            stock_name=stock_name.strip(),
+            market=market,
+            sector=item.get('upName') or None,
+            listed_shares=parse_price(item.get('listCount')),
+        )
+
+    def apply_basic_info(self, ka10001_data):
+        """ka10001 응답으로 현재가/전일 종가/유통주식수를 채웁니다. 전일 종가를 채웠으면 True."""
+        details = extract_basic_details(ka10001_data)
+        self.current_price = parse_price(details['current_price'])
+        self.circulating_shares = parse_price(details['circulating_shares'])
+        self.previous_day_closing_price = parse_price(details['previous_day_closing_price'])
+        self.details_updated_at = datetime.datetime.now()
+        return self.previous_day_closing_price is not None
+
+    @property
+    def change_amount(self):
+        if self.current_price is None or self.previous_day_closing_price is None:
+            return None
+        return self.current_price - self.previous_day_closing_price
+
+    @property
+    def change_rate(self):
+        """전일 대비 등락률(%)."""
+        if self.change_amount is None or not self.previous_day_closing_price:
+            return None
+        return round(self.change_amount / self.previous_day_closing_price * 100, 2)
+
+    @property
+    def market_cap(self):
+        """현재가 × 유통주식수."""
+        if self.current_price is None or not self.circulating_shares:
+            return None
+        return self.current_price * self.circulating_shares
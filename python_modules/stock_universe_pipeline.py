@@ -0,0 +1,390 @@
+import argparse
+import configparser
+import datetime
+import os
+import time
+import mysql.connector
+from kiwoom_api import KiwoomAPI, logger
+from stock_record import StockRecord, parse_price
+from market_snapshot import MarketSnapshot
+
+# --- 기본 경로 및 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+CONFIG_FILE = os.path.join(PROJECT_ROOT, 'config.ini')
+LOCK_FILE = os.path.join(CURRENT_DIR, 'stock_universe_pipeline.lock')
+
+# --- 조회 대상 시장 (ka10099 mrkt_tp, 시장명) ---
+MARKETS = [('0', 'KOSPI'), ('10', 'KOSDAQ')]
+
+# --- API 호출 간 대기 시간(초) ---
+LIST_REQUEST_INTERVAL = 1
+DETAIL_REQUEST_INTERVAL = 0.5
+
+STAGES = ['list', 'details', 'metrics']
+
+def get_db_connection():
+    """config.ini에서 DB 정보를 읽어와 연결을 생성합니다."""
+    config = configparser.ConfigParser()
+    if not os.path.exists(CONFIG_FILE):
+        logger.error(f"설정 파일을 찾을 수 없습니다: {CONFIG_FILE}")
+        return None
+
+    config.read(CONFIG_FILE)
+
+    try:
+        db_config = {
+            'host': config.get('DB', 'HOST'),
+            'user': config.get('DB', 'USER'),
+            'password': config.get('DB', 'PASSWORD'),
+            'database': config.get('DB', 'DATABASE'),
+            'port': config.getint('DB', 'PORT')
+        }
+        return mysql.connector.connect(**db_config)
+    except (configparser.NoSectionError, configparser.NoOptionError) as e:
+        logger.error(f"config.ini 파일에 [DB] 섹션 또는 필요한 키가 없습니다. ({e})")
+        return None
+    except mysql.connector.Error as err:
+        logger.error(f"데이터베이스 연결 오류: {err}")
+        return None
+
+def get_previous_trading_day_str():
+    """주말을 건너뛴 직전 거래일을 YYYYMMDD 문자열로 반환합니다."""
+    today = datetime.date.today()
+    offset = 1 if today.weekday() < 5 else (today.weekday() - 4)
+    if today.weekday() == 0: offset = 3
+    return (today - datetime.timedelta(days=offset)).strftime('%Y%m%d')
+
+# =====================================================================
+# 1단계: 종목 목록 (ka10099)
+# =====================================================================
+def fetch_market_stocks(api, market_type_code, market_name):
+    """지정된 시장의 ka10099 페이지를 모두 조회해 StockRecord 리스트로 반환합니다."""
+    records = []
+    cont_yn = 'N'
+    next_key = ''
+    logger.info(f"{market_name} 종목 목록 조회를 시작합니다.")
+
+    while True:
+        response_data = api.get_all_stock_codes(market_type_code, cont_yn, next_key)
+        time.sleep(LIST_REQUEST_INTERVAL)
+        if response_data is None:
+            logger.error(f"{market_name} 종목 목록 조회에 실패했습니다.")
+            break
+
+        items = response_data.get('output1')
+        if not isinstance(items, list):
+            items = response_data.get('list', [])
+            if not isinstance(items, list):
+                logger.warning(f"API 응답에 'output1' 또는 'list' 필드가 없거나 유효한 리스트가 아닙니다. 응답: {response_data}")
+                break
+
+        for item in items:
+            record = StockRecord.from_list_item(item, market_name)
+            if record:
+                records.append(record)
+            else:
+                logger.warning(f"종목 정보 누락: {item}")
+
+        cont_yn = response_data.get('cont_yn', 'N')
+        next_key = response_data.get('next_key', '')
+        if cont_yn != 'Y' or not next_key:
+            break
+
+    logger.info(f"{market_name} 종목 {len(records)}개 조회 완료.")
+    return records
+
+def fetch_universe(api):
+    """모든 대상 시장의 종목 목록을 조회하고 종목코드 기준으로 중복을 제거합니다."""
+    universe = {}
+    for market_type_code, market_name in MARKETS:
+        for record in fetch_market_stocks(api, market_type_code, market_name):
+            universe.setdefault(record.stock_code, record)
+    logger.info(f"전체 종목 {len(universe)}개 (중복 제거 후)")
+    return list(universe.values())
+
+def save_universe(records):
+    """종목 목록을 all_stocks 테이블에 저장합니다."""
+    conn = get_db_connection()
+    if conn is None: return
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS all_stocks (
+            stock_code VARCHAR(10) PRIMARY KEY,
+            stock_name VARCHAR(100) NOT NULL,
+            market VARCHAR(20) NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """)
+        # ka10099가 함께 내려주는 업종/상장주식수는 이후 단계에서 재사용합니다.
+        cursor.execute("ALTER TABLE all_stocks ADD COLUMN IF NOT EXISTS sector VARCHAR(100)")
+        cursor.execute("ALTER TABLE all_stocks ADD COLUMN IF NOT EXISTS listed_shares BIGINT")
+        cursor.executemany("""
+        INSERT INTO all_stocks (stock_code, stock_name, market, sector, listed_shares)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            stock_name = VALUES(stock_name),
+            market = VALUES(market),
+            sector = VALUES(sector),
+            listed_shares = VALUES(listed_shares),
+            updated_at = CURRENT_TIMESTAMP
+        """, [(r.stock_code, r.stock_name, r.market, r.sector, r.listed_shares) for r in records])
+        conn.commit()
+        logger.info(f"{len(records)}개의 종목 정보가 all_stocks 테이블에 저장/업데이트되었습니다.")
+    except mysql.connector.Error as err:
+        logger.error(f"all_stocks 테이블 저장 중 오류: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+def load_universe():
+    """이전 list 단계의 결과(all_stocks)를 불러옵니다. ka10099를 다시 호출하지 않습니다."""
+    conn = get_db_connection()
+    if conn is None: return []
+
+    records = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT stock_code, stock_name, market, sector, listed_shares FROM all_stocks ORDER BY stock_code")
+        records = [
+            StockRecord(stock_code=code, stock_name=name, market=market, sector=sector, listed_shares=listed_shares)
+            for code, name, market, sector, listed_shares in cursor.fetchall()
+        ]
+        cursor.close()
+    except mysql.connector.Error as err:
+        logger.error(f"all_stocks 테이블 조회 중 오류: {err}")
+    finally:
+        conn.close()
+    logger.info(f"all_stocks 테이블에서 종목 {len(records)}개를 불러왔습니다.")
+    return records
+
+# =====================================================================
+# 2단계: 상세 정보 (ka10001, 필요 시 ka10015)
+# =====================================================================
+def load_details(records):
+    """stock_details 테이블에 저장된 상세 정보를 레코드에 채웁니다. API를 호출하지 않습니다."""
+    conn = get_db_connection()
+    if conn is None: return records
+
+    by_code = {r.stock_code: r for r in records}
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT stock_code, current_price, previous_day_closing_price, circulating_shares, updated_at
+            FROM stock_details
+        """)
+        for code, current_price, previous_close, shares, updated_at in cursor.fetchall():
+            record = by_code.get(code)
+            if record is None:
+                continue
+            record.current_price = parse_price(current_price)
+            record.previous_day_closing_price = parse_price(previous_close)
+            record.circulating_shares = parse_price(shares)
+            record.details_updated_at = updated_at
+        cursor.close()
+    except mysql.connector.Error as err:
+        logger.error(f"stock_details 테이블 조회 중 오류: {err}")
+    finally:
+        conn.close()
+    return records
+
+def collect_details(api, records, max_age_minutes=None):
+    """
+    각 종목의 상세 정보를 ka10001 한 번으로 수집합니다.
+    max_age_minutes가 주어지면 그 시간 안에 갱신된 종목은 다시 조회하지 않습니다.
+    수집(갱신)된 레코드 리스트를 반환합니다.
+    """
+    if max_age_minutes is not None:
+        load_details(records)
+        threshold = datetime.datetime.now() - datetime.timedelta(minutes=max_age_minutes)
+        targets = [r for r in records if r.details_updated_at is None or r.details_updated_at < threshold]
+        logger.info(f"{len(records)}개 종목 중 {len(records) - len(targets)}개는 최근 {max_age_minutes}분 내 갱신되어 건너뜁니다.")
+    else:
+        targets = records
+
+    previous_trading_day_str = get_previous_trading_day_str()
+    fallback_count = 0
+
+    for i, record in enumerate(targets):
+        logger.info(f"({i+1}/{len(targets)}) {record.stock_name}({record.stock_code}) 상세 정보 조회 중...")
+
+        ka10001_data = api.get_stock_basic_info(record.stock_code)
+        time.sleep(DETAIL_REQUEST_INTERVAL)
+        if ka10001_data and record.apply_basic_info(ka10001_data):
+            continue
+
+        fallback_count += 1
+        ka10015_data = api.get_stock_daily_history(record.stock_code, previous_trading_day_str)
+        time.sleep(DETAIL_REQUEST_INTERVAL)
+        if ka10015_data:
+            daily_detail = (ka10015_data.get('daly_trde_dtl') or [{}])[0]
+            record.previous_day_closing_price = parse_price(daily_detail.get('close_pric'))
+
+    logger.info(f"상세 정보 {len(targets)}건 수집 완료 (ka10015 추가 조회 {fallback_count}건).")
+    return targets
+
+def save_details(records):
+    """상세 정보를 stock_details 테이블에 저장합니다."""
+    conn = get_db_connection()
+    if conn is None: return
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_details (
+            stock_code VARCHAR(10) PRIMARY KEY,
+            stock_name VARCHAR(100) NOT NULL,
+            market VARCHAR(20) NOT NULL,
+            current_price VARCHAR(20),
+            closing_price VARCHAR(20),
+            previous_day_closing_price VARCHAR(20),
+            circulating_shares VARCHAR(20),
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """)
+
+        def to_str(value):
+            return str(value) if value is not None else None
+
+        data_to_insert = [
+            (
+                r.stock_code, r.stock_name, r.market,
+                to_str(r.current_price), to_str(r.current_price),
+                to_str(r.previous_day_closing_price), to_str(r.circulating_shares)
+            ) for r in records
+        ]
+        if data_to_insert:
+            cursor.executemany("""
+            INSERT INTO stock_details (stock_code, stock_name, market, current_price, closing_price, previous_day_closing_price, circulating_shares)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                stock_name = VALUES(stock_name),
+                market = VALUES(market),
+                current_price = VALUES(current_price),
+                closing_price = VALUES(closing_price),
+                previous_day_closing_price = VALUES(previous_day_closing_price),
+                circulating_shares = VALUES(circulating_shares),
+                updated_at = CURRENT_TIMESTAMP
+            """, data_to_insert)
+            conn.commit()
+        logger.info(f"{len(data_to_insert)}개의 종목 상세 정보가 stock_details 테이블에 저장/업데이트되었습니다.")
+    except mysql.connector.Error as err:
+        logger.error(f"stock_details 테이블 저장 중 오류: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+# =====================================================================
+# 3단계: 파생 지표 (API 호출 없음)
+# =====================================================================
+def save_metrics(records):
+    """등락폭, 등락률, 시가총액을 stock_metrics 테이블에 저장합니다."""
+    conn = get_db_connection()
+    if conn is None: return
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stock_metrics (
+            stock_code VARCHAR(10) PRIMARY KEY,
+            change_amount BIGINT,
+            change_rate DECIMAL(8, 2),
+            market_cap BIGINT,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """)
+        data_to_insert = [
+            (r.stock_code, r.change_amount, r.change_rate, r.market_cap)
+            for r in records
+            if r.current_price is not None
+        ]
+        if data_to_insert:
+            cursor.executemany("""
+            INSERT INTO stock_metrics (stock_code, change_amount, change_rate, market_cap)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                change_amount = VALUES(change_amount),
+                change_rate = VALUES(change_rate),
+                market_cap = VALUES(market_cap),
+                updated_at = CURRENT_TIMESTAMP
+            """, data_to_insert)
+            conn.commit()
+        logger.info(f"{len(data_to_insert)}개 종목의 파생 지표가 stock_metrics 테이블에 저장되었습니다.")
+    except mysql.connector.Error as err:
+        logger.error(f"stock_metrics 테이블 저장 중 오류: {err}")
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+# =====================================================================
+# 파이프라인 실행
+# =====================================================================
+def run_pipeline(stages, max_age_minutes=None):
+    """
+    요청된 단계만 순서대로 실행합니다.
+    앞 단계가 같은 실행에 포함되지 않으면 DB에 저장된 결과를 불러와 재사용합니다.
+    """
+    api = None
+    if 'list' in stages or 'details' in stages:
+        api = KiwoomAPI()
+        if not api.token:
+            logger.error("접근 토큰을 얻지 못하여 파이프라인을 시작할 수 없습니다.")
+            return
+
+    records = None
+    if 'list' in stages:
+        records = fetch_universe(api)
+        if not records:
+            logger.warning("수집된 종목 목록이 없어 파이프라인을 중단합니다.")
+            return
+        save_universe(records)
+
+    if 'details' in stages:
+        if records is None:
+            records = load_universe()
+        updated = collect_details(api, records, max_age_minutes)
+        save_details(updated)
+
+    if 'metrics' in stages:
+        # 같은 실행에서 details 단계를 거치지 않았으면 (list만 실행한 목록에는 가격이 없으므로) 저장된 상세 정보를 채웁니다.
+        if 'details' not in stages:
+            records = load_details(records or load_universe())
+        save_metrics(records)
+
+    # 시가총액 순위(auto_trade_backend/market_cap_fetcher.py)가 DB 조회 없이 읽을 수 있도록 최신 스냅샷을 파일로 남깁니다.
+    # list 단계만의 레코드(가격 없음)로는 만들지 않습니다 — 위 분기로 details/metrics가 있으면 항상 상세 정보가 채워져 있습니다.
+    if records and ('details' in stages or 'metrics' in stages):
+        MarketSnapshot.from_records(records).dump()
+        logger.info(f"종목 {len(records)}개의 시장 스냅샷을 저장했습니다.")
+
+def main(stages, max_age_minutes=None):
+    """잠금 파일로 중복 실행을 막고 파이프라인을 실행합니다. 기존 수집 스크립트도 이 함수로 실행됩니다."""
+    if os.path.exists(LOCK_FILE):
+        logger.info(f"잠금 파일({LOCK_FILE})이 존재하여 스크립트를 시작하지 않습니다.")
+        return
+
+    try:
+        with open(LOCK_FILE, 'w') as f:
+            f.write(str(os.getpid()))
+        logger.info(f"종목 유니버스 파이프라인을 시작합니다. 단계: {', '.join(stages)}")
+        run_pipeline(stages, max_age_minutes)
+        logger.info("종목 유니버스 파이프라인 실행이 완료되었습니다.")
+    except Exception as e:
+        logger.error(f"파이프라인 실행 중 오류 발생: {e}", exc_info=True)
+    finally:
+        if os.path.exists(LOCK_FILE):
+            os.remove(LOCK_FILE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="종목 목록 → 상세 정보 → 파생 지표 단계별 수집 파이프라인")
+    parser.add_argument('stages', nargs='*', choices=STAGES + ['all'], default=['all'],
+                        help="실행할 단계 (기본값: all)")
+    parser.add_argument('--max-age', type=int, default=None, metavar='MINUTES',
+                        help="details 단계에서 지정한 분 이내에 갱신된 종목은 다시 조회하지 않습니다.")
+    args = parser.parse_args()
+    main(STAGES if 'all' in args.stages else [s for s in STAGES if s in args.stages], args.max_age)
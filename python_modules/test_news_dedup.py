@@ -0,0 +1,122 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from news_dedup import NearDuplicateIndex, simhash, hamming_distance, MAX_DISTANCE, BAND_BITS  # noqa: E402
+from news_ingest import insert_news  # noqa: E402
+
+TITLE = '삼성전자, 3분기 영업이익 10조원 돌파…반도체 업황 회복에 실적 개선 본격화'
+DESCRIPTION = '메모리 가격 상승과 HBM 판매 확대로 시장 기대치를 웃돌았다.'
+
+
+def make_row(title, link, code='005930'):
+    return (code, title, link, DESCRIPTION, '2026-10-19 09:00:00')
+
+
+def test_simhash_ignores_spacing_and_punctuation():
+    signature = simhash(TITLE)
+    assert signature is not None
+    assert simhash('삼성전자 3분기 영업이익 10조원 돌파 반도체 업황 회복에 실적 개선 본격화') == signature
+    # 말머리만 붙은 재송고는 거리 MAX_DISTANCE 이하
+    assert hamming_distance(simhash(TITLE + ' ' + DESCRIPTION), simhash('[속보] ' + TITLE + ' ' + DESCRIPTION)) <= MAX_DISTANCE
+    assert hamming_distance(signature, simhash('카카오, 신규 AI 서비스 공개하며 플랫폼 경쟁력 강화 나서')) > MAX_DISTANCE
+
+
+def test_simhash_skips_short_text():
+    assert simhash('삼성전자 급등') is None
+    assert simhash('') is None
+
+
+def test_index_finds_within_distance_via_any_band():
+    index = NearDuplicateIndex()
+    base = simhash(TITLE)
+    index.add(1, base, '반도체')
+    # 서로 다른 구간의 비트를 MAX_DISTANCE개 뒤집어도 한 구간은 같으므로 찾음
+    near = base
+    for band in range(MAX_DISTANCE):
+        near ^= 1 << (band * BAND_BITS)
+    assert index.find(near) == 1
+    assert index.theme_of(1) == '반도체'
+    far = near ^ (1 << (MAX_DISTANCE * BAND_BITS))
+    assert index.find(far) is None
+
+
+def test_index_prefers_closest_and_remove_cleans_buckets():
+    index = NearDuplicateIndex()
+    base = simhash(TITLE)
+    index.add(1, base ^ 0b11)
+    index.add(2, base ^ 0b1)
+    assert index.find(base) == 2
+    index.remove(2)
+    assert index.find(base) == 1
+    index.rekey(1, 10)
+    assert index.find(base) == 10 and len(index) == 1
+    index.remove(10)
+    assert index.find(base) is None
+    assert all(not bucket for bucket in index.buckets)
+
+
+def test_rollback_restores_index():
+    index = NearDuplicateIndex()
+    base = simhash(TITLE)
+    index.add(1, base, '반도체')
+    index.begin()
+    index.add(('pending', 0), simhash('카카오, 신규 AI 서비스 공개하며 플랫폼 경쟁력 강화 나서'))
+    index.rekey(('pending', 0), 2)
+    index.remove(1)
+    index.rollback()
+    assert set(index.stories) == {1}
+    assert index.find(base) == 1
+    assert sum(len(keys) for bucket in index.buckets for keys in bucket.values()) == len(index.buckets)
+    index.rollback()  # 커밋/롤백 뒤에는 아무 일도 하지 않음
+    assert set(index.stories) == {1}
+
+
+class FakeCursor:
+    """INSERT IGNORE가 모든 행을 새로 넣는다고 보고 id를 100부터 매기는 가짜 커서입니다."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.rows = []
+        self.lastrowid = 100
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        if self.fail_on and sql.startswith(self.fail_on):
+            raise RuntimeError('DB 오류')
+        if sql.startswith('INSERT IGNORE'):
+            self.rowcount = sql.count('(%s')
+            width = len(params) // self.rowcount
+            self.rows = [(100 + n, params[n * width], params[n * width + 2]) for n in range(self.rowcount)]
+        elif sql.startswith('SELECT'):
+            self.result = self.rows
+
+    def fetchall(self):
+        return self.result
+
+
+def test_insert_news_links_duplicates_and_rollback_drops_new_ids():
+    index = NearDuplicateIndex()
+    rows = [make_row(TITLE, 'https://a/1'), make_row('[속보] ' + TITLE, 'https://b/1', code='000660')]
+
+    index.begin()
+    inserted = insert_news(FakeCursor(), rows, dedup=index)
+    assert [news_id for news_id, _, _ in inserted] == [100, 101]
+    assert set(index.stories) == {100}  # 재송고 기사는 대표 기사(100)에 묶이고 색인에 따로 넣지 않음
+    index.rollback()  # DB 롤백과 함께: 저장되지 않은 id 100이 색인에 남지 않음
+    assert len(index) == 0
+
+    index.begin()
+    with pytest.raises(RuntimeError):
+        insert_news(FakeCursor(fail_on='SELECT'), rows, dedup=index)
+    index.rollback()
+    assert len(index) == 0 and all(not bucket for bucket in index.buckets)
+
+    index.begin()
+    insert_news(FakeCursor(), rows, dedup=index)
+    index.commit()
+    index.rollback()
+    assert set(index.stories) == {100}
@@ -0,0 +1,133 @@
+import asyncio
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from news_freshness import (  # noqa: E402
+    NewsFetchState, select_due_stocks, DEFAULT_NEWS_RATE, FIRST_FETCH_DISPLAY, MAX_DISPLAY,
+    MIN_CHECK_INTERVAL, MAX_CHECK_INTERVAL, TARGET_NEW_PER_CHECK,
+)
+import naver_news_async  # noqa: E402
+from naver_news_async import NaverNewsCollector, NaverRateLimiter, FETCH_FAILED  # noqa: E402
+
+NOW = datetime.datetime(2026, 10, 19, 9, 0, 0)
+
+
+def make_row(pub_date, link='https://news/1', code='005930'):
+    return (code, '제목', link, '요약', pub_date)
+
+
+def test_first_check_uses_default_rate():
+    state = NewsFetchState('005930')
+    assert state.is_due(NOW)
+    assert state.display_for(NOW) == FIRST_FETCH_DISPLAY
+
+    state.record_check([make_row('2026-10-19 08:50:00')], NOW)
+    # 첫 확인은 경과 시간을 모르므로 빈도는 초기값 그대로, 간격은 목표 건수 / 빈도
+    assert state.news_rate == DEFAULT_NEWS_RATE
+    assert state.next_check_at == NOW + datetime.timedelta(hours=TARGET_NEW_PER_CHECK / DEFAULT_NEWS_RATE)
+    assert (state.newest_pub_date, state.newest_link) == ('2026-10-19 08:50:00', 'https://news/1')
+    assert not state.is_due(NOW + datetime.timedelta(hours=1))
+
+
+def test_busy_stock_is_checked_more_often():
+    state = NewsFetchState('005930', '2026-10-19 07:00:00', 'https://news/0', last_checked_at=NOW - datetime.timedelta(hours=1))
+    rows = [make_row(f'2026-10-19 08:{minute:02d}:00', f'https://news/{minute}') for minute in range(20)]
+    state.record_check(rows, NOW)
+
+    expected_rate = 0.3 * 20 + 0.7 * DEFAULT_NEWS_RATE
+    assert state.news_rate == pytest.approx(expected_rate)
+    # 시간당 약 6건이면 2건 쌓이는 20분 뒤, 단 최소 간격(10분)보다 짧아지지는 않음
+    assert state.next_check_at == NOW + max(MIN_CHECK_INTERVAL, datetime.timedelta(hours=TARGET_NEW_PER_CHECK / expected_rate))
+    assert state.newest_link == 'https://news/19'
+
+
+def test_quiet_stock_backs_off_and_display_tracks_rate():
+    state = NewsFetchState('005930', '2026-10-19 07:00:00', 'https://news/0', news_rate=4.0,
+                           last_checked_at=NOW - datetime.timedelta(hours=2))
+    assert state.display_for(NOW) == 16  # 빈도 × 경과 시간 × 2
+
+    state.record_check([], NOW)
+    assert state.news_rate == pytest.approx(0.7 * 4.0)
+    assert state.next_check_at - NOW > datetime.timedelta(minutes=30)
+
+    # 기사가 계속 없으면 간격은 24시간에서 멈춤
+    for hour in range(1, 30):
+        state.record_check([], NOW + MAX_CHECK_INTERVAL * hour)
+    assert state.next_check_at - state.last_checked_at == MAX_CHECK_INTERVAL
+    # 새 기사가 없으면 워터마크는 그대로
+    assert state.newest_pub_date == '2026-10-19 07:00:00'
+
+    state.news_rate = 1000
+    assert state.display_for(state.last_checked_at + datetime.timedelta(hours=1)) == MAX_DISPLAY
+
+
+def test_is_known_stops_at_watermark():
+    state = NewsFetchState('005930', '2026-10-19 08:00:00', 'https://news/known')
+    assert state.is_known('2026-10-19 09:00:00', 'https://news/known')
+    assert state.is_known('2026-10-19 07:59:59', 'https://news/old')
+    assert not state.is_known('2026-10-19 08:00:00', 'https://news/same-second')
+    assert not NewsFetchState('005930').is_known('2026-10-19 07:00:00', 'https://news/known')
+
+
+def test_select_due_stocks_orders_by_rate():
+    states = {
+        'A': NewsFetchState('A', news_rate=0.5, next_check_at=NOW - datetime.timedelta(minutes=1)),
+        'B': NewsFetchState('B', news_rate=3.0, next_check_at=NOW),
+        'C': NewsFetchState('C', news_rate=9.0, next_check_at=NOW + datetime.timedelta(hours=1)),
+    }
+    stocks = [{'code': code, 'name': code} for code in ('A', 'B', 'C', 'D')]
+    due = select_due_stocks(stocks, states, NOW)
+    assert [stock['code'] for stock in due] == ['B', 'A', 'D']
+    assert [stock['priority'] for stock in due] == [0, 1, 2]
+    assert 'D' in states  # 처음 보는 종목은 상태를 만들어 둠
+    assert len(select_due_stocks(stocks, states, NOW, check_all=True)) == 4
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.entries = []
+
+    async def put(self, stock, items):
+        self.entries.append((stock['code'], items))
+
+
+def test_failed_fetch_does_not_update_state(tmp_path, monkeypatch):
+    limiter = NaverRateLimiter(quota_path=str(tmp_path / 'quota.json'))
+    collector = NaverNewsCollector('id', 'secret', limiter=limiter, concurrency=1)
+    results = {'A': FETCH_FAILED, 'B': []}
+
+    async def fake_fetch_stock(stock):
+        return results[stock['code']]
+
+    monkeypatch.setattr(collector, 'fetch_stock', fake_fetch_stock)
+    writer = RecordingWriter()
+    queue = [(0, 0, {'code': 'A', 'state': NewsFetchState('A')}), (1, 1, {'code': 'B', 'state': NewsFetchState('B')})]
+    try:
+        asyncio.run(collector._worker(queue, writer))
+    finally:
+        collector.executor.shutdown(wait=False)
+        collector.session.close()
+
+    # 실패한 종목은 writer로 넘기지 않아 record_check(빈도 하향, 다음 확인 연기)가 일어나지 않음
+    assert writer.entries == [('B', [])]
+    assert collector.processed_count == 1
+
+
+def test_search_failure_returns_sentinel(tmp_path, monkeypatch):
+    limiter = NaverRateLimiter(quota_path=str(tmp_path / 'quota.json'))
+    collector = NaverNewsCollector('id', 'secret', limiter=limiter, concurrency=1)
+    monkeypatch.setattr(collector, '_search', lambda query, display, start=1: None)  # 401 등 비정상 응답
+    stock = {'code': 'A', 'name': '종목A', 'state': NewsFetchState('A'), 'display': 3}
+    try:
+        assert asyncio.run(collector.fetch_stock(stock)) is FETCH_FAILED
+        assert asyncio.run(collector.fetch_stock({'code': 'A', 'name': '종목A'})) is FETCH_FAILED
+    finally:
+        collector.executor.shutdown(wait=False)
+        collector.session.close()
+    assert collector.failed_count == 2
+    assert naver_news_async.FETCH_FAILED is FETCH_FAILED
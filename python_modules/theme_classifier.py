@@ -1,9 +1,14 @@
+import argparse
 import configparser
 import os
 import logging
 import mysql.connector
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from kiwoom_api import KiwoomAPI, logger
+from keyword_matcher import get_matcher
+from news_classification_state import classifier_version, start_id_for, iter_news_batches, max_news_id, save_state
+from news_theme_writer import ThemeResultWriter
+from news_classification_pool import classify_batches, resolve_workers
+from theme_dictionary import load_theme_dictionary
 
 # --- 기본 경로 설정 ---
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -22,6 +27,11 @@ BASIC_THEMES_KEYWORDS = {
     "로봇": ["로봇", "자동화", "물류로봇", "협동로봇"]
 }
 
+# --- 증분 분류 설정 ---
+# 분류 로직을 바꾸면 올려 주세요. 테마 키워드(API 테마 종목 포함) 변경은 자동으로 감지됩니다.
+CLASSIFIER_NAME = 'theme_classifier'
+CLASSIFIER_LOGIC_VERSION = 2  # 2: classify_news가 비워 둔 행만 채움 (theme_source)
+
 def get_db_connection():
     """config.ini에서 DB 정보를 읽어와 연결을 생성합니다."""
     config = configparser.ConfigParser()
@@ -47,67 +57,48 @@ def get_db_connection():
         logger.error(f"데이터베이스 연결 오류: {err}")
         return None
 
-def fetch_all_themes_from_api(api):
-    """키움증권 API에서 모든 테마와 관련 종목 정보를 가져옵니다."""
-    if not api.token:
-        logger.info("API 토큰이 없어 기본 테마 키워드만 사용합니다.")
-        return BASIC_THEMES_KEYWORDS
-
-    logger.info("키움증권 API에서 전체 테마 목록을 조회합니다.")
-    themes_response = api.get_all_themes()
-    if not themes_response or 'thema_grp' not in themes_response:
-        logger.warning("API에서 테마 목록을 가져오지 못했습니다. 기본 키워드를 사용합니다.")
+def load_themes_keywords():
+    """
+    미리 만들어 둔 키움 테마 사전(theme_dictionary.py)의 테마별 종목명을 기본 키워드와 합칩니다.
+    사전이 없거나 오래된 경우에만 API로 갱신하고, 그마저 실패하면 기본 키워드만 사용합니다.
+    """
+    dictionary = load_theme_dictionary(KiwoomAPI)
+    if dictionary is None:
+        logger.warning("테마 사전을 사용할 수 없어 기본 키워드만 사용합니다.")
         return BASIC_THEMES_KEYWORDS
-
-    themes = {}
-    for theme_info in themes_response['thema_grp']:
-        theme_name = theme_info.get('thema_nm')
-        theme_code = theme_info.get('thema_grp_cd')
-        if theme_name and theme_code:
-            logger.info(f"테마 '{theme_name}'의 소속 종목을 조회합니다.")
-            stocks_response = api.get_stocks_by_theme(theme_code)
-            if stocks_response and 'thema_comp_stk' in stocks_response:
-                stock_names = [s.get('stk_nm') for s in stocks_response['thema_comp_stk'] if s.get('stk_nm')]
-                themes[theme_name] = stock_names
-            else:
-                logger.warning(f"'{theme_name}' 테마의 소속 종목을 가져오지 못했습니다.")
-    
-    logger.info(f"API에서 {len(themes)}개의 테마와 관련 종목 정보를 가져왔습니다.")
-    return {**BASIC_THEMES_KEYWORDS, **themes}
+    logger.info(f"테마 사전 버전 {dictionary.version}: 테마 {len(dictionary.themes)}개 ({dictionary.age_hours():.1f}시간 전 생성)")
+    return {**BASIC_THEMES_KEYWORDS, **dictionary.keywords()}
 
 def classify_news_item(news_item, themes_keywords):
-    """단일 뉴스 아이템의 테마를 분류합니다."""
+    """단일 뉴스 아이템의 테마를 분류합니다. (news_id, 테마, 일치 키워드 수)를 반환합니다."""
     news_id, title, description = news_item
-    text_to_check = (title + ' ' + (description or '')).lower()
-
-    best_theme = None
-    max_score = 0
-    
-    for theme, keywords in themes_keywords.items():
-        score = sum(1 for keyword in keywords if keyword.lower() in text_to_check)
-        if score > max_score:
-            max_score = score
-            best_theme = theme
-            
-    return news_id, best_theme
-
-def update_theme_in_db(conn, news_id, theme):
-    """데이터베이스에 분류된 테마를 업데이트합니다."""
-    try:
-        cursor = conn.cursor()
-        update_query = "UPDATE stock_news SET theme = %s WHERE id = %s"
-        cursor.execute(update_query, (theme, news_id))
-        conn.commit()
-        cursor.close()
-        return True
-    except mysql.connector.Error as err:
-        logger.error(f"ID {news_id} 테마 업데이트 중 오류 발생: {err}")
-        return False
-
-def main():
-    """뉴스 테마를 분류하고 데이터베이스를 업데이트하는 메인 함수."""
-    api = KiwoomAPI()
-    themes_keywords = fetch_all_themes_from_api(api)
+    # 키워드 집합마다 한 번 만든 오토마톤으로 본문을 한 번만 훑어 테마별 일치 키워드 수를 셉니다.
+    best_theme, score, _ = get_matcher(themes_keywords).classify_with_score(title + ' ' + (description or ''))
+    return news_id, best_theme, score
+
+# --- 프로세스 풀 작업자 상태 ---
+_worker_themes_keywords = None
+
+def init_classifier_worker(themes_keywords):
+    """작업자(또는 단일 프로세스 실행 시 현재 프로세스)에 테마 키워드를 두고 매처를 미리 만듭니다."""
+    global _worker_themes_keywords
+    _worker_themes_keywords = themes_keywords
+    get_matcher(themes_keywords)
+
+def classify_news_batch(batch):
+    """
+    뉴스 배치를 분류해 (news_id, 테마 또는 None, None)을 반환합니다. 테마를 못 찾은 행도 넘겨야
+    키워드가 바뀌었을 때 예전에 이 분류기가 채운 테마를 지울 수 있습니다.
+    일치 키워드 수는 classify_news의 가중치 점수와 단위가 달라 theme_score에 저장하지 않습니다.
+    """
+    return [classify_news_item(news_item, _worker_themes_keywords)[:2] + (None,) for news_item in batch]
+
+def main(workers=1):
+    """
+    새로 들어온 뉴스(워터마크 이후)만 분류하고, 테마 키워드가 바뀐 경우에만 전체를 다시 분류합니다.
+    workers가 2 이상이면 프로세스 풀로 분류합니다 (전체 재분류 등 대량 처리용).
+    """
+    themes_keywords = load_themes_keywords()
     
     conn = get_db_connection()
     if conn is None:
@@ -116,32 +107,44 @@ def main():
 
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT id, title, description FROM stock_news WHERE theme IS NULL")
-        news_to_classify = cursor.fetchall()
-        cursor.close()
-
-        if not news_to_classify:
-            logger.info("새로 분류할 뉴스가 없습니다.")
-            return
+        version = classifier_version(CLASSIFIER_LOGIC_VERSION, themes_keywords)
+        start_id = start_id_for(cursor, CLASSIFIER_NAME, version)
+        max_id = max_news_id(cursor)
+        conn.commit()
+        logger.info(f"id {start_id} 이후 뉴스를 {len(themes_keywords)}개 테마로 분류합니다 (분류기 버전 {version}, 작업 프로세스 {workers}개).")
 
-        logger.info(f"총 {len(news_to_classify)}개의 뉴스를 {len(themes_keywords)}개 테마로 분류합니다.")
-        
+        # classify_news가 테마를 정하지 못한 행만 채우고, theme_score(가중치 점수)는 건드리지 않음
+        writer = ThemeResultWriter(conn, CLASSIFIER_NAME, fill_gaps=True, logger=logger)
+        writer.prepare()
         update_count = 0
+        classified_count = 0
+        last_id = start_id
         
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_news = {executor.submit(classify_news_item, news, themes_keywords): news for news in news_to_classify}
-            
-            for future in as_completed(future_to_news):
-                news_id, theme = future.result()
-                if theme:
-                    # DB 작업을 위한 새 연결 생성
-                    thread_conn = get_db_connection()
-                    if thread_conn:
-                        if update_theme_in_db(thread_conn, news_id, theme):
-                            update_count += 1
-                        thread_conn.close()
-
-        logger.info(f"총 {update_count}개의 뉴스에 테마를 성공적으로 업데이트했습니다.")
+        # workers > 1이면 배치를 프로세스 풀에서 분류하고(작업자마다 매처를 한 번 생성), 결과는 이 연결 하나로 저장
+        batches = iter_news_batches(conn, start_id, max_id)
+        for batch, results in classify_batches(batches, classify_news_batch, workers, init_classifier_worker, (themes_keywords,)):
+            # 분류 결과를 임시 테이블에 모아 조인 UPDATE로 한 번에 반영 (빈 테마만 채움)
+            update_count += writer.write(results)
+            # 이 구간의 재송고 기사는 분류하지 않고 대표 기사의 테마를 복사
+            writer.propagate(last_id, batch[-1][0])
+
+            # 배치의 테마 업데이트와 워터마크를 함께 커밋해 중단되어도 다음 실행이 이어서 처리
+            save_state(cursor, CLASSIFIER_NAME, version, batch[-1][0])
+            conn.commit()
+            last_id = batch[-1][0]
+            classified_count += len(batch)
+
+        # 마지막 대표 기사 배치 뒤(또는 대표 기사 없이)에 들어온 재송고 기사도 테마를 복사하고 워터마크를 끝까지 올림
+        if max_id > last_id:
+            writer.propagate(last_id, max_id)
+            save_state(cursor, CLASSIFIER_NAME, version, max_id)
+            conn.commit()
+
+        cursor.close()
+        if classified_count:
+            logger.info(f"총 {classified_count}개의 뉴스를 분류해 {update_count}개에 테마를 성공적으로 업데이트했습니다.")
+        else:
+            logger.info("새로 분류할 뉴스가 없습니다.")
 
     except mysql.connector.Error as err:
         logger.error(f"스크립트 실행 중 DB 오류 발생: {err}")
@@ -151,4 +154,8 @@ def main():
             logger.info("메인 데이터베이스 연결을 닫습니다.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="키움 테마 기반 뉴스 증분 분류")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="분류 프로세스 수 (기본 1, 0이면 CPU 코어 수). 전체 재분류 시 늘리면 코어 수만큼 빨라집니다.")
+    args = parser.parse_args()
+    main(resolve_workers(args.workers))
\ No newline at end of file
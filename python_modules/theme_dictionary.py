@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+THEME_DICTIONARY_FILE = os.path.join(PROJECT_ROOT, 'data', 'theme_dictionary.json')
+
+# --- 갱신 설정 ---
+THEME_REQUEST_RATE = 5     # 초당 ka90002 요청 수 (키움 REST 요청 한도 안에서)
+MAX_AGE_HOURS = 24         # 이보다 오래된 사전은 분류기가 읽을 때 다시 만듭니다 (보통은 cron으로 미리 갱신)
+
+logger = logging.getLogger(__name__)
+
+class ThemeDictionary:
+    """
+    키움 테마(ka90001)와 테마별 구성 종목(ka90002)을 한 파일에 모아 둔 사전입니다.
+
+    - themes: {테마명: {'code': 테마 코드, 'stocks': [{'code': 종목코드, 'name': 종목명}, ...]}}
+    - stock_themes: {종목코드: [테마명, ...]} (역방향 색인)
+    - version: 테마 구성의 해시. 구성 종목이 바뀔 때만 달라집니다 (theme_classifier의 전체 재분류도 이때만 일어남).
+
+    테마와 종목은 코드 순으로 정렬해 저장합니다. ka90001 응답 순서(등락률 순)가 매일 바뀌어도 버전은 그대로입니다.
+    """
+
+    def __init__(self, themes, built_at=None):
+        self.themes = {
+            name: {'code': info['code'], 'stocks': sorted(info['stocks'], key=lambda s: s['code'])}
+            for name, info in sorted(themes.items(), key=lambda item: (item[1]['code'], item[0]))
+        }
+        self.built_at = built_at or time.time()
+        self.stock_themes = {}
+        for name, info in self.themes.items():
+            for stock in info['stocks']:
+                self.stock_themes.setdefault(stock['code'], []).append(name)
+        digest = hashlib.sha1(json.dumps(self.themes, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+        self.version = digest[:16]
+
+    def keywords(self):
+        """분류기용 {테마명: [종목명, ...]}."""
+        return {name: [stock['name'] for stock in info['stocks']] for name, info in self.themes.items()}
+
+    def themes_of(self, stock_code):
+        return self.stock_themes.get(stock_code, [])
+
+    def age_hours(self):
+        return (time.time() - self.built_at) / 3600
+
+    def save(self, path=THEME_DICTIONARY_FILE):
+        """임시 파일에 쓴 뒤 교체하므로 분류기가 쓰다 만 파일을 읽지 않습니다."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.version,
+                'built_at': self.built_at,
+                'themes': self.themes,
+                'stock_themes': self.stock_themes,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=THEME_DICTIONARY_FILE):
+        """저장된 사전을 읽습니다. 없거나 읽을 수 없으면 None."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            return cls(data['themes'], built_at=data['built_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+def fetch_theme_list(api):
+    """ka90001 전체 테마 목록을 [(테마 코드, 테마명), ...]으로 가져옵니다. 실패 시 None."""
+    themes_response = api.get_all_themes()
+    if not themes_response or 'thema_grp' not in themes_response:
+        return None
+    return [
+        (theme_info['thema_grp_cd'], theme_info['thema_nm'])
+        for theme_info in themes_response['thema_grp']
+        if theme_info.get('thema_grp_cd') and theme_info.get('thema_nm')
+    ]
+
+def fetch_theme_members(api, theme_list, rate=THEME_REQUEST_RATE):
+    """
+    ka90002를 초당 rate건씩 묶어 동시에 요청합니다.
+    ({테마명: {'code', 'stocks'}}, 구성 종목을 받지 못한 [(테마 코드, 테마명), ...])을 반환합니다.
+    """
+    themes = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=rate) as executor:
+        for i in range(0, len(theme_list), rate):
+            batch_started = time.monotonic()
+            batch = theme_list[i:i + rate]
+            responses = executor.map(lambda theme: api.get_stocks_by_theme(theme[0]), batch)
+            for (theme_code, theme_name), stocks_response in zip(batch, responses):
+                if not stocks_response or 'thema_comp_stk' not in stocks_response:
+                    failed.append((theme_code, theme_name))
+                    continue
+                themes[theme_name] = {
+                    'code': theme_code,
+                    'stocks': [
+                        {'code': s.get('stk_cd', ''), 'name': s['stk_nm']}
+                        for s in stocks_response['thema_comp_stk'] if s.get('stk_nm')
+                    ],
+                }
+            remaining = 1.0 - (time.monotonic() - batch_started)
+            if remaining > 0 and i + rate < len(theme_list):
+                time.sleep(remaining)
+    return themes, failed
+
+def fetch_theme_dictionary(api, rate=THEME_REQUEST_RATE):
+    """
+    ka90001 목록을 받은 뒤 테마별 구성 종목(ka90002)을 요청 한도 안에서 동시에 조회해 사전을 만듭니다.
+    실패한 테마는 한 번 더 조회하고, 그래도 빠진 테마가 있으면 불완전한 사전으로 버전이 바뀌지 않도록 None을 반환합니다.
+    """
+    if not api.token:
+        logger.info("API 토큰이 없어 테마 사전을 갱신할 수 없습니다.")
+        return None
+    theme_list = fetch_theme_list(api)
+    if not theme_list:
+        logger.warning("API에서 테마 목록을 가져오지 못했습니다.")
+        return None
+
+    logger.info(f"테마 {len(theme_list)}개의 구성 종목을 초당 {rate}건씩 조회합니다.")
+    started = time.monotonic()
+    themes, failed = fetch_theme_members(api, theme_list, rate)
+    if failed:
+        logger.info(f"구성 종목 조회에 실패한 테마 {len(failed)}개를 다시 조회합니다.")
+        time.sleep(1)
+        retried, failed = fetch_theme_members(api, failed, rate)
+        themes.update(retried)
+    if failed:
+        logger.warning(f"테마 {len(failed)}개의 구성 종목을 가져오지 못해 사전을 갱신하지 않습니다: "
+                       f"{', '.join(name for _, name in failed[:10])}")
+        return None
+
+    dictionary = ThemeDictionary(themes)
+    logger.info(f"테마 사전 생성 완료: 테마 {len(themes)}개, 종목 {len(dictionary.stock_themes)}개, 버전 {dictionary.version} "
+                f"({time.monotonic() - started:.1f}초)")
+    return dictionary
+
+def refresh_theme_dictionary(api, path=THEME_DICTIONARY_FILE, rate=THEME_REQUEST_RATE):
+    """API로 사전을 새로 만들어 저장합니다. 실패하면 기존 파일을 그대로 두고 None을 반환합니다."""
+    dictionary = fetch_theme_dictionary(api, rate)
+    if dictionary is None:
+        return None
+    previous = ThemeDictionary.load(path)
+    dictionary.save(path)
+    if previous and previous.version == dictionary.version:
+        logger.info("테마 구성에 변화가 없습니다 (버전 유지).")
+    return dictionary
+
+def load_theme_dictionary(api_factory=None, path=THEME_DICTIONARY_FILE, max_age_hours=MAX_AGE_HOURS):
+    """
+    저장된 사전을 읽습니다. 파일이 없거나 max_age_hours보다 오래되었고 api_factory가 주어지면
+    그때만 API 클라이언트를 만들어(토큰 발급 포함) 먼저 갱신합니다.
+    갱신에 실패하면 오래된 사전이라도 그대로 사용하고, 사전이 아예 없으면 None.
+    """
+    dictionary = ThemeDictionary.load(path)
+    if api_factory is not None and (dictionary is None or dictionary.age_hours() > max_age_hours):
+        logger.info("테마 사전이 없거나 오래되어 API로 갱신합니다.")
+        dictionary = refresh_theme_dictionary(api_factory(), path) or dictionary
+    return dictionary
+
+if __name__ == '__main__':
+    # 사용법: python theme_dictionary.py refresh   (cron으로 장 시작 전 하루 한 번 권장)
+    #         python theme_dictionary.py show [종목코드]
+    parser = argparse.ArgumentParser(description="키움 테마 사전 (ka90001/ka90002) 갱신/조회")
+    parser.add_argument('command', choices=['refresh', 'show'])
+    parser.add_argument('stock_code', nargs='?')
+    parser.add_argument('--rate', type=int, default=THEME_REQUEST_RATE, help="초당 ka90002 요청 수")
+    args = parser.parse_args()
+
+    if args.command == 'refresh':
+        from kiwoom_api import KiwoomAPI
+        refresh_theme_dictionary(KiwoomAPI(), rate=args.rate)
+    else:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        dictionary = ThemeDictionary.load()
+        if dictionary is None:
+            print("테마 사전이 없습니다. 'python theme_dictionary.py refresh'로 먼저 만드세요.")
+        elif args.stock_code:
+            print(json.dumps(dictionary.themes_of(args.stock_code), ensure_ascii=False))
+        else:
+            built_at = datetime.datetime.fromtimestamp(dictionary.built_at).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"버전 {dictionary.version} / 생성 {built_at} / 테마 {len(dictionary.themes)}개 / 종목 {len(dictionary.stock_themes)}개")
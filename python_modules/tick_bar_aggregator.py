@@ -0,0 +1,286 @@
+import asyncio
+import configparser
+import datetime
+import logging
+import os
+import mysql.connector
+from stock_record import parse_price
+
+# --- 기본 경로 설정 ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, '..'))
+CONFIG_FILE = os.path.join(PROJECT_ROOT, 'config.ini')
+
+logger = logging.getLogger(__name__)
+
+# --- 봉 설정 ---
+BAR_INTERVALS = ('1m', '5m', '1d')
+INTERVAL_MINUTES = {'1m': 1, '5m': 5}
+BAR_FLUSH_INTERVAL = 5       # 초, 마감 봉 일괄 저장 + 형성 중인 봉 갱신 주기
+LIVE_BAR_MAX_AGE = 300       # 초, 이 시간 안에 갱신된 봉이 있어야 장중 실시간 봉으로 간주
+
+def get_db_connection():
+    """config.ini에서 DB 정보를 읽어와 연결을 생성합니다."""
+    config = configparser.ConfigParser()
+    if not os.path.exists(CONFIG_FILE):
+        logger.error(f"설정 파일을 찾을 수 없습니다: {CONFIG_FILE}")
+        return None
+
+    config.read(CONFIG_FILE)
+
+    try:
+        db_config = {
+            'host': config.get('DB', 'HOST'),
+            'user': config.get('DB', 'USER'),
+            'password': config.get('DB', 'PASSWORD'),
+            'database': config.get('DB', 'DATABASE'),
+            'port': config.getint('DB', 'PORT')
+        }
+        return mysql.connector.connect(**db_config)
+    except (configparser.NoSectionError, configparser.NoOptionError) as e:
+        logger.error(f"config.ini 파일에 [DB] 섹션 또는 필요한 키가 없습니다. ({e})")
+        return None
+    except mysql.connector.Error as err:
+        logger.error(f"데이터베이스 연결 오류: {err}")
+        return None
+
+def bar_start(ts, interval):
+    """체결 시각이 속한 봉의 시작 시각을 반환합니다."""
+    if interval == '1d':
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    minutes = INTERVAL_MINUTES[interval]
+    return ts.replace(minute=ts.minute - ts.minute % minutes, second=0, microsecond=0)
+
+def bar_end(start, interval):
+    if interval == '1d':
+        return start + datetime.timedelta(days=1)
+    return start + datetime.timedelta(minutes=INTERVAL_MINUTES[interval])
+
+def parse_tick_time(tick, now):
+    """체결시간(FID '20', HHMMSS)이 있으면 오늘 날짜와 합치고, 없으면 수신 시각을 사용합니다."""
+    value = tick.get('20') or tick.get('tradeTime')
+    if value:
+        value = str(value).strip()
+        if len(value) == 6 and value.isdigit():
+            return now.replace(hour=int(value[:2]), minute=int(value[2:4]), second=int(value[4:]), microsecond=0)
+    return now
+
+class Bar:
+    """OHLCV 봉 하나. 종목/주기당 형성 중인 봉 하나만 메모리에 둡니다."""
+
+    __slots__ = ('stock_code', 'interval', 'start', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, stock_code, interval, start, price, volume):
+        self.stock_code = stock_code
+        self.interval = interval
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+
+    def add(self, price, volume):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+
+    def to_row(self, closed):
+        return (self.stock_code, self.interval, self.start, self.open, self.high, self.low,
+                self.close, self.volume, 1 if closed else 0)
+
+    def to_dict(self):
+        return {
+            'stock_code': self.stock_code, 'interval': self.interval, 'start': self.start,
+            'open': self.open, 'high': self.high, 'low': self.low, 'close': self.close, 'volume': self.volume,
+        }
+
+class TickBarAggregator:
+    """
+    실시간 체결을 종목별 1분/5분/일봉 OHLCV로 접습니다.
+    형성 중인 봉은 (종목코드, 주기) → Bar로 메모리에 두고, 봉 구간이 지나면 마감 목록으로 옮깁니다.
+    collect()는 마감 봉 전체와 마지막 collect 이후 바뀐 형성 중 봉을 DB 행으로 돌려줍니다.
+
+    거래량은 건별 체결량(FID '15')이 있으면 그 값을, 없으면 누적 거래량('tradeVolume' 또는 FID '13')의
+    직전 대비 증가분을 사용합니다.
+    """
+
+    def __init__(self, intervals=BAR_INTERVALS):
+        self.intervals = tuple(intervals)
+        self.forming = {}           # (stock_code, interval) -> Bar
+        self.closed = []            # 아직 저장하지 않은 마감 봉
+        self.dirty = set()          # 마지막 collect 이후 바뀐 형성 중 봉 키
+        self.last_cum_volume = {}   # stock_code -> 누적 거래량
+        self.tick_count = 0
+        self.late_tick_count = 0
+
+    def _trade_volume(self, stock_code, tick):
+        per_trade = tick.get('15')
+        if per_trade:
+            return parse_price(per_trade) or 0
+        cumulative = parse_price(tick.get('tradeVolume') or tick.get('13'))
+        if cumulative is None:
+            return 0
+        previous = self.last_cum_volume.get(stock_code)
+        self.last_cum_volume[stock_code] = cumulative
+        if previous is None or cumulative < previous:  # 첫 체결 또는 장 시작(누적값 초기화)
+            return 0
+        return cumulative - previous
+
+    def on_tick(self, stock_code, tick, now=None):
+        """WebSocketClient.add_tick_recorder()에 연결하는 체결 콜백입니다 (큐 병합 전 모든 체결)."""
+        if tick.get('resync'):
+            return  # 재연결 후 REST(ka10001)로 채운 스냅샷은 체결이 아니므로 봉에 넣지 않음
+        price = parse_price(tick.get('lastPrice') or tick.get('10'))
+        if not price:
+            return
+        now = now or datetime.datetime.now()
+        self.add_trade(stock_code, price, self._trade_volume(stock_code, tick), parse_tick_time(tick, now))
+
+    def add_trade(self, stock_code, price, volume, ts):
+        self.tick_count += 1
+        for interval in self.intervals:
+            key = (stock_code, interval)
+            start = bar_start(ts, interval)
+            bar = self.forming.get(key)
+            if bar is None or start > bar.start:
+                if bar is not None:
+                    self.closed.append(bar)
+                self.forming[key] = Bar(stock_code, interval, start, price, volume)
+            elif start == bar.start:
+                bar.add(price, volume)
+            else:
+                # 이미 마감한 구간의 늦은 체결은 버림 (저장된 봉을 다시 고치지 않음)
+                self.late_tick_count += 1
+                continue
+            self.dirty.add(key)
+
+    def close_expired(self, now):
+        """새 체결이 없어도 구간이 끝난 봉을 마감합니다."""
+        for key, bar in list(self.forming.items()):
+            if bar_end(bar.start, bar.interval) <= now:
+                self.closed.append(bar)
+                del self.forming[key]
+                self.dirty.discard(key)
+
+    def collect(self, now=None):
+        """마감 봉과 바뀐 형성 중 봉을 stock_bars 행으로 반환하고 목록을 비웁니다."""
+        self.close_expired(now or datetime.datetime.now())
+        rows = [bar.to_row(True) for bar in self.closed]
+        rows.extend(self.forming[key].to_row(False) for key in self.dirty if key in self.forming)
+        self.closed = []
+        self.dirty = set()
+        return rows
+
+    def live_bar(self, stock_code, interval='1m'):
+        bar = self.forming.get((stock_code, interval))
+        return bar.to_dict() if bar else None
+
+def ensure_bar_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stock_bars (
+        stock_code VARCHAR(10) NOT NULL,
+        bar_interval VARCHAR(4) NOT NULL,
+        bar_time DATETIME NOT NULL,
+        open_price BIGINT,
+        high_price BIGINT,
+        low_price BIGINT,
+        close_price BIGINT,
+        volume BIGINT DEFAULT 0,
+        is_closed TINYINT(1) DEFAULT 0,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (stock_code, bar_interval, bar_time)
+    )
+    """)
+
+def write_bars(rows):
+    """봉 행을 한 트랜잭션으로 저장합니다. 형성 중 봉은 같은 키로 덮어쓰며, 성공하면 True."""
+    if not rows:
+        return True
+    conn = get_db_connection()
+    if conn is None:
+        return False
+    try:
+        cursor = conn.cursor()
+        ensure_bar_table(cursor)
+        cursor.executemany("""
+        INSERT INTO stock_bars (stock_code, bar_interval, bar_time, open_price, high_price, low_price, close_price, volume, is_closed)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            open_price = VALUES(open_price), high_price = VALUES(high_price), low_price = VALUES(low_price),
+            close_price = VALUES(close_price), volume = VALUES(volume), is_closed = VALUES(is_closed)
+        """, rows)
+        conn.commit()
+        cursor.close()
+        return True
+    except mysql.connector.Error as err:
+        logger.error(f"봉 데이터 저장 중 오류 발생: {err}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def load_session_bars(stock_code, interval='1m', max_age=LIVE_BAR_MAX_AGE):
+    """
+    오늘 실시간으로 만들어진 봉을 시간순으로 반환합니다. 형성 중인 봉(is_closed=0)도 포함합니다.
+    최근 max_age초 안에 갱신된 봉이 없으면 (장 마감/수집기 중지) 빈 리스트를 반환해 REST 조회로 넘깁니다.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return []
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT bar_time, open_price, high_price, low_price, close_price, volume, is_closed, updated_at
+        FROM stock_bars
+        WHERE stock_code = %s AND bar_interval = %s AND bar_time >= CURDATE()
+        ORDER BY bar_time
+        """, (stock_code, interval))
+        bars = cursor.fetchall()
+        cursor.close()
+    except mysql.connector.Error as err:
+        logger.error(f"봉 데이터 조회 중 오류 발생: {err}")
+        return []
+    finally:
+        conn.close()
+
+    if not bars:
+        return []
+    latest_update = max(bar['updated_at'] for bar in bars)
+    if (datetime.datetime.now() - latest_update).total_seconds() > max_age:
+        return []
+    return bars
+
+class RealtimeBarRecorder:
+    """
+    TickBarAggregator를 실시간 클라이언트에 연결하고, flush_interval마다 마감 봉과 형성 중 봉을 저장합니다.
+    WebSocketClient.add_tick_recorder(recorder.on_tick)로 큐 병합 전 체결을 받고 run_flush_loop()를 함께 실행합니다.
+    """
+
+    def __init__(self, aggregator=None, flush_interval=BAR_FLUSH_INTERVAL):
+        self.aggregator = aggregator or TickBarAggregator()
+        self.flush_interval = flush_interval
+        self.pending_rows = []  # 저장에 실패해 다음 주기에 다시 쓸 행
+
+    def on_tick(self, stock_code, tick):
+        self.aggregator.on_tick(stock_code, tick)
+
+    def _take_rows(self):
+        rows = self.pending_rows + self.aggregator.collect()
+        self.pending_rows = []
+        return rows
+
+    async def run_flush_loop(self):
+        """봉 모으기는 이벤트 루프 스레드에서, DB 쓰기는 별도 스레드에서 실행해 수신을 막지 않습니다."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                rows = self._take_rows()
+                if rows and not await asyncio.to_thread(write_bars, rows):
+                    self.pending_rows = rows + self.pending_rows
+        except asyncio.CancelledError:
+            # 종료 시 남은 봉(형성 중 포함)을 마저 저장
+            rows = self._take_rows()
+            if rows:
+                write_bars(rows)
+            raise
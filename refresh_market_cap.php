@@ -0,0 +1,52 @@
+<?php
+// 시가총액 순위 다시 계산 (market_cap.php의 '다시 계산' 버튼)
+// auto_trade_backend/market_cap_fetcher.py를 백그라운드로 실행해 market_cap_ranking 테이블을 새로 씁니다.
+// 스냅샷/DB에 저장된 가격으로만 계산하므로 API를 호출하지 않으며, 짧은 시간 안의 중복 요청은 무시합니다.
+header('Content-Type: application/json; charset=utf-8');
+
+const MIN_REFRESH_INTERVAL = 60; // 초
+
+if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
+    http_response_code(405);
+    echo json_encode(['status' => 'error', 'message' => 'POST 요청만 허용됩니다.'], JSON_UNESCAPED_UNICODE);
+    exit;
+}
+
+$data_dir = __DIR__ . '/data';
+if (!is_dir($data_dir)) {
+    mkdir($data_dir, 0775, true);
+}
+$stamp_file = $data_dir . '/market_cap_refresh.stamp';
+
+// 마지막 요청 시각을 잠금 상태에서 확인/기록해 동시에 눌러도 한 번만 실행합니다.
+$stamp = fopen($stamp_file, 'c+');
+if (!$stamp || !flock($stamp, LOCK_EX)) {
+    echo json_encode(['status' => 'error', 'message' => '요청 상태를 확인할 수 없습니다.'], JSON_UNESCAPED_UNICODE);
+    exit;
+}
+$last_started = (int)stream_get_contents($stamp);
+$elapsed = time() - $last_started;
+if ($elapsed < MIN_REFRESH_INTERVAL) {
+    flock($stamp, LOCK_UN);
+    fclose($stamp);
+    echo json_encode([
+        'status' => 'skipped',
+        'message' => (MIN_REFRESH_INTERVAL - $elapsed) . '초 후에 다시 계산할 수 있습니다.',
+    ], JSON_UNESCAPED_UNICODE);
+    exit;
+}
+ftruncate($stamp, 0);
+rewind($stamp);
+fwrite($stamp, (string)time());
+fflush($stamp);
+flock($stamp, LOCK_UN);
+fclose($stamp);
+
+$python_script = __DIR__ . '/auto_trade_backend/market_cap_fetcher.py';
+$command = 'python3 ' . escapeshellarg($python_script) . ' > /dev/null 2>&1 &';
+
+// 백그라운드에서 실행
+exec($command);
+
+echo json_encode(['status' => 'started', 'message' => '시가총액 순위를 다시 계산하고 있습니다.'], JSON_UNESCAPED_UNICODE);
+?>
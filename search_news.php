@@ -12,39 +12,188 @@ if ($conn->connect_error) {
     echo '<p class="message">데이터베이스 연결에 실패했습니다.</p>';
     exit;
 }
+$conn->set_charset("utf8mb4");
+
+// --- 검색 설정 (python_modules/news_search_index.py와 같은 값) ---
+const PAGE_SIZE = 20;
+const MAX_CANDIDATES = 2000;   // 필터를 통과한 기사 중 가장 드문 2-gram의 최신 N건만 후보로
+const TOTAL_DOCS_TERM = '';    // news_search_terms에서 전체 기사 수를 담은 행
+
+// 검색어를 단어별 글자 2-gram으로 나눕니다 (한 글자 단어는 그대로). news_search_index.tokenize()와 같은 규칙이어야 합니다.
+function search_terms($text) {
+    $words = preg_split('/[^\p{L}\p{N}]+/u', mb_strtolower($text, 'UTF-8'), -1, PREG_SPLIT_NO_EMPTY);
+    $terms = [];
+    foreach ($words as $word) {
+        $length = mb_strlen($word, 'UTF-8');
+        if ($length == 1) {
+            $terms[$word] = true;
+            continue;
+        }
+        for ($i = 0; $i < $length - 1; $i++) {
+            $terms[mb_substr($word, $i, 2, 'UTF-8')] = true;
+        }
+    }
+    $terms = array_map('strval', array_keys($terms)); // 숫자 2-gram('12')이 정수 키가 되지 않도록
+    sort($terms, SORT_STRING);
+    return $terms;
+}
+
+function bind_and_execute($conn, $sql, $params) {
+    $stmt = $conn->prepare($sql);
+    if (!$stmt) {
+        return null;
+    }
+    if ($params) {
+        $types = '';
+        foreach ($params as $param) {
+            $types .= is_int($param) ? 'i' : (is_float($param) ? 'd' : 's');
+        }
+        $stmt->bind_param($types, ...$params);
+    }
+    $stmt->execute();
+    $result = $stmt->get_result();
+    $stmt->close();
+    return $result;
+}
 
 $query = isset($_GET['q']) ? trim($_GET['q']) : '';
-if (empty($query)) {
+$theme = isset($_GET['theme']) ? trim($_GET['theme']) : '';
+$stock_code = isset($_GET['stock']) ? trim($_GET['stock']) : '';
+$date_from = isset($_GET['from']) && preg_match('/^\d{4}-\d{2}-\d{2}$/', $_GET['from']) ? $_GET['from'] : '';
+$date_to = isset($_GET['to']) && preg_match('/^\d{4}-\d{2}-\d{2}$/', $_GET['to']) ? $_GET['to'] : '';
+$page = isset($_GET['page']) ? max(1, (int)$_GET['page']) : 1;
+
+// 종목코드(6자리)로 검색하면 그 종목의 최신 뉴스
+if (preg_match('/^\d{6}$/', $query)) {
+    $stock_code = $query;
+    $query = '';
+}
+if ($query === '' && $theme === '' && $stock_code === '') {
     echo '<p class="message">검색어를 입력해주세요.</p>';
     exit;
 }
 
-$search_term = "%" . $conn->real_escape_string($query) . "%";
-$sql = "SELECT sn.stock_code, sd.stock_name, sn.title, sn.link, sn.description, sn.pub_date 
-        FROM stock_news sn
-        JOIN stock_details sd ON sn.stock_code = sd.stock_code
-        WHERE sd.stock_name LIKE ? OR sn.stock_code LIKE ?
-        ORDER BY sn.pub_date DESC LIMIT 50";
+// 테마/종목/기간 필터
+$filters = [];
+$filter_params = [];
+if ($theme !== '') { $filters[] = 'n.theme = ?'; $filter_params[] = $theme; }
+if ($stock_code !== '') { $filters[] = 'n.stock_code = ?'; $filter_params[] = $stock_code; }
+if ($date_from !== '') { $filters[] = 'n.pub_date >= ?'; $filter_params[] = $date_from; }
+if ($date_to !== '') { $filters[] = 'n.pub_date < ? + INTERVAL 1 DAY'; $filter_params[] = $date_to; }
+$where = $filters ? 'WHERE ' . implode(' AND ', $filters) : '';
+$offset = ($page - 1) * PAGE_SIZE;
+
+$terms = search_terms($query);
+$news_list = [];
+$total_count = 0;
 
-$stmt = $conn->prepare($sql);
-$stmt->bind_param("ss", $search_term, $search_term);
-$stmt->execute();
-$result = $stmt->get_result();
+if ($terms) {
+    // 2-gram별 기사 수로 idf를 구하고, 가장 드문 2-gram의 게시 목록에서 후보를 고릅니다.
+    $placeholders = implode(', ', array_fill(0, count($terms) + 1, '?'));
+    $result = bind_and_execute($conn, "SELECT term, doc_count FROM news_search_terms WHERE term IN ($placeholders)", array_merge($terms, [TOTAL_DOCS_TERM]));
+    $doc_counts = [];
+    while ($result && $row = $result->fetch_assoc()) {
+        $doc_counts[(string)$row['term']] = (int)$row['doc_count'];
+    }
+    $total_docs = $doc_counts[TOTAL_DOCS_TERM] ?? 0;
+    unset($doc_counts[TOTAL_DOCS_TERM]);
+
+    if (count($doc_counts) == count($terms)) {
+        $rarest = $terms[0];
+        $score_cases = [];
+        $score_params = [];
+        foreach ($terms as $term) {
+            if ($doc_counts[$term] < $doc_counts[$rarest]) {
+                $rarest = $term;
+            }
+            $score_cases[] = 'WHEN ? THEN ?';
+            $score_params[] = $term;
+            $score_params[] = log(1 + $total_docs / $doc_counts[$term]);
+        }
+        $term_placeholders = implode(', ', array_fill(0, count($terms), '?'));
+        // 테마/종목/기간 필터는 후보를 자르기(LIMIT) 전에 적용해야 오래된 종목 기사도 찾을 수 있습니다.
+        $candidate_join = $filters ? 'JOIN stock_news n ON n.id = c.news_id AND ' . implode(' AND ', $filters) : '';
 
-echo "<h2>'" . htmlspecialchars($query) . "'에 대한 검색 결과</h2>";
+        // 모든 2-gram을 포함한 후보를 점수(가중치 × idf 합) 순으로, 재송고 기사는 이야기마다 하나만
+        $sql = "SELECT id, stock_code, stock_name, title, link, description, pub_date, theme, score, COUNT(*) OVER () AS total_count
+                FROM (
+                    SELECT n.id, n.stock_code, sd.stock_name, n.title, n.link, n.description, n.pub_date, n.theme, s.score,
+                           ROW_NUMBER() OVER (PARTITION BY COALESCE(n.story_id, n.id) ORDER BY n.story_id IS NOT NULL, n.id) AS story_rn
+                    FROM (
+                        SELECT p.news_id, SUM(p.weight * CASE p.term " . implode(' ', $score_cases) . " END) AS score
+                        FROM (
+                            SELECT c.news_id FROM news_search_postings c
+                            $candidate_join
+                            WHERE c.term = ?
+                            ORDER BY c.news_id DESC
+                            LIMIT ?
+                        ) c
+                        JOIN news_search_postings p ON p.news_id = c.news_id AND p.term IN ($term_placeholders)
+                        GROUP BY p.news_id
+                        HAVING COUNT(*) = ?
+                    ) s
+                    JOIN stock_news n ON n.id = s.news_id
+                    LEFT JOIN stock_details sd ON sd.stock_code = n.stock_code
+                ) r
+                WHERE story_rn = 1
+                ORDER BY score DESC, pub_date DESC
+                LIMIT ? OFFSET ?";
+        $params = array_merge($score_params, $filter_params, [$rarest, MAX_CANDIDATES], $terms, [count($terms)], [PAGE_SIZE, $offset]);
+        $result = bind_and_execute($conn, $sql, $params);
+        while ($result && $row = $result->fetch_assoc()) {
+            $news_list[] = $row;
+        }
+    }
+} elseif ($query === '') {
+    // 검색어 없이 필터만 있으면 최신순
+    $sql = "SELECT n.id, n.stock_code, sd.stock_name, n.title, n.link, n.description, n.pub_date, n.theme, COUNT(*) OVER () AS total_count
+            FROM stock_news n
+            LEFT JOIN stock_details sd ON sd.stock_code = n.stock_code
+            $where
+            ORDER BY n.pub_date DESC
+            LIMIT ? OFFSET ?";
+    $result = bind_and_execute($conn, $sql, array_merge($filter_params, [PAGE_SIZE, $offset]));
+    while ($result && $row = $result->fetch_assoc()) {
+        $news_list[] = $row;
+    }
+}
+if ($news_list) {
+    $total_count = (int)$news_list[0]['total_count'];
+}
 
-if ($result->num_rows > 0) {
-    while($row = $result->fetch_assoc()) {
+$label = $query !== '' ? $query : ($stock_code !== '' ? $stock_code : $theme);
+echo "<h2>'" . htmlspecialchars($label) . "'에 대한 검색 결과 <small>(" . number_format($total_count) . "건)</small></h2>";
+
+if ($news_list) {
+    foreach ($news_list as $row) {
         echo '<div class="news-item">';
-        echo '<div class="news-meta"><span class="stock-info">' . htmlspecialchars($row['stock_name']) . ' (' . htmlspecialchars($row['stock_code']) . ')</span>' . htmlspecialchars($row['pub_date']) . '</div>';
+        echo '<div class="news-meta"><span class="stock-info">' . htmlspecialchars($row['stock_name'] ?? '') . ' (' . htmlspecialchars($row['stock_code']) . ')</span>' . htmlspecialchars($row['pub_date']);
+        if (!empty($row['theme'])) {
+            echo ' <span class="theme-info">' . htmlspecialchars($row['theme']) . '</span>';
+        }
+        echo '</div>';
         echo '<div class="news-title"><a href="' . htmlspecialchars($row['link']) . '" target="_blank">' . htmlspecialchars($row['title']) . '</a></div>';
         echo '<div class="news-description">' . htmlspecialchars($row['description']) . '</div>';
         echo '</div>';
     }
+
+    // 페이지 이동 (display_stock_news.php가 링크를 가로채 결과 영역만 다시 불러옴)
+    $page_count = (int)ceil($total_count / PAGE_SIZE);
+    if ($page_count > 1) {
+        $base = ['q' => $_GET['q'] ?? '', 'theme' => $theme, 'stock' => $stock_code, 'from' => $date_from, 'to' => $date_to];
+        echo '<div class="pagination">';
+        if ($page > 1) {
+            echo '<a href="search_news.php?' . htmlspecialchars(http_build_query($base + ['page' => $page - 1])) . '">이전</a> ';
+        }
+        echo '<span>' . $page . ' / ' . $page_count . '</span>';
+        if ($page < $page_count) {
+            echo ' <a href="search_news.php?' . htmlspecialchars(http_build_query($base + ['page' => $page + 1])) . '">다음</a>';
+        }
+        echo '</div>';
+    }
 } else {
-    echo '<p class="message">해당 종목에 대한 뉴스를 찾을 수 없습니다.</p>';
+    echo '<p class="message">검색 결과가 없습니다.</p>';
 }
 
-$stmt->close();
 $conn->close();
-?>
\ No newline at end of file
+?>
@@ -0,0 +1,137 @@
+<?php
+// 실시간 조건검색 결과 (MD/python_modules/condition_result_store.py 스냅샷을 api/run_conditional_search.php로 1초마다 조회)
+$config = parse_ini_file(__DIR__ . '/../config.ini', true);
+$stock_names = [];
+$conn = @new mysqli($config['DB']['HOST'], $config['DB']['USER'], $config['DB']['PASSWORD'], $config['DB']['DATABASE'], $config['DB']['PORT']);
+if (!$conn->connect_error) {
+    $conn->set_charset("utf8mb4");
+    $result = $conn->query("SELECT stock_code, stock_name FROM stock_details");
+    if ($result) {
+        while ($row = $result->fetch_assoc()) {
+            $stock_names[$row['stock_code']] = $row['stock_name'];
+        }
+    }
+    $conn->close();
+}
+$selected_seq = isset($_GET['seq']) ? (string)$_GET['seq'] : '';
+?>
+<!DOCTYPE html>
+<html lang="ko">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>실시간 조건검색</title>
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 20px; background-color: #f8f9fa; color: #212529; }
+        .container { max-width: 1200px; margin: 0 auto; background-color: #ffffff; padding: 30px; border-radius: 10px; box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08); }
+        h1 { color: #0056b3; text-align: center; margin-bottom: 10px; }
+        h2 { color: #0056b3; font-size: 18px; margin-top: 30px; }
+        .updated { text-align: center; color: #6c757d; margin-bottom: 20px; }
+        .tabs { text-align: center; margin-bottom: 20px; }
+        .tabs a { display: inline-block; padding: 8px 16px; margin: 4px; border-radius: 15px; text-decoration: none; color: #007bff; background-color: #e9f2ff; }
+        .tabs a.active { background-color: #007bff; color: white; }
+        table { width: 100%; border-collapse: collapse; }
+        th, td { padding: 10px 15px; border-bottom: 1px solid #dee2e6; text-align: left; }
+        th { background-color: #007bff; color: white; font-weight: 600; }
+        td.num { text-align: right; }
+        .up { color: #d9534f; }
+        .down { color: #0275d8; }
+        .new { background-color: #fff3cd; }
+        .error { color: #d9534f; text-align: center; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>실시간 조건검색</h1>
+        <div class="updated" id="updated">불러오는 중...</div>
+        <div class="tabs" id="tabs"></div>
+        <table>
+            <thead><tr><th>종목코드</th><th>종목명</th><th>현재가</th><th>등락률</th><th>거래량</th></tr></thead>
+            <tbody id="stocks"></tbody>
+        </table>
+        <h2>최근 편입/이탈</h2>
+        <table>
+            <thead><tr><th>시각</th><th>조건식</th><th>종목</th><th>구분</th></tr></thead>
+            <tbody id="events"></tbody>
+        </table>
+    </div>
+    <script>
+        const stockNames = <?php echo json_encode($stock_names, JSON_UNESCAPED_UNICODE); ?>;
+        let selectedSeq = <?php echo json_encode($selected_seq); ?>;
+        let previousCodes = null;
+
+        function escapeHtml(value) {
+            return String(value ?? '').replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+        }
+
+        function conditionLabel(seq, condition, names) {
+            const name = (condition && condition.name) || (names && names[seq]) || '';
+            return name ? `${seq} ${name}` : `조건식 ${seq}`;
+        }
+
+        function render(data) {
+            const seqs = Object.keys(data.conditions);
+            if (!selectedSeq || !data.conditions[selectedSeq]) {
+                selectedSeq = seqs[0] || '';
+                previousCodes = null;
+            }
+            document.getElementById('updated').textContent =
+                `마지막 변경: ${new Date(data.updated_at * 1000).toLocaleTimeString('ko-KR')}`;
+            document.getElementById('tabs').innerHTML = seqs.map(seq =>
+                `<a href="?seq=${encodeURIComponent(seq)}" data-seq="${escapeHtml(seq)}" class="${seq === selectedSeq ? 'active' : ''}">` +
+                `${escapeHtml(conditionLabel(seq, data.conditions[seq], data.names))} (${data.conditions[seq].count})</a>`
+            ).join('');
+
+            const condition = data.conditions[selectedSeq];
+            const stocks = condition ? condition.stocks : [];
+            document.getElementById('stocks').innerHTML = stocks.map(stock => {
+                const rate = stock.change_rate;
+                const rateClass = rate > 0 ? 'up' : (rate < 0 ? 'down' : '');
+                const isNew = previousCodes !== null && !previousCodes.has(stock.stock_code);
+                return `<tr class="${isNew ? 'new' : ''}">` +
+                    `<td>${escapeHtml(stock.stock_code)}</td>` +
+                    `<td>${escapeHtml(stockNames[stock.stock_code] || '')}</td>` +
+                    `<td class="num">${stock.current_price !== undefined ? Number(stock.current_price).toLocaleString() : '-'}</td>` +
+                    `<td class="num ${rateClass}">${rate !== undefined ? rate.toFixed(2) + '%' : '-'}</td>` +
+                    `<td class="num">${stock.volume !== undefined ? Number(stock.volume).toLocaleString() : '-'}</td></tr>`;
+            }).join('') || '<tr><td colspan="5">편입 종목이 없습니다.</td></tr>';
+            previousCodes = new Set(stocks.map(stock => stock.stock_code));
+
+            document.getElementById('events').innerHTML = data.recent_events.map(event =>
+                `<tr><td>${new Date(event.time * 1000).toLocaleTimeString('ko-KR')}</td>` +
+                `<td>${escapeHtml(conditionLabel(String(event.seq), data.conditions[event.seq], data.names))}</td>` +
+                `<td>${escapeHtml(event.stock_code)} ${escapeHtml(stockNames[event.stock_code] || '')}</td>` +
+                `<td class="${event.event === 'I' ? 'up' : 'down'}">${event.event === 'I' ? '편입' : '이탈'}</td></tr>`
+            ).join('');
+        }
+
+        async function refresh() {
+            try {
+                const response = await fetch('../api/run_conditional_search.php?quotes=1');
+                const data = await response.json();
+                if (data.error) {
+                    document.getElementById('updated').innerHTML = `<span class="error">${escapeHtml(data.error)}</span>`;
+                } else {
+                    render(data);
+                }
+            } catch (e) {
+                document.getElementById('updated').innerHTML = '<span class="error">조건검색 결과를 불러오지 못했습니다.</span>';
+            }
+        }
+
+        document.getElementById('tabs').addEventListener('click', event => {
+            const link = event.target.closest('a[data-seq]');
+            if (link) {
+                event.preventDefault();
+                selectedSeq = link.dataset.seq;
+                previousCodes = null;
+                history.replaceState(null, '', `?seq=${encodeURIComponent(selectedSeq)}`);
+                refresh();
+            }
+        });
+
+        refresh();
+        setInterval(refresh, 1000);
+    </script>
+</body>
+</html>
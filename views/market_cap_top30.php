@@ -0,0 +1,104 @@
+<?php
+// 실시간 시가총액 상위 30 (auto_trade_backend/market_cap_fetcher.py가 갱신하는 market_cap_top30 테이블 조회)
+$config = parse_ini_file(__DIR__ . '/../config.ini', true);
+$conn = new mysqli($config['DB']['HOST'], $config['DB']['USER'], $config['DB']['PASSWORD'], $config['DB']['DATABASE'], $config['DB']['PORT']);
+if ($conn->connect_error) {
+    die("<p class='error'>DB 연결 실패: " . htmlspecialchars($conn->connect_error) . "</p>");
+}
+$conn->set_charset("utf8mb4");
+
+$scopes = ['ALL' => '전체', 'market:KOSPI' => '코스피', 'market:KOSDAQ' => '코스닥'];
+$scope = isset($_GET['scope']) ? $_GET['scope'] : 'ALL';
+if (!isset($scopes[$scope]) && strpos($scope, 'sector:') !== 0) {
+    $scope = 'ALL';
+}
+
+$rows = [];
+$updated_at = null;
+$stmt = $conn->prepare("SELECT `rank`, stock_code, stock_name, market, sector, current_price, market_cap, updated_at FROM market_cap_top30 WHERE scope = ? ORDER BY `rank` LIMIT 30");
+if ($stmt) {
+    $stmt->bind_param("s", $scope);
+    $stmt->execute();
+    $result = $stmt->get_result();
+    while ($row = $result->fetch_assoc()) {
+        $rows[] = $row;
+        if ($updated_at === null || $row['updated_at'] > $updated_at) {
+            $updated_at = $row['updated_at'];
+        }
+    }
+    $stmt->close();
+}
+$conn->close();
+
+function formatMarketCap($value) {
+    // 원 단위 시가총액을 조 / 억 단위로 표시
+    $eok = floor($value / 100000000);
+    if ($eok >= 10000) {
+        return number_format(floor($eok / 10000)) . '조 ' . number_format($eok % 10000) . '억';
+    }
+    return number_format($eok) . '억';
+}
+?>
+<!DOCTYPE html>
+<html lang="ko">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta http-equiv="refresh" content="10">
+    <title>시가총액 상위 30</title>
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 20px; background-color: #f8f9fa; color: #212529; }
+        .container { max-width: 1200px; margin: 0 auto; background-color: #ffffff; padding: 30px; border-radius: 10px; box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08); }
+        h1 { color: #0056b3; text-align: center; margin-bottom: 10px; }
+        .updated { text-align: center; color: #6c757d; margin-bottom: 20px; }
+        .tabs { text-align: center; margin-bottom: 20px; }
+        .tabs a { display: inline-block; padding: 8px 16px; margin: 0 4px; border-radius: 15px; text-decoration: none; color: #007bff; background-color: #e9f2ff; }
+        .tabs a.active { background-color: #007bff; color: white; }
+        table { width: 100%; border-collapse: collapse; }
+        th, td { padding: 12px 15px; border-bottom: 1px solid #dee2e6; text-align: left; }
+        th { background-color: #007bff; color: white; position: sticky; top: 0; font-weight: 600; }
+        td.num { text-align: right; }
+        tr:nth-child(even) { background-color: #f8f9fa; }
+        tr:hover { background-color: #e9ecef; }
+        .no-data { color: #dc3545; text-align: center; margin-top: 20px; font-size: 18px; }
+        .home-link { display: block; text-align: center; margin-top: 40px; text-decoration: none; color: #007bff; font-weight: bold; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>시가총액 상위 30</h1>
+        <div class="updated">
+            <?php echo $updated_at ? '최종 갱신: ' . htmlspecialchars($updated_at) : '갱신 기록 없음'; ?>
+        </div>
+        <div class="tabs">
+            <?php foreach ($scopes as $key => $label): ?>
+                <a href="?scope=<?php echo urlencode($key); ?>" class="<?php echo $key === $scope ? 'active' : ''; ?>"><?php echo htmlspecialchars($label); ?></a>
+            <?php endforeach; ?>
+        </div>
+
+        <?php if (empty($rows)): ?>
+            <p class="no-data">시가총액 순위 데이터가 없습니다. 'MD/python_modules/realtime_data_updater.py --market-cap'을 실행해주세요.</p>
+        <?php else: ?>
+            <table>
+                <thead>
+                    <tr><th>순위</th><th>종목명</th><th>종목코드</th><th>시장</th><th>업종</th><th>현재가</th><th>시가총액</th></tr>
+                </thead>
+                <tbody>
+                    <?php foreach ($rows as $row): ?>
+                        <tr>
+                            <td><?php echo (int)$row['rank']; ?></td>
+                            <td><?php echo htmlspecialchars($row['stock_name']); ?></td>
+                            <td><?php echo htmlspecialchars($row['stock_code']); ?></td>
+                            <td><?php echo htmlspecialchars($row['market']); ?></td>
+                            <td><?php echo htmlspecialchars($row['sector'] ?? ''); ?></td>
+                            <td class="num"><?php echo number_format($row['current_price']); ?></td>
+                            <td class="num"><?php echo formatMarketCap($row['market_cap']); ?></td>
+                        </tr>
+                    <?php endforeach; ?>
+                </tbody>
+            </table>
+        <?php endif; ?>
+        <a href="../index.php" class="home-link">메인으로 돌아가기</a>
+    </div>
+</body>
+</html>